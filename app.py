@@ -1,13 +1,19 @@
 # Nama fail: app.py
 import streamlit as st
 import pandas as pd
-from fpdf import FPDF
 import datetime
-import io
 import os # Tambahan baru untuk cek fail logo
-import plotly.express as px
+import httpx
 from supabase import create_client, Client
-import openpyxl 
+from supabase.lib.client_options import SyncClientOptions
+from sawit.kiraan import kira_payroll, sediakan_resit, baris_rekod_gaji, proses_dataframe_bulanan, tapis_tempoh, bulan_dari_tempoh, tempoh_dari_bulan, kadar_tempoh, kira_senario, KubusTahunan, MOD_KUBUS
+from sawit.data import SalinanTempatan, KiraanSemula, ambil_rollup, ambil_tempoh, cari_bulan_basi, SELANG_SEGERAK_SAAT
+from sawit.storan import buat_storan
+from sawit.laporan import jana_pdf_binary, jana_pdf_bercache, jana_pdf_berkelompok_bercache, jana_pdf_pukal, buat_kolam_pekerja, data_kiraan_dari_rekod
+from sawit.eksport import to_excel, to_zip_csv
+from sawit.import_pukal import import_pukal, pulih_syot, ringkasan_import, sahkan_tiket, ringkasan_tiket, SAIZ_PRATONTON
+from sawit.prestasi import Perekod, StoranDiukur, diukur, fasa, pantau_cache
+from sawit.syot import jana_syot, adalah_syot, baca_manifest
 
 # --- TETAPAN HALAMAN (MESTI DI ATAS SEKALI) ---
 st.set_page_config(layout="wide", page_title="Sistem Gaji Sawit", page_icon="🌴")
@@ -15,22 +21,34 @@ st.set_page_config(layout="wide", page_title="Sistem Gaji Sawit", page_icon="
 # ==============================================================================
 # 1. SAMBUNGAN KE SUPABASE
 # ==============================================================================
-try:
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    supabase: Client = create_client(url, key)
-    
-    # Ping database
+# Satu klien untuk setiap proses (dikongsi semua sesi & rerun). Streamlit
+# menjalankan semula skrip pada setiap klik, jadi klien dan sambungan HTTP
+# tidak boleh dibina semula setiap kali. Supabase dijaga aktif oleh penyegar
+# latar salinan data (lihat bahagian 4), bukan ping berasingan.
+
+@st.cache_resource
+def dapatkan_supabase(url, key):
+    # Kolam sambungan keep-alive dikongsi oleh PostgREST, auth & storage
+    http = httpx.Client(
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=300),
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        follow_redirects=True,
+    )
+    return create_client(url, key, options=SyncClientOptions(httpx_client=http))
+
+# Backend storan (lihat sawit/storan.py): "supabase" (lalai), "sqlite" atau "berlapis"
+MOD_STORAN = st.secrets.get("STORAN", "supabase")
+supabase = None
+if MOD_STORAN != "sqlite":  # mod "sqlite" berjalan luar talian sepenuhnya
     try:
-        supabase.table('rekod_kos').select("id").limit(1).execute()
-    except Exception:
-        pass 
-
-except KeyError:
-    st.error("Ralat: Rahsia 'SUPABASE_URL' atau 'SUPABASE_KEY' tidak ditemui.")
-    st.stop()
-except Exception as e:
-    print(f"Status Sambungan: {e}")
+        url = st.secrets["SUPABASE_URL"]
+        key = st.secrets["SUPABASE_KEY"]
+        supabase: Client = dapatkan_supabase(url, key)
+    except KeyError:
+        st.error("Ralat: Rahsia 'SUPABASE_URL' atau 'SUPABASE_KEY' tidak ditemui.")
+        st.stop()
+    except Exception as e:
+        print(f"Status Sambungan: {e}")
 
 # ==============================================================================
 # 2. FUNGSI LOG MASUK & KESELAMATAN
@@ -67,308 +85,128 @@ def check_password():
 if not check_password():
     st.stop()
 
+NAMA_ANDA = st.secrets.get('NAMA_ANDA', 'Admin')
+
+# --- INSTRUMENTASI (lihat sawit/prestasi.py) ---
+# Setiap rerun direkod: panggilan storan, cache, PDF, eksport & rajah. Panel
+# di sidebar memaparkan larian terakhir; LOG_PRESTASI = fail JSONL (pilihan).
+if "perekod" not in st.session_state:
+    st.session_state.perekod = Perekod(int(st.secrets.get("SEJARAH_PRESTASI", 20)), st.secrets.get("LOG_PRESTASI"))
+perekod = st.session_state.perekod
+larian = perekod.mula(None)
+
 # ==============================================================================
 # 3. FUNGSI-FUNGSI LOGIK (KIRAAN, PDF, EXCEL)
 # ==============================================================================
-
-def kira_payroll(senarai_resit, total_kos):
-    KADAR_LORI_PER_KG = 0.07
-    jumlah_hasil_jualan = sum(resit['Hasil_RM'] for resit in senarai_resit)
-    jumlah_berat_kg = sum(resit['Berat_kg'] for resit in senarai_resit)
-    gaji_lori = jumlah_berat_kg * KADAR_LORI_PER_KG
-    baki_bersih = jumlah_hasil_jualan - gaji_lori - total_kos
-    gaji_penumbak = baki_bersih / 2
-    bahagian_pemilik = baki_bersih / 2
-    return {
-        "jumlah_hasil_jualan": jumlah_hasil_jualan,
-        "jumlah_berat_kg": jumlah_berat_kg,
-        "jumlah_berat_mt": jumlah_berat_kg / 1000,
-        "gaji_lori": gaji_lori,
-        "total_kos_operasi": total_kos,
-        "baki_bersih": baki_bersih,
-        "gaji_penumbak": gaji_penumbak,
-        "bahagian_pemilik": bahagian_pemilik,
-        "kadar_lori_per_kg": KADAR_LORI_PER_KG
-    }
-
-def jana_pdf_binary(bulan_tahun, senarai_resit, data_kiraan):
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # --- LOGO & HEADER ---
-    # Jika logo wujud, letak di penjuru kiri atas
-    if os.path.exists("logo.png"):
-        # Image(nama_fail, x, y, width)
-        pdf.image("logo.png", 10, 8, 25)
-        # Anjakkan tajuk ke bawah sedikit supaya tidak bertindih logo
-        pdf.set_y(35)
-    else:
-        pdf.set_y(20)
-
-    pdf.set_font("Helvetica", 'B', 18)
-    pdf.cell(0, 10, f"LADANG SAWIT SATIN LUNG MANIS", ln=True, align='C')
-    pdf.set_font("Helvetica", 'B', 14)
-    pdf.cell(0, 10, f"Laporan Kiraan Gaji - {bulan_tahun}", ln=True, align='C')
-    pdf.ln(10)
-    
-    # Bahagian 1: Jualan
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Bahagian 1: Butiran Jualan (Resit)", ln=True)
-    pdf.set_font("Helvetica", size=11)
-    for i, resit in enumerate(senarai_resit):
-        gred = resit.get('Gred', 'N/A')
-        berat_kg = resit.get('Berat_kg', 0)
-        harga_per_mt = resit.get('Harga_RM_per_MT', 0)
-        hasil_resit = resit.get('Hasil_RM', 0)
-        teks_resit = f"  Resit #{i+1} (Gred {gred}): {berat_kg:.2f} kg @ RM{harga_per_mt:.2f}/MT = RM{hasil_resit:.2f}"
-        pdf.cell(0, 8, teks_resit, ln=True)
-    pdf.ln(5)
-    
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 8, f"Jumlah Berat Keseluruhan: {data_kiraan.get('jumlah_berat_kg', 0):.2f} kg", ln=True)
-    pdf.cell(0, 8, f"Jumlah Hasil Jualan Kasar: RM{data_kiraan.get('jumlah_hasil_jualan', 0):.2f}", ln=True)
-    pdf.ln(10)
-
-    # Bahagian 2: Kiraan Gaji
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Bahagian 2: Pengiraan Gaji dan Pembahagian", ln=True)
-    
-    # Gaji Lori
-    pdf.set_font("Helvetica", 'BU', 11)
-    pdf.cell(0, 8, "Gaji Pekerja 1 (Lori):", ln=True)
-    pdf.set_font("Helvetica", size=11)
-    pdf.cell(0, 8, f"  Kiraan: {data_kiraan.get('jumlah_berat_kg', 0):.2f} kg x RM{data_kiraan.get('kadar_lori_per_kg', 0.07):.2f}/kg", ln=True)
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 8, f"  Jumlah Gaji Lori = RM{data_kiraan.get('gaji_lori', 0):.2f}", ln=True)
-    pdf.ln(5)
-
-    # Kos Operasi
-    pdf.set_font("Helvetica", 'BU', 11)
-    pdf.cell(0, 8, "Kos Operasi Bulanan (Baja, Racun, dll):", ln=True)
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 8, f"  Jumlah Kos Operasi = RM{data_kiraan.get('total_kos_operasi', 0):.2f}", ln=True)
-    pdf.ln(5)
-
-    # Baki Bersih
-    pdf.set_font("Helvetica", 'BU', 11)
-    pdf.cell(0, 8, "Hasil Bersih (Untuk Dibahagi):", ln=True)
-    pdf.set_font("Helvetica", size=11)
-    pdf.cell(0, 8, f"  Kiraan: RM{data_kiraan.get('jumlah_hasil_jualan', 0):.2f} (Jualan) - RM{data_kiraan.get('gaji_lori', 0):.2f} (Lori) - RM{data_kiraan.get('total_kos_operasi', 0):.2f} (Kos Operasi)", ln=True)
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 8, f"  Hasil Bersih = RM{data_kiraan.get('baki_bersih', 0):.2f}", ln=True)
-    pdf.ln(5)
-
-    # Pembahagian 50/50
-    pdf.set_font("Helvetica", 'BU', 11)
-    pdf.cell(0, 8, "Pembahagian Hasil Bersih (50/50):", ln=True)
-    pdf.set_font("Helvetica", size=11)
-    pdf.cell(0, 8, f"  Kiraan: RM{data_kiraan.get('baki_bersih', 0):.2f} / 2", ln=True)
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 8, f"  Gaji Pekerja 2 (Penumbak) = RM{data_kiraan.get('gaji_penumbak', 0):.2f}", ln=True)
-    pdf.cell(0, 8, f"  Bahagian Pemilik Ladang = RM{data_kiraan.get('bahagian_pemilik', 0):.2f}", ln=True)
-    pdf.ln(15)
-    
-    # Footer
-    pdf.set_font("Helvetica", 'I', 9)
-    pdf.cell(0, 5, "Laporan ini disediakan oleh:", ln=True, align='L')
-    pdf.set_font("Helvetica", 'B', 9)
-    pdf.cell(0, 5, "Mohamad Saifullah Satin", ln=True, align='L')
-    pdf.set_font("Helvetica", 'I', 9)
-    pdf.cell(0, 5, "Telefon: 019-840 6421", ln=True, align='L')
-    pdf.cell(0, 5, "Email: msaifullahsatin@gmail.com", ln=True, align='L')
-    tarikh_jana = datetime.date.today().strftime("%d-%m-%Y")
-    pdf.set_y(-15)
-    pdf.set_font("Helvetica", 'I', 8)
-    nama_anda = st.secrets.get('NAMA_ANDA', 'Admin')
-    pdf.cell(0, 10, f"Laporan dijana secara automatik pada {tarikh_jana} oleh {nama_anda}", ln=True, align='C')
-    
-    return bytes(pdf.output(dest='S'))
-
-def jana_pdf_berkelompok(laporan_title, df_gaji_filtered, df_jualan_filtered, df_kos_filtered):
-    pdf = FPDF()
-    pdf.add_page()
-    
-    # --- LOGO & HEADER ---
-    if os.path.exists("logo.png"):
-        pdf.image("logo.png", 10, 8, 25)
-        pdf.set_y(35)
-    else:
-        pdf.set_y(20)
-
-    pdf.set_font("Helvetica", 'B', 18)
-    pdf.cell(0, 10, f"LADANG SAWIT SATIN LUNG MANIS", ln=True, align='C')
-    pdf.set_font("Helvetica", 'B', 16)
-    pdf.cell(0, 10, f"Ringkasan Laporan - {laporan_title}", ln=True, align='C')
-    pdf.ln(10)
-
-    # 2. Ringkasan Keseluruhan (KPI)
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Ringkasan Prestasi Keseluruhan", ln=True)
-    
-    total_jualan = df_gaji_filtered['JumlahJualan_RM'].sum()
-    total_berat = df_gaji_filtered['JumlahBerat_kg'].sum()
-    total_gaji_lori = df_gaji_filtered['GajiLori_RM'].sum()
-    total_kos_ops = df_gaji_filtered.get('total_kos_operasi', 0.0).sum()
-    total_gaji_penumbak = df_gaji_filtered['GajiPenumbak_RM'].sum()
-    total_bahagian_pemilik = df_gaji_filtered['BahagianPemilik_RM'].sum()
-    
-    pdf.set_font("Helvetica", '', 11)
-    pdf.cell(0, 8, f"Jumlah Jualan Kasar: RM {total_jualan:,.2f}", ln=True)
-    pdf.cell(0, 8, f"Jumlah Berat Jualan: {total_berat:,.2f} kg", ln=True)
-    pdf.cell(0, 8, f"Jumlah Kos Operasi: RM {total_kos_ops:,.2f}", ln=True)
-    pdf.cell(0, 8, f"Jumlah Gaji Lori: RM {total_gaji_lori:,.2f}", ln=True)
-    pdf.cell(0, 8, f"Jumlah Gaji Penumbak: RM {total_gaji_penumbak:,.2f}", ln=True)
-    pdf.cell(0, 8, f"Jumlah Bahagian Pemilik: RM {total_bahagian_pemilik:,.2f}", ln=True)
-    pdf.ln(10)
-
-    # 3. Jadual Ringkasan Mengikut Bulan
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Pecahan Mengikut Bulan", ln=True)
-    
-    w_bulan = 40
-    w_angka = 25 
-    
-    pdf.set_font("Helvetica", 'B', 8)
-    pdf.cell(w_bulan, 8, "Bulan", 1, align='C')
-    pdf.cell(w_angka, 8, "Jualan (RM)", 1, align='C')
-    pdf.cell(w_angka, 8, "Kos Ops (RM)", 1, align='C')
-    pdf.cell(w_angka, 8, "Gaji Lori (RM)", 1, align='C')
-    pdf.cell(w_angka, 8, "Gaji Pnumbak (RM)", 1, align='C')
-    pdf.cell(w_angka, 8, "Pemilik (RM)", 1, align='C')
-    pdf.cell(w_angka, 8, "Berat (kg)", 1, ln=True, align='C')
-
-    pdf.set_font("Helvetica", '', 8)
-    try:
-        peta_bulan = {
-            "Januari": 1, "Februari": 2, "Mac": 3, "April": 4, "Mei": 5, "Jun": 6,
-            "Julai": 7, "Ogos": 8, "September": 9, "Oktober": 10, "November": 11, "Disember": 12
-        }
-        df_gaji_filtered['BulanString'] = df_gaji_filtered['BulanTahun'].str.split(' ', expand=True)[0]
-        df_gaji_filtered['Tahun'] = df_gaji_filtered['BulanTahun'].str.split(' ', expand=True)[1].astype(int)
-        df_gaji_filtered['BulanNombor'] = df_gaji_filtered['BulanString'].map(peta_bulan)
-        df_gaji_sorted = df_gaji_filtered.sort_values(by=['Tahun', 'BulanNombor'])
-    except Exception:
-        df_gaji_sorted = df_gaji_filtered
-        
-    for index, data in df_gaji_sorted.iterrows():
-        pdf.cell(w_bulan, 8, data['BulanTahun'], 1)
-        pdf.cell(w_angka, 8, f"{data['JumlahJualan_RM']:,.2f}", 1, align='R')
-        pdf.cell(w_angka, 8, f"{data.get('total_kos_operasi', 0.0):,.2f}", 1, align='R')
-        pdf.cell(w_angka, 8, f"{data['GajiLori_RM']:,.2f}", 1, align='R')
-        pdf.cell(w_angka, 8, f"{data['GajiPenumbak_RM']:,.2f}", 1, align='R')
-        pdf.cell(w_angka, 8, f"{data['BahagianPemilik_RM']:,.2f}", 1, align='R')
-        pdf.cell(w_angka, 8, f"{data['JumlahBerat_kg']:,.2f}", 1, ln=True, align='R')
-    
-    pdf.ln(10)
-    
-    # 4. Ringkasan Pecahan Jualan (Gred) & Kos
-    pdf.set_font("Helvetica", 'B', 12)
-    pdf.cell(0, 10, "Pecahan Keseluruhan (Gred & Kos)", ln=True)
-    pdf.set_font("Helvetica", '', 11)
-
-    # Pecahan Gred
-    gred_a_berat = df_jualan_filtered[df_jualan_filtered['Gred'] == 'A']['Berat_kg'].sum()
-    gred_a_hasil = df_jualan_filtered[df_jualan_filtered['Gred'] == 'A']['Hasil_RM'].sum()
-    gred_b_berat = df_jualan_filtered[df_jualan_filtered['Gred'] == 'B']['Berat_kg'].sum()
-    gred_b_hasil = df_jualan_filtered[df_jualan_filtered['Gred'] == 'B']['Hasil_RM'].sum()
-    gred_c_berat = df_jualan_filtered[df_jualan_filtered['Gred'] == 'C']['Berat_kg'].sum()
-    gred_c_hasil = df_jualan_filtered[df_jualan_filtered['Gred'] == 'C']['Hasil_RM'].sum()
-    
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(95, 8, "Pecahan Jualan (Gred)", 1, ln=True, align='C')
-    pdf.set_font("Helvetica", '', 10)
-    pdf.cell(0, 8, f"Gred A: {gred_a_berat:,.2f} kg  |  RM {gred_a_hasil:,.2f}", ln=True)
-    pdf.cell(0, 8, f"Gred B: {gred_b_berat:,.2f} kg  |  RM {gred_b_hasil:,.2f}", ln=True)
-    pdf.cell(0, 8, f"Gred C: {gred_c_berat:,.2f} kg  |  RM {gred_c_hasil:,.2f}", ln=True)
-    pdf.ln(5)
-
-    # Pecahan Kos
-    pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(95, 8, "Pecahan Kos Operasi", 1, ln=True, align='C')
-    pdf.set_font("Helvetica", '', 10)
-    if not df_kos_filtered.empty:
-        kos_by_type = df_kos_filtered.groupby('JenisKos')['Jumlah_RM'].sum()
-        for jenis, jumlah in kos_by_type.items():
-            pdf.cell(0, 8, f"{jenis}: RM {jumlah:,.2f}", ln=True)
-    else:
-        pdf.cell(0, 8, "Tiada kos operasi direkodkan.", ln=True)
-    
-    # 5. Footer
-    tarikh_jana = datetime.date.today().strftime("%d-%m-%Y")
-    pdf.set_y(-15)
-    pdf.set_font("Helvetica", 'I', 8)
-    nama_anda = st.secrets.get('NAMA_ANDA', 'Admin')
-    pdf.cell(0, 10, f"Laporan dijana secara automatik pada {tarikh_jana} oleh {nama_anda}", ln=True, align='C')
-    
-    return bytes(pdf.output(dest='S'))
-
-def to_excel(df_gaji, df_jualan, df_kos):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df_gaji.to_excel(writer, sheet_name='Ringkasan_Gaji', index=False)
-        df_jualan.to_excel(writer, sheet_name='Butiran_Jualan', index=False)
-        df_kos.to_excel(writer, sheet_name='Butiran_Kos', index=False)
-    processed_data = output.getvalue()
-    return processed_data
-
-def proses_dataframe_bulanan(df_gaji_raw):
-    if df_gaji_raw.empty:
-        return pd.DataFrame(columns=['BulanTahun', 'Tahun', 'BulanNombor', 'BulanString', 'JumlahJualan_RM', 'total_kos_operasi', 'Keuntungan_RM'])
-
-    df = df_gaji_raw.copy()
-    if 'total_kos_operasi' not in df.columns:
-        df['total_kos_operasi'] = 0.0
-    df['total_kos_operasi'] = df['total_kos_operasi'].fillna(0)
-
-    df['Keuntungan_RM'] = df['JumlahJualan_RM'] - df['GajiLori_RM'] - df['total_kos_operasi']
-
-    try:
-        peta_bulan = {
-            "Januari": 1, "Februari": 2, "Mac": 3, "April": 4, "Mei": 5, "Jun": 6,
-            "Julai": 7, "Ogos": 8, "September": 9, "Oktober": 10, "November": 11, "Disember": 12
-        }
-        df_split = df['BulanTahun'].str.split(' ', expand=True)
-        df['BulanString'] = df_split[0]
-        df['Tahun'] = df_split[1].astype(int)
-        df['BulanNombor'] = df['BulanString'].map(peta_bulan)
-    except Exception:
-        df['Tahun'] = 2000
-        df['BulanNombor'] = 1
-        df['BulanString'] = 'N/A'
-
-    return df
+# Logik teras kini dalam pakej 'sawit' (kiraan.py, laporan.py, eksport.py,
+# data.py) supaya boleh diimport tanpa Streamlit dan digunakan oleh CLI.
 
 # ==============================================================================
 # 4. MUATKAN DATA
 # ==============================================================================
-@st.cache_data(ttl=600)
-def muat_data():
+SAIZ_HALAMAN = int(st.secrets.get("SAIZ_HALAMAN", 1000))
+PEKERJA_MUAT = int(st.secrets.get("PEKERJA_MUAT", 6))
+
+@st.cache_resource
+def dapatkan_storan(mod, _klien):
+    return StoranDiukur(buat_storan(mod, _klien, st.secrets.get("FAIL_SQLITE", "data/sawit.db"), SAIZ_HALAMAN, PEKERJA_MUAT))
+
+@st.cache_resource
+def dapatkan_salinan(_storan, latar):
+    # Mod supabase: stale-while-revalidate. Pengguna menerima salinan terakhir
+    # serta-merta; benang latar menyegarkan & menukarnya secara atomik, dengan
+    # backoff apabila Supabase tidak dapat dihubungi atau dijeda. Mod sqlite/
+    # berlapis membaca fail tempatan (beberapa ms), jadi tiada penyegar.
+    salinan = SalinanTempatan(_storan)
+    if latar:
+        salinan.mulakan_penyegar()
+    return salinan
+
+@st.cache_resource
+def dapatkan_kiraan_semula(mod, _storan, _salinan):
+    # Senarai bulan kotor dikongsi semua sesi (lihat KiraanSemula dalam sawit/data.py)
+    return KiraanSemula(_storan, _salinan)
+
+storan = dapatkan_storan(MOD_STORAN, supabase)
+salinan = dapatkan_salinan(storan, MOD_STORAN == "supabase")
+kiraan_semula = dapatkan_kiraan_semula(MOD_STORAN, storan, salinan)
+status_sambungan = salinan.status
+
+# Setiap halaman memuat hanya apa yang diperlukannya. rekod_gaji (satu baris
+# sebulan) menjadi senarai bulan & data dashboard; resit dan kos dihiris ikut
+# bulan/julat melalui indeks Tempoh. Sejarah penuh hanya untuk backup.
+@diukur('muat')
+def muat_data(jadual=('rekod_gaji', 'rekod_jualan', 'rekod_kos')):
     try:
-        response_gaji = supabase.table('rekod_gaji').select("*").order('id', desc=False).execute()
-        df_gaji = pd.DataFrame(response_gaji.data)
-        
-        response_jualan = supabase.table('rekod_jualan').select("*").order('id', desc=False).execute()
-        df_jualan = pd.DataFrame(response_jualan.data)
-        
-        response_kos = supabase.table('rekod_kos').select("*").order('id', desc=False).execute()
-        df_kos = pd.DataFrame(response_kos.data)
-        
-        expected_gaji_cols = ['BulanTahun', 'JumlahJualan_RM', 'JumlahBerat_kg', 'GajiLori_RM', 
-                              'GajiPenumbak_RM', 'BahagianPemilik_RM', 'total_kos_operasi', 'id', 'created_at']
-        expected_jualan_cols = ['BulanTahun', 'IDResit', 'Gred', 'Berat_kg', 'Harga_RM_per_MT', 'Hasil_RM', 'id', 'created_at']
-        expected_kos_cols = ['BulanTahun', 'JenisKos', 'Jumlah_RM', 'id', 'created_at']
-
-        if df_gaji.empty: df_gaji = pd.DataFrame(columns=expected_gaji_cols)
-        if df_jualan.empty: df_jualan = pd.DataFrame(columns=expected_jualan_cols)
-        if df_kos.empty: df_kos = pd.DataFrame(columns=expected_kos_cols)
-
-        return df_gaji, df_jualan, df_kos
+        return salinan.baca(jadual)
     except Exception as e:
         st.error(f"Ralat database: {e}")
-        return (pd.DataFrame(), pd.DataFrame(), pd.DataFrame())
-
-df_gaji_raw, df_jualan_raw, df_kos_raw = muat_data()
-df_gaji_processed = proses_dataframe_bulanan(df_gaji_raw)
+        return salinan.bingkai()
+
+def data_gaji():
+    df_gaji_raw = muat_data(('rekod_gaji',))[0]
+    return df_gaji_raw, proses_dataframe_bulanan(df_gaji_raw)
+
+def data_gaji_versi():
+    # Untuk cache berkunci versi: bingkai dan versi daripada satu bacaan salinan
+    muat_data(('rekod_gaji',))
+    versi, (df_gaji_raw, _, _) = salinan.bingkai_versi()
+    return versi, df_gaji_raw, proses_dataframe_bulanan(df_gaji_raw)
+
+def input_kadar(df_gaji, tempoh, kunci):
+    # Kadar bulan 'tempoh' (lalai: kadar tersimpan bulan itu/sebelumnya); diubah apabila kadar baharu dirunding.
+    # Widget berkunci mengekalkan nilainya, jadi isi semula apabila bulan lain dipilih.
+    if st.session_state.get(f"tempoh_kadar_{kunci}") != tempoh:
+        kadar = kadar_tempoh(df_gaji, tempoh)
+        st.session_state[f"tempoh_kadar_{kunci}"] = tempoh
+        st.session_state[f"kl_{kunci}"] = float(kadar['KadarLori_RM_per_kg'])
+        st.session_state[f"np_{kunci}"] = float(kadar['NisbahPenumbak']) * 100
+    c1, c2 = st.columns(2)
+    lori = c1.number_input("Kadar Lori (RM/kg):", 0.0, 1.0, step=0.005, format="%.3f", key=f"kl_{kunci}")
+    penumbak = c2.number_input("Bahagian Penumbak (%):", 0.0, 100.0, step=5.0, key=f"np_{kunci}")
+    return lori, penumbak / 100
+
+@pantau_cache(st.cache_data(ttl=SELANG_SEGERAK_SAAT, max_entries=32))
+def muat_tempoh(versi, jadual, mula, akhir):
+    # jadual = tuple nama jadual; pulangkan satu DataFrame bagi setiap jadual
+    return ambil_tempoh(storan, jadual, mula, akhir, salinan)
+
+@st.cache_resource
+def dapatkan_kolam_pdf():
+    # Kolam proses kekal supaya pekerja (import fpdf dll) hanya dimulakan sekali
+    return buat_kolam_pekerja()
+
+# --- ROLLUP BULANAN (lihat sql/001_rollup_bulanan.sql) ---
+# Jumlah pra-agregat bulan x gred dan bulan x jenis kos. Dibaca dari view
+# Supabase jika ada; jika tidak, dikira daripada salinan tempatan.
+@pantau_cache(st.cache_data(max_entries=8))
+def muat_rollup(versi, mula=None, akhir=None):
+    # mula/akhir = Tempoh yyyymm; julat ditapis di pangkalan data melalui indeks
+    return ambil_rollup(storan, salinan, mula, akhir)
+
+# --- RAJAH DASHBOARD (lihat sawit/carta.py) ---
+# Dibina sekali bagi setiap versi data dan dikongsi semua sesi; rerun yang
+# hanya menukar tab/halaman tidak membina semula rajah. Bingkai (_ = tidak
+# di-hash) mesti datang daripada bacaan yang sama dengan 'versi'.
+@pantau_cache(st.cache_resource(max_entries=2), kategori='carta')
+def rajah_dashboard(versi, _df_gaji, _rollup_jualan, _rollup_kos):
+    from sawit.carta import rajah_pai, rajah_tren  # plotly dimuat hanya apabila dashboard dibuka
+    rajah = {'tren': rajah_tren(_df_gaji)}
+    if not _rollup_jualan.empty:
+        rajah['gred'] = rajah_pai(_rollup_jualan, 'Gred', 'Hasil_RM', "Pecahan Jualan (Gred)")
+    if not _rollup_kos.empty and _rollup_kos['Jumlah_RM'].sum() > 0:
+        rajah['kos'] = rajah_pai(_rollup_kos, 'JenisKos', 'Jumlah_RM', "Pecahan Kos")
+    return rajah
+
+@pantau_cache(st.cache_resource(max_entries=2), kategori='kiraan')
+def kubus_tahunan(versi, _df_gaji):
+    # Tahun x bulan x metrik; tab perbandingan hanya menghirisnya
+    return KubusTahunan(_df_gaji)
+
+def papar_rajah(fig):
+    # Pensirian rajah ke pelayar dimasa sebagai fasa 'carta'
+    with fasa('carta', 'plotly_chart'):
+        st.plotly_chart(fig, use_container_width=True)
 
 # ==============================================================================
 # 5. PAPARAN UTAMA
@@ -384,10 +222,24 @@ page = st.sidebar.radio("Pilih Halaman:", ["📊 Dashboard Statistik",
                                           "📝 Kemasukan Data Baru", 
                                           "🖨️ Urus & Cetak Semula", 
                                           "📈 Laporan Berkelompok"])
+larian.halaman = page
 
 if st.sidebar.button("Segarkan Semula Data (Refresh)"):
-    st.cache_data.clear()
-    st.rerun()
+    if salinan.muat_semula_penuh():
+        st.sidebar.info("🔄 Data sedang dimuat semula di latar; paparan dikemas kini sebaik sahaja siap.")
+    else:
+        st.rerun()
+papar_prestasi = st.sidebar.toggle("⏱️ Panel Prestasi", value=bool(st.secrets.get("PANEL_PRESTASI", False)))
+
+status_segerak = getattr(storan, "status", None)
+if status_segerak and status_segerak.get("menunggu"):
+    st.sidebar.info(f"🔄 {status_segerak['menunggu']} perubahan menunggu segerak ke Supabase.")
+    # Cth. fungsi ganti_bulan belum dipasang: perubahan kekal dalam outbox sehingga dibaiki
+    if status_segerak.get("ok") is False:
+        st.sidebar.error(f"Segerak ke Supabase gagal: {status_segerak['ralat']}")
+if status_sambungan.get("ok") is False:
+    st.sidebar.warning(f"⚠️ Database tidak dapat dihubungi (semakan terakhir {status_sambungan['masa']:%H:%M}, "
+                       f"cuba semula {status_sambungan['cuba_semula']:%H:%M}). Data dipaparkan dari salinan terakhir.")
 
 st.sidebar.error("Klik untuk keluar dari sistem.")
 if st.sidebar.button("Log Keluar"):
@@ -397,8 +249,10 @@ if st.sidebar.button("Log Keluar"):
 # --- HALAMAN 1: DASHBOARD ---
 if page == "📊 Dashboard Statistik":
     st.header("📊 Dashboard Statistik")
+    versi, df_gaji_raw, df_gaji_processed = data_gaji_versi()
+    rollup_jualan, rollup_kos = muat_rollup(versi)
     
-    tab_tren, tab_perbandingan = st.tabs(["📈 Tren Keseluruhan", "⚖️ Perbandingan Tahun-ke-Tahun"])
+    tab_tren, tab_perbandingan, tab_senario = st.tabs(["📈 Tren Keseluruhan", "⚖️ Perbandingan Tahun-ke-Tahun", "🧮 Senario Kadar"])
 
     with tab_tren:
         if df_gaji_processed.empty:
@@ -414,48 +268,69 @@ if page == "📊 Dashboard Statistik":
             c3.metric("Purata Pemilik (Bulanan)", f"RM{avg_monthly_owner:,.2f}")
             st.markdown("---")
             
+            rajah = rajah_dashboard(versi, df_gaji_processed, rollup_jualan, rollup_kos)
             st.subheader("Tren Jualan, Kos & Untung")
-            df_srt = df_gaji_processed.sort_values(by=['Tahun', 'BulanNombor'])
-            fig_tren = px.line(df_srt, x='BulanTahun', y=['JumlahJualan_RM', 'total_kos_operasi', 'Keuntungan_RM', 'BahagianPemilik_RM'], markers=True)
-            st.plotly_chart(fig_tren, use_container_width=True)
+            papar_rajah(rajah['tren'])
             
             st.subheader("Analisis Pecahan")
             cg1, cg2 = st.columns(2)
             with cg1:
-                if not df_jualan_raw.empty:
-                    fig_p = px.pie(df_jualan_raw, names='Gred', values='Hasil_RM', title="Pecahan Jualan (Gred)")
-                    st.plotly_chart(fig_p, use_container_width=True)
+                if 'gred' in rajah:
+                    papar_rajah(rajah['gred'])
             with cg2:
-                if not df_kos_raw.empty and df_kos_raw['Jumlah_RM'].sum() > 0:
-                    fig_k = px.pie(df_kos_raw, names='JenisKos', values='Jumlah_RM', title="Pecahan Kos")
-                    st.plotly_chart(fig_k, use_container_width=True)
+                if 'kos' in rajah:
+                    papar_rajah(rajah['kos'])
                 else:
                     st.info("Tiada rekod kos.")
 
     with tab_perbandingan:
         st.subheader("Perbandingan Tahun-ke-Tahun")
-        yrs = sorted(df_gaji_processed['Tahun'].unique(), reverse=True)
-        if len(yrs) < 2:
-            st.info("Perlukan min 2 tahun data.")
+        kubus = kubus_tahunan(versi, df_gaji_processed)
+        yrs = kubus.tahun[::-1]
+        if not yrs:
+            st.info("Tiada data.")
         else:
-            cy1, cy2 = st.columns(2)
-            y1 = cy1.selectbox("Tahun 1:", yrs, index=1)
-            y2 = cy2.selectbox("Tahun 2:", yrs, index=0)
-
-            if y1 == y2:
-                st.error("Pilih tahun berbeza.")
+            from sawit.carta import rajah_perbandingan
+            cy1, cy2, cy3 = st.columns([2, 1, 1])
+            pilih = cy1.multiselect("Tahun:", yrs, default=yrs[:2])
+            metrik = cy2.selectbox("Metrik:", kubus.metrik)
+            mod = cy3.selectbox("Paparan:", list(MOD_KUBUS))
+
+            if not pilih:
+                st.info("Pilih sekurang-kurangnya satu tahun.")
             else:
-                bulan_inv = {1: "Jan", 2: "Feb", 3: "Mac", 4: "Apr", 5: "Mei", 6: "Jun", 7: "Jul", 8: "Ogos", 9: "Sep", 10: "Okt", 11: "Nov", 12: "Dis"}
-                
-                d1 = df_gaji_processed[df_gaji_processed['Tahun']==y1][['BulanNombor','JumlahJualan_RM','Keuntungan_RM']].add_suffix(f"_{y1}").rename(columns={f'BulanNombor_{y1}':'BN'})
-                d2 = df_gaji_processed[df_gaji_processed['Tahun']==y2][['BulanNombor','JumlahJualan_RM','Keuntungan_RM']].add_suffix(f"_{y2}").rename(columns={f'BulanNombor_{y2}':'BN'})
-                
-                dm = pd.merge(d1, d2, on='BN', how='outer').fillna(0)
-                dm['Bulan'] = dm['BN'].map(bulan_inv)
-                dm.sort_values('BN', inplace=True)
+                data = kubus.kepingan(sorted(pilih), metrik, mod)
+                fig_j = rajah_perbandingan(data, f"Perbandingan {metrik} - {mod}", 'bar' if mod == "Bulanan" else 'garis')
+                papar_rajah(fig_j)
 
-                fig_j = px.bar(dm, x='Bulan', y=[f'JumlahJualan_RM_{y1}', f'JumlahJualan_RM_{y2}'], barmode='group', title="Perbandingan Jualan")
-                st.plotly_chart(fig_j, use_container_width=True)
+    with tab_senario:
+        st.subheader("Senario Kadar Lori & Pembahagian")
+        if df_gaji_processed.empty:
+            st.info("Tiada data.")
+        else:
+            from sawit.carta import rajah_senario
+            cs1, cs2, cs3 = st.columns([1, 2, 2])
+            skop = cs1.selectbox("Tempoh:", ["Semua"] + sorted(df_gaji_processed['Tahun'].unique().tolist(), reverse=True), key="skop_senario")
+            teks_kadar = cs2.text_input("Kadar Lori (RM/kg, dipisah koma):", "0.06, 0.07, 0.08, 0.09", key="kadar_senario")
+            pilih_nisbah = cs3.multiselect("Bahagian Penumbak (%):", list(range(30, 75, 5)), default=[50, 60], key="nisbah_senario")
+            try:
+                senarai_kadar = sorted({float(x) for x in teks_kadar.replace(';', ',').split(',') if x.strip()})
+            except ValueError:
+                senarai_kadar = []
+            if not senarai_kadar or not pilih_nisbah:
+                st.info("Masukkan sekurang-kurangnya satu kadar lori dan satu nisbah.")
+            else:
+                df_s = df_gaji_processed if skop == "Semua" else df_gaji_processed[df_gaji_processed['Tahun'] == skop]
+                senario = kira_senario(df_s, senarai_kadar, [n / 100 for n in sorted(pilih_nisbah)])
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Bulan", len(df_s))
+                m2.metric("Penumbak (Sebenar)", f"RM{df_s['GajiPenumbak_RM'].sum():,.2f}")
+                m3.metric("Pemilik (Sebenar)", f"RM{df_s['BahagianPemilik_RM'].sum():,.2f}")
+                metrik = st.radio("Papar:", ["BahagianPemilik_RM", "GajiPenumbak_RM", "GajiLori_RM"], horizontal=True, key="metrik_senario")
+                jadual = senario.assign(Nisbah=senario['NisbahPenumbak'].map(lambda n: f"{n * 100:g}/{100 - n * 100:g}"))
+                st.dataframe(jadual.pivot(index='KadarLori_RM_per_kg', columns='Nisbah', values=metrik)
+                             .rename_axis(index="Kadar Lori (RM/kg)", columns="Penumbak/Pemilik").style.format("RM{:,.2f}"))
+                papar_rajah(rajah_senario(senario, metrik, df_s[metrik].sum()))
 
 # --- HALAMAN 2: KEMASUKAN DATA ---
 elif page == "📝 Kemasukan Data Baru":
@@ -466,17 +341,77 @@ elif page == "📝 Kemasukan Data Baru":
     thn_list = list(range(thn_curr - 5, thn_curr + 2))[::-1]
 
     with tj:
-        st.subheader("Borang Gaji")
-        with st.form("f_gaji"):
+        # Bulan puncak (ratusan tiket kilang): tampal/muat naik, bukan grid boleh edit
+        mod_g = st.radio("Cara:", ["Borang", "Tiket Pukal (Tampal / Muat Naik)"], horizontal=True, key="mod_g")
+        sub_g = False
+        if mod_g == "Borang":
+            st.subheader("Borang Gaji")
+            # Bulan di luar borang supaya kadar diisi ikut bulan yang dipilih (bukan hari ini)
             c1, c2 = st.columns(2)
             bg = c1.selectbox("Bulan:", bln_list, index=datetime.date.today().month-1, key="bg")
             tg = c2.selectbox("Tahun:", thn_list, key="tg")
             bt_gaji = f"{bg} {tg}"
-            st.info(f"Untuk: **{bt_gaji}**")
-            
-            df_in = pd.DataFrame([{"Gred": "A", "Berat_kg": 0.0, "Harga_RM_per_MT": 0.0}, {"Gred": "B", "Berat_kg": 0.0, "Harga_RM_per_MT": 0.0}])
-            ed_j = st.data_editor(df_in, num_rows="dynamic", column_config={"Gred": st.column_config.SelectboxColumn("Gred", options=["A","B","C"])})
-            sub_g = st.form_submit_button("Simpan Gaji")
+            with st.form("f_gaji"):
+                st.info(f"Untuk: **{bt_gaji}**")
+                
+                df_in = pd.DataFrame([{"Gred": "A", "Berat_kg": 0.0, "Harga_RM_per_MT": 0.0}, {"Gred": "B", "Berat_kg": 0.0, "Harga_RM_per_MT": 0.0}])
+                ed_j = st.data_editor(df_in, num_rows="dynamic", column_config={"Gred": st.column_config.SelectboxColumn("Gred", options=["A","B","C"])})
+                kadar_g = input_kadar(muat_data(('rekod_gaji',))[0], tempoh_dari_bulan(bt_gaji), "g")
+                sub_g = st.form_submit_button("Simpan Gaji")
+        else:
+            st.subheader("Tiket Pukal")
+            c1, c2 = st.columns(2)
+            bp = c1.selectbox("Bulan:", bln_list, index=datetime.date.today().month-1, key="bp")
+            tp = c2.selectbox("Tahun:", thn_list, key="tp")
+            bt_tiket = f"{bp} {tp}"
+            teks_tiket = st.text_area("Tampal tiket (Gred, Berat_kg, Harga_RM_per_MT - satu tiket sebaris, kepala pilihan):",
+                                      height=150, key="teks_tiket")
+            fail_tiket = st.file_uploader("Atau muat naik CSV/Excel:", type=["csv", "xlsx"], key="fail_tiket")
+            kadar_t = input_kadar(muat_data(('rekod_gaji',))[0], tempoh_dari_bulan(bt_tiket), "t")
+            if st.button("Semak Tiket", key="semak_tiket"):
+                sumber = fail_tiket if fail_tiket is not None else teks_tiket
+                if isinstance(sumber, str) and not sumber.strip(): st.error("Tiada tiket.")
+                else:
+                    try:
+                        st.session_state.tiket = (bt_tiket, *sahkan_tiket(sumber, bt_tiket))
+                        st.session_state.pdf_tiket = None
+                    except (ValueError, pd.errors.ParserError) as e: st.error(f"Tiket tidak dapat dibaca: {e}")
+
+            tiket = st.session_state.get("tiket")
+            if tiket and tiket[0] == bt_tiket:
+                _, sah, ditolak = tiket
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Tiket Sah", f"{len(sah):,}")
+                m2.metric("Jumlah Berat", f"{sah['Berat_kg'].sum():,.2f} kg")
+                m3.metric("Jumlah Hasil", f"RM{sah['Hasil_RM'].sum():,.2f}")
+                st.dataframe(ringkasan_tiket(sah))
+                # Pratonton berhalaman: hanya SAIZ_PRATONTON baris dihantar ke pelayar
+                bil_hal = max(1, -(-len(sah) // SAIZ_PRATONTON))
+                hal = st.number_input(f"Halaman (1-{bil_hal}):", 1, bil_hal, key="hal_tiket")
+                st.dataframe(sah.iloc[(hal - 1) * SAIZ_PRATONTON:hal * SAIZ_PRATONTON], hide_index=True)
+                if not ditolak.empty:
+                    st.warning(f"{len(ditolak)} baris ditolak (tidak akan disimpan).")
+                    st.dataframe(ditolak.head(200), hide_index=True)
+                    st.download_button("Download Baris Ditolak", ditolak.to_csv(index=False).encode('utf-8'), "tiket_ditolak.csv", "text/csv")
+                ganti_tiket = st.checkbox("Ganti data bulan ini jika sudah wujud", key="ganti_tiket")
+                if st.button(f"Simpan {len(sah):,} Tiket", key="simpan_tiket", disabled=sah.empty):
+                    t_tiket = tempoh_dari_bulan(bt_tiket)
+                    gaji_bulan, kos_bulan = ambil_tempoh(storan, ('rekod_gaji', 'rekod_kos'), t_tiket, t_tiket, salinan)
+                    if not gaji_bulan.empty and not ganti_tiket: st.error("Data wujud.")
+                    else:
+                        l_res = sah.to_dict('records')
+                        dat = kira_payroll(l_res, kos_bulan['Jumlah_RM'].sum(), *kadar_t)
+                        try:
+                            # Satu ganti_bulan atomik: semua tiket + ringkasan gaji dalam satu permintaan
+                            storan.ganti_bulan(bt_tiket, gaji=[baris_rekod_gaji(bt_tiket, dat)], jualan=l_res)
+                            salinan.batalkan_bulan(bt_tiket, jadual=['rekod_gaji', 'rekod_jualan'])
+                            st.session_state.tiket = None
+                            st.session_state.pdf_tiket = (jana_pdf_bercache(bt_tiket, l_res, dat, NAMA_ANDA), f"Laporan_{bt_tiket}.pdf")
+                            st.success(f"{len(l_res):,} tiket disimpan!")
+                        except Exception as e: st.error(str(e))
+            if st.session_state.get("pdf_tiket"):
+                data_pdf, nama_pdf = st.session_state.pdf_tiket
+                st.download_button("Download PDF", data_pdf, nama_pdf, "application/pdf")
 
     with tk:
         st.subheader("Borang Kos")
@@ -497,33 +432,33 @@ elif page == "📝 Kemasukan Data Baru":
             lk = ed_k[ed_k['Jumlah_RM']>0].to_dict('records')
             for k in lk: k['BulanTahun'] = bt_kos
             try:
-                if not df_kos_raw.empty: supabase.table('rekod_kos').delete().eq('BulanTahun', bt_kos).execute()
-                supabase.table('rekod_kos').insert(lk).execute()
-                st.cache_data.clear()
-                st.success("Kos disimpan!")
+                storan.ganti_bulan(bt_kos, kos=lk)
+                salinan.batalkan_bulan(bt_kos, jadual=['rekod_kos'])
+                # Gaji bulan itu (jika sudah ada) diterbitkan semula dengan kos baharu
+                kiraan_semula.tandakan(bt_kos)
+                st.success("Kos disimpan!" + (" Ringkasan gaji dikira semula." if kiraan_semula.jalankan() else ""))
             except Exception as e: st.error(str(e))
 
     if sub_g:
+        # Semakan sebelum tulis: satu bulan terus dari backend (tanpa cache)
+        t_gaji = tempoh_dari_bulan(bt_gaji)
+        gaji_bulan, kos_bulan = ambil_tempoh(storan, ('rekod_gaji', 'rekod_kos'), t_gaji, t_gaji, salinan)
         if ed_j['Berat_kg'].sum() == 0: st.error("Tiada resit dimasukkan.")
-        elif not df_gaji_raw.empty and bt_gaji in df_gaji_raw['BulanTahun'].values: st.error("Data wujud.")
+        elif not gaji_bulan.empty: st.error("Data wujud.")
         else:
-            kos_semasa = df_kos_raw[df_kos_raw['BulanTahun']==bt_gaji]['Jumlah_RM'].sum() if not df_kos_raw.empty else 0.0
-            l_res = ed_j[ed_j['Berat_kg']>0].to_dict('records')
-            for i, r in enumerate(l_res):
-                r['Hasil_RM'] = (r['Berat_kg']/1000)*r['Harga_RM_per_MT']
-                r['BulanTahun'] = bt_gaji
-                r['IDResit'] = i+1
+            kos_semasa = kos_bulan['Jumlah_RM'].sum()
+            l_res = sediakan_resit(ed_j, bt_gaji).to_dict('records')
             
-            dat = kira_payroll(l_res, kos_semasa)
-            pdf = jana_pdf_binary(bt_gaji, l_res, dat)
+            dat = kira_payroll(l_res, kos_semasa, *kadar_g)
+            pdf = jana_pdf_binary(bt_gaji, l_res, dat, NAMA_ANDA)
             
-            dg = {'BulanTahun': bt_gaji, 'JumlahJualan_RM': dat['jumlah_hasil_jualan'], 'JumlahBerat_kg': dat['jumlah_berat_kg'], 'GajiLori_RM': dat['gaji_lori'], 'GajiPenumbak_RM': dat['gaji_penumbak'], 'BahagianPemilik_RM': dat['bahagian_pemilik'], 'total_kos_operasi': dat['total_kos_operasi']}
-            dj = [{'BulanTahun': r['BulanTahun'], 'IDResit': r['IDResit'], 'Gred': r['Gred'], 'Berat_kg': r['Berat_kg'], 'Harga_RM_per_MT': r['Harga_RM_per_MT'], 'Hasil_RM': r['Hasil_RM']} for r in l_res]
+            dg = baris_rekod_gaji(bt_gaji, dat)
+            dj = l_res
 
             try:
-                supabase.table('rekod_gaji').insert(dg).execute()
-                supabase.table('rekod_jualan').insert(dj).execute()
-                st.cache_data.clear()
+                storan.ganti_bulan(bt_gaji, gaji=[dg], jualan=dj)
+                # ganti_bulan memadam resit lama bulan ini; segerak delta tidak nampak pemadaman
+                salinan.batalkan_bulan(bt_gaji, jadual=['rekod_gaji', 'rekod_jualan'])
                 st.success("Gaji disimpan!")
                 st.download_button("Download PDF", pdf, f"Laporan_{bt_gaji}.pdf", "application/pdf")
             except Exception as e: st.error(str(e))
@@ -531,6 +466,7 @@ elif page == "📝 Kemasukan Data Baru":
 # --- HALAMAN 3: URUS & CETAK ---
 elif page == "🖨️ Urus & Cetak Semula":
     st.header("🖨️ Urus & Cetak Semula")
+    df_gaji_raw, df_gaji_processed = data_gaji()
     if df_gaji_raw.empty: st.info("Tiada data.")
     else:
         sb = df_gaji_raw['BulanTahun'].unique()
@@ -540,12 +476,41 @@ elif page == "🖨️ Urus & Cetak Semula":
         bc = c1.selectbox("Pilih Bulan:", sb)
         if bc:
             dg = df_gaji_raw[df_gaji_raw['BulanTahun']==bc].to_dict('records')[0]
-            lr = df_jualan_raw[df_jualan_raw['BulanTahun']==bc].to_dict('records')
-            dt = {'jumlah_hasil_jualan': dg['JumlahJualan_RM'], 'jumlah_berat_kg': dg['JumlahBerat_kg'], 'gaji_lori': dg['GajiLori_RM'], 'total_kos_operasi': dg.get('total_kos_operasi',0.0), 'kadar_lori_per_kg': 0.07, 'baki_bersih': dg['GajiPenumbak_RM']+dg['BahagianPemilik_RM'], 'gaji_penumbak': dg['GajiPenumbak_RM'], 'bahagian_pemilik': dg['BahagianPemilik_RM']}
-            pdf = jana_pdf_binary(bc, lr, dt)
+            t_bc = tempoh_dari_bulan(bc)
+            lr = muat_tempoh(salinan.versi, ('rekod_jualan',), t_bc, t_bc)[0].to_dict('records')
+            dt = data_kiraan_dari_rekod(dg)
+            pdf = jana_pdf_bercache(bc, lr, dt, NAMA_ANDA)
             c2.write(" ")
             c2.write(" ")
             c2.download_button("Download PDF", pdf, f"Laporan_{bc}.pdf", "application/pdf")
+
+        with st.expander("Cetak Pukal (Banyak Bulan → ZIP)"):
+            urutan = df_gaji_processed
+            mod = st.radio("Pilih:", ["Ikut Tahun", "Julat Bulan"], horizontal=True, key="mod_pukal")
+            if mod == "Ikut Tahun":
+                yp = st.selectbox("Tahun:", sorted(urutan['Tahun'].unique(), reverse=True), key="thn_pukal")
+                pilihan = urutan[urutan['Tahun'] == yp]['BulanTahun'].tolist()
+            else:
+                senarai = urutan['BulanTahun'].tolist()
+                cp1, cp2 = st.columns(2)
+                dari = cp1.selectbox("Dari:", senarai, key="dari_pukal")
+                hingga = cp2.selectbox("Hingga:", senarai, index=len(senarai)-1, key="hingga_pukal")
+                t = urutan.set_index('BulanTahun')['Tempoh']
+                pilihan = tapis_tempoh(urutan, min(t[dari], t[hingga]), max(t[dari], t[hingga]))['BulanTahun'].tolist()
+            st.caption(f"{len(pilihan)} bulan dipilih.")
+            if st.button("Jana ZIP", key="jana_pukal") and pilihan:
+                rekod_g = df_gaji_raw.drop_duplicates('BulanTahun').set_index('BulanTahun')
+                t_pilih = urutan.set_index('BulanTahun').loc[pilihan, 'Tempoh']
+                df_j = ambil_tempoh(storan, ('rekod_jualan',), int(t_pilih.min()), int(t_pilih.max()), salinan)[0]
+                kump_j = {b: d.to_dict('records') for b, d in df_j[df_j['BulanTahun'].isin(pilihan)].groupby('BulanTahun', observed=True)}
+                tugasan = [(b, kump_j.get(b, []), data_kiraan_dari_rekod(rekod_g.loc[b].to_dict())) for b in pilihan]
+                bar = st.progress(0.0, text="Menjana laporan...")
+                kemajuan = lambda siap, jumlah: bar.progress(siap / jumlah, text=f"{siap}/{jumlah} laporan siap")
+                st.session_state.zip_pukal = (jana_pdf_pukal(tugasan, NAMA_ANDA, kolam=dapatkan_kolam_pdf(), kemajuan=kemajuan),
+                                              f"Laporan_{pilihan[0]}_hingga_{pilihan[-1]}.zip")
+            if st.session_state.get("zip_pukal"):
+                data_zip, nama_zip = st.session_state.zip_pukal
+                st.download_button("Download ZIP", data_zip, nama_zip, "application/zip")
         
         st.divider()
         st.subheader("2. Edit Data")
@@ -557,40 +522,35 @@ elif page == "🖨️ Urus & Cetak Semula":
         if st.session_state.be:
             ba = st.session_state.be
             st.warning(f"Edit: **{ba}**")
-            dj = df_jualan_raw[df_jualan_raw['BulanTahun']==ba][['Gred','Berat_kg','Harga_RM_per_MT']]
-            dk = df_kos_raw[df_kos_raw['BulanTahun']==ba][['JenisKos','Jumlah_RM']]
+            t_ba = tempoh_dari_bulan(ba)
+            dj, dk = muat_tempoh(salinan.versi, ('rekod_jualan', 'rekod_kos'), t_ba, t_ba)
+            dj, dk = dj[['Gred','Berat_kg','Harga_RM_per_MT']], dk[['JenisKos','Jumlah_RM']]
             
             with st.form("fe"):
                 st.write("Jualan:")
                 ej = st.data_editor(dj, num_rows="dynamic")
                 st.write("Kos:")
                 ek = st.data_editor(dk, num_rows="dynamic")
+                st.write("Kadar:")
+                kadar_e = input_kadar(df_gaji_raw, t_ba, "e")
                 if st.form_submit_button("Simpan"):
                     try:
-                        supabase.table('rekod_gaji').delete().eq('BulanTahun', ba).execute()
-                        supabase.table('rekod_jualan').delete().eq('BulanTahun', ba).execute()
-                        supabase.table('rekod_kos').delete().eq('BulanTahun', ba).execute()
-                        
                         kb = 0.0
+                        lk, dg, dj2 = [], [], []
                         if not ek.empty and ek['Jumlah_RM'].sum()>0:
                             lk = ek[ek['Jumlah_RM']>0].to_dict('records')
                             for k in lk: k['BulanTahun'] = ba
-                            supabase.table('rekod_kos').insert(lk).execute()
                             kb = sum(k['Jumlah_RM'] for k in lk)
                         
                         if not ej.empty and ej['Berat_kg'].sum()>0:
-                            lr = ej[ej['Berat_kg']>0].to_dict('records')
-                            for i,r in enumerate(lr):
-                                r['Hasil_RM'] = (r['Berat_kg']/1000)*r['Harga_RM_per_MT']
-                                r['BulanTahun'] = ba
-                                r['IDResit'] = i+1
-                            da = kira_payroll(lr, kb)
-                            dg = {'BulanTahun': ba, 'JumlahJualan_RM': da['jumlah_hasil_jualan'], 'JumlahBerat_kg': da['jumlah_berat_kg'], 'GajiLori_RM': da['gaji_lori'], 'GajiPenumbak_RM': da['gaji_penumbak'], 'BahagianPemilik_RM': da['bahagian_pemilik'], 'total_kos_operasi': da['total_kos_operasi']}
-                            dj2 = [{'BulanTahun': r['BulanTahun'], 'IDResit': r['IDResit'], 'Gred': r['Gred'], 'Berat_kg': r['Berat_kg'], 'Harga_RM_per_MT': r['Harga_RM_per_MT'], 'Hasil_RM': r['Hasil_RM']} for r in lr]
-                            supabase.table('rekod_gaji').insert(dg).execute()
-                            supabase.table('rekod_jualan').insert(dj2).execute()
-
-                        st.cache_data.clear()
+                            lr = sediakan_resit(ej, ba).to_dict('records')
+                            da = kira_payroll(lr, kb, *kadar_e)
+                            dg = [baris_rekod_gaji(ba, da)]
+                            dj2 = lr
+                        # Satu transaksi: bulan lama diganti sepenuhnya atau tidak langsung
+                        storan.ganti_bulan(ba, gaji=dg, jualan=dj2, kos=lk)
+
+                        salinan.batalkan_bulan(ba)
                         st.session_state.be = None
                         st.success("Updated!")
                         st.rerun()
@@ -601,39 +561,133 @@ elif page == "🖨️ Urus & Cetak Semula":
         with st.form("fd"):
             bd = st.selectbox("Padam Bulan:", sb)
             if st.form_submit_button("Padam Kekal"):
-                supabase.table('rekod_gaji').delete().eq('BulanTahun', bd).execute()
-                supabase.table('rekod_jualan').delete().eq('BulanTahun', bd).execute()
-                supabase.table('rekod_kos').delete().eq('BulanTahun', bd).execute()
-                st.cache_data.clear()
-                st.success("Deleted.")
-                st.rerun()
+                try:
+                    storan.ganti_bulan(bd, gaji=[], jualan=[], kos=[])
+                    salinan.batalkan_bulan(bd)
+                    st.success("Deleted.")
+                    st.rerun()
+                except Exception as e: st.error(str(e))
 
         st.divider()
-        st.subheader("4. Backup")
-        exc = to_excel(df_gaji_raw, df_jualan_raw, df_kos_raw)
-        st.download_button("Download Excel", exc, f"backup_{datetime.date.today()}.xlsx")
+        st.subheader("4. Semak Ringkasan Gaji")
+        # Banding rekod_gaji dengan rollup resit/kos; hanya bulan basi dikira semula
+        if st.button("Semak & Betulkan", key="semak_ringkasan"):
+            rj, rk = muat_rollup(salinan.versi)
+            basi = cari_bulan_basi(df_gaji_raw, rj, rk)
+            kiraan_semula.tandakan(*basi)
+            dikemas = kiraan_semula.jalankan()
+            if dikemas: st.success(f"{len(dikemas)} bulan dikira semula: {', '.join(dikemas)}")
+            else: st.info("Semua ringkasan gaji sepadan dengan resit & kos.")
+
+        st.divider()
+        st.subheader("5. Backup")
+        # Fail hanya dibina apabila diminta, bukan pada setiap rerun halaman
+        fmt = st.radio("Format:", ["Excel (.xlsx)", "CSV termampat (.zip)", "Syot Parquet (.zip)"], horizontal=True, key="fmt_backup")
+        if st.button("Sediakan Fail Backup"):
+            with st.spinner("Menyediakan fail..."):
+                # Satu-satunya tempat sejarah penuh resit & kos dimuat
+                df_gaji_raw, df_jualan_raw, df_kos_raw = muat_data()
+                if fmt.startswith("Excel"):
+                    st.session_state.backup = (to_excel(df_gaji_raw, df_jualan_raw, df_kos_raw), f"backup_{datetime.date.today()}.xlsx")
+                elif fmt.startswith("Syot"):
+                    # Parquet + manifest & checksum; paling kecil dan terpantas dipulihkan
+                    st.session_state.backup = (jana_syot(df_gaji_raw, df_jualan_raw, df_kos_raw)[0], f"syot_{datetime.date.today()}.zip")
+                else:
+                    st.session_state.backup = (to_zip_csv(df_gaji_raw, df_jualan_raw, df_kos_raw), f"backup_{datetime.date.today()}.zip")
+        if st.session_state.get("backup"):
+            data_backup, nama_backup = st.session_state.backup
+            st.download_button("Download Backup", data_backup, nama_backup)
+
+        st.divider()
+        st.subheader("6. Import Data Pukal")
+        # Backup .xlsx/.zip sendiri atau CSV rekod_*.csv; dibaca & disimpan berpotongan
+        fail_import = st.file_uploader("Fail CSV / Excel / ZIP:", type=["csv", "xlsx", "zip"])
+        pulih = fail_import is not None and adalah_syot(fail_import)
+        if pulih and baca_manifest(fail_import)['jenis'] == 'beza':
+            # Asas rantai tiada dalam muat naik; pulihkan dari folder syot
+            st.warning("Syot beza memerlukan syot asasnya. Gunakan: python -m sawit pulih <folder>/<syot>.zip")
+            fail_import = None
+        elif pulih:
+            st.caption("Syot Parquet: semua data akan dijadikan sama dengan syot; bulan yang tiada dalam syot dipadam.")
+            if st.button("Pulihkan Syot", key="pulih_syot"):
+                bar = st.progress(0.0, text="Memulihkan...")
+                try:
+                    statistik = pulih_syot(fail_import, storan, kemajuan=lambda b, siap, jumlah: bar.progress(siap / jumlah, text=f"{siap}/{jumlah} {b}"))
+                    for baris in ringkasan_import(statistik): st.write(baris)
+                    if statistik['bulan_dipadam']: st.write(f"Dikosongkan (tiada dalam syot): {', '.join(statistik['bulan_dipadam'])}")
+                except Exception as e: st.error(str(e))
+                # Bulan siap (walaupun terhenti separuh jalan) mesti dimuat semula
+                salinan.muat_semula_penuh()
+            fail_import = None
+        ganti_import = st.checkbox("Ganti bulan sedia ada", help="Padam dahulu data bulan yang terdapat dalam fail", disabled=pulih)
+        if fail_import and st.button("Import"):
+            info = st.empty()
+            kemajuan = lambda jadual, n: info.text(f"Mengimport... {jadual}: {n} baris dimasukkan")
+            statistik, ditolak = import_pukal(fail_import, storan, ganti=ganti_import, kemajuan=kemajuan)
+            info.empty()
+            for baris in ringkasan_import(statistik): st.write(baris)
+            kiraan_semula.tandakan(*statistik['bulan_diubah'])
+            dikemas = kiraan_semula.jalankan()
+            if dikemas: st.write(f"Ringkasan gaji dikira semula: {len(dikemas)} bulan")
+            if not ditolak.empty:
+                st.warning(f"{len(ditolak)} baris ditolak.")
+                st.dataframe(ditolak.head(200))
+                st.download_button("Download Baris Ditolak", ditolak.to_csv(index=False).encode('utf-8'), "import_ditolak.csv", "text/csv")
+            if salinan.muat_semula_penuh():
+                st.info("Data sedang dimuat semula di latar; rekod baharu akan kelihatan sebaik sahaja siap.")
 
 # --- HALAMAN 4: LAPORAN ---
 elif page == "📈 Laporan Berkelompok":
     st.header("📈 Laporan")
+    df_gaji_raw, df_gaji_processed = data_gaji()
     if df_gaji_processed.empty: st.info("Tiada data.")
     else:
         yrs = sorted(df_gaji_processed['Tahun'].unique(), reverse=True)
+        senarai = df_gaji_processed['BulanTahun'].tolist()
+        t = df_gaji_processed.set_index('BulanTahun')['Tempoh']
         with st.form("fr"):
-            y = st.selectbox("Tahun:", yrs)
-            ty = st.radio("Jenis:", ["Separuh 1 (Jan-Jun)", "Separuh 2 (Jul-Dis)", "Penuh"])
+            y = int(st.selectbox("Tahun:", yrs))
+            ty = st.radio("Jenis:", ["Separuh 1 (Jan-Jun)", "Separuh 2 (Jul-Dis)", "Penuh", "Julat Bulan"])
+            cr1, cr2 = st.columns(2)
+            dari = cr1.selectbox("Dari (Julat Bulan):", senarai)
+            hingga = cr2.selectbox("Hingga (Julat Bulan):", senarai, index=len(senarai)-1)
             if st.form_submit_button("Jana PDF"):
-                m1 = ["Januari", "Februari", "Mac", "April", "Mei", "Jun"]
-                m2 = ["Julai", "Ogos", "September", "Oktober", "November", "Disember"]
-                if "1" in ty: ml, tt = [f"{b} {y}" for b in m1], f"Separuh 1 {y}"
-                elif "2" in ty: ml, tt = [f"{b} {y}" for b in m2], f"Separuh 2 {y}"
-                else: ml, tt = [f"{b} {y}" for b in m1+m2], f"Penuh {y}"
+                # Julat Tempoh yyyymm: tapisan integer, bukan senarai rentetan bulan
+                if "1" in ty: mula, akhir, tt = y*100 + 1, y*100 + 6, f"Separuh 1 {y}"
+                elif "2" in ty: mula, akhir, tt = y*100 + 7, y*100 + 12, f"Separuh 2 {y}"
+                elif ty == "Penuh": mula, akhir, tt = y*100 + 1, y*100 + 12, f"Penuh {y}"
+                else:
+                    mula, akhir = sorted((int(t[dari]), int(t[hingga])))
+                    tt = f"{bulan_dari_tempoh(mula)} - {bulan_dari_tempoh(akhir)}"
                 
-                d1 = df_gaji_raw[df_gaji_raw['BulanTahun'].isin(ml)]
-                d2 = df_jualan_raw[df_jualan_raw['BulanTahun'].isin(ml)]
-                d3 = df_kos_raw[df_kos_raw['BulanTahun'].isin(ml)]
+                d1 = tapis_tempoh(df_gaji_raw, mula, akhir)
+                d2, d3 = muat_rollup(salinan.versi, mula, akhir)
                 
-                if d1.empty: st.error("Tiada data.")
+                if d1.empty:
+                    st.session_state.pdf_laporan = None
+                    st.error("Tiada data.")
                 else:
-                    pdf = jana_pdf_berkelompok(tt, d1, d2, d3)
-                    st.download_button("Download PDF", pdf, f"Laporan_{tt}.pdf")
+                    st.session_state.pdf_laporan = (jana_pdf_berkelompok_bercache(tt, d1, d2, d3, NAMA_ANDA), f"Laporan_{tt}.pdf")
+        # download_button tidak dibenarkan dalam st.form
+        if st.session_state.get("pdf_laporan"):
+            data_pdf, nama_pdf = st.session_state.pdf_laporan
+            st.download_button("Download PDF", data_pdf, nama_pdf, "application/pdf")
+
+# ==============================================================================
+# 6. PANEL PRESTASI
+# ==============================================================================
+# Larian ditutup sebelum panel dilukis supaya panel sendiri tidak dikira.
+perekod.tamat()
+if papar_prestasi:
+    with st.sidebar.expander("⏱️ Prestasi", expanded=True):
+        ringkasan = pd.DataFrame(perekod.ringkasan()[::-1]).fillna(0)
+        st.caption(f"{len(ringkasan)} rerun terakhir (ms, masa sendiri setiap fasa)")
+        memori = salinan.saiz_memori()
+        st.caption("Salinan kongsi: " + ", ".join(f"{j} {b / 2**20:.1f} MB" for j, b in memori.items()))
+        st.dataframe(ringkasan.drop(columns=['masa']), hide_index=True)
+        st.caption("Median mengikut halaman (ms)")
+        st.dataframe(ringkasan.groupby('halaman')['jumlah_ms'].median().round(1), use_container_width=True)
+        st.caption("Fasa paling perlahan (rerun ini)")
+        st.dataframe(pd.DataFrame(larian.fasa).sort_values('saat', ascending=False).head(10) if larian.fasa
+                     else pd.DataFrame(columns=['kategori', 'nama', 'saat']), hide_index=True)
+        st.download_button("Export JSONL", perekod.jsonl(), f"prestasi_{datetime.date.today()}.jsonl", "application/x-ndjson")
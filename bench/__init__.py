@@ -0,0 +1,2 @@
+# Nama fail: bench/__init__.py
+# Tanda aras prestasi (bukan sebahagian aplikasi). Jalankan: python -m bench --help
@@ -0,0 +1,4 @@
+# Nama fail: bench/__main__.py
+from bench.tanda_aras import main
+
+raise SystemExit(main())
@@ -0,0 +1,45 @@
+# Nama fail: bench/data_sintetik.py
+# Data ladang sintetik yang munasabah untuk tanda aras: resit timbang dengan
+# taburan gred & berat sebenar, harga bermusim, kos bulanan dan ringkasan
+# gaji yang dikira oleh enjin sebenar (jadi semua jadual konsisten).
+import numpy as np
+import pandas as pd
+
+from sawit.kiraan import SENARAI_BULAN, baris_rekod_gaji, kira_hasil_rm, kira_payroll_berkelompok
+
+JENIS_KOS = ["Baja", "Racun", "Upah Merumput", "Minyak Lori", "Penyelenggaraan"]
+PELUANG_GRED = {"A": 0.6, "B": 0.25, "C": 0.15}
+POTONGAN_GRED = {"A": 0.0, "B": -40.0, "C": -90.0}   # RM/MT berbanding gred A
+
+def jana_data(ladang=1, tahun=2, resit_sebulan=200, tahun_mula=2020, benih=0):
+    # Pulangkan (df_gaji, df_jualan, df_kos). Skema tidak mempunyai lajur
+    # ladang, jadi 'ladang' menggandakan resit & kos setiap bulan (seperti
+    # beberapa ladang dilapor bersama).
+    rng = np.random.default_rng(benih)
+    bulan = [f"{b} {t}" for t in range(tahun_mula, tahun_mula + tahun) for b in SENARAI_BULAN]
+    per_bulan = ladang * resit_sebulan
+    saiz = len(bulan) * per_bulan
+
+    # Harga asas setiap bulan: trend + musim + hingar
+    m = np.arange(len(bulan))
+    harga_bulan = 850 + 2.0 * m + 120 * np.sin(2 * np.pi * m / 12) + rng.normal(0, 25, len(bulan))
+    gred = rng.choice(list(PELUANG_GRED), saiz, p=list(PELUANG_GRED.values()))
+    potongan = pd.Series(gred).map(POTONGAN_GRED).to_numpy()
+    df_jualan = pd.DataFrame({
+        'BulanTahun': np.repeat(bulan, per_bulan),
+        'IDResit': np.tile(np.arange(1, per_bulan + 1), len(bulan)),
+        'Gred': gred,
+        'Berat_kg': np.clip(rng.lognormal(np.log(1500), 0.5, saiz), 200, 6000).round(1),
+        'Harga_RM_per_MT': (np.repeat(harga_bulan, per_bulan) + potongan + rng.normal(0, 5, saiz)).round(2),
+    })
+    df_jualan['Hasil_RM'] = kira_hasil_rm(df_jualan)
+
+    kos = []
+    for b in bulan:
+        for jenis in rng.choice(JENIS_KOS, 3, replace=False):
+            kos.append({'BulanTahun': b, 'JenisKos': jenis, 'Jumlah_RM': round(float(rng.uniform(100, 1500)) * ladang, 2)})
+    df_kos = pd.DataFrame(kos)
+
+    kiraan = kira_payroll_berkelompok(df_jualan, df_kos)
+    df_gaji = pd.DataFrame([baris_rekod_gaji(b, d) for b, d in kiraan.to_dict('index').items()])
+    return df_gaji, df_jualan, df_kos
@@ -0,0 +1,171 @@
+# Nama fail: bench/klien_palsu.py
+# Pengganti Supabase dalam memori untuk tanda aras: API jadual yang sama
+# seperti supabase-py (table().select().gt().order().range().execute() dsb.),
+# dengan kependaman setiap permintaan boleh ditetapkan, had 'max-rows'
+# PostgREST, dan pengekodan/penyahkodan JSON supaya kos muatan turut diukur.
+# 'Tempoh' diisi seperti lajur dijana sql/003_tempoh.sql.
+import bisect
+import itertools
+import json
+import threading
+import time
+
+from sawit.kiraan import tempoh_dari_bulan
+
+class Respon:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class _Pertanyaan:
+    def __init__(self, klien, jadual):
+        self.klien = klien
+        self.jadual = jadual
+        self.operasi = 'select'
+        self.penapis = []
+        self.dari_id = None
+        self.hingga_id = None
+        self.menurun = False
+        self.susun = None
+        self.julat = None
+        self.had = None
+        self.kira = None
+        self.muatan = None
+
+    def select(self, *lajur, count=None):
+        self.kira = count
+        return self
+
+    def gt(self, lajur, nilai):
+        if lajur == 'id':
+            self.dari_id = nilai  # id tersusun: carian binari, seperti indeks kunci utama
+        else:
+            self.penapis.append(lambda r: r.get(lajur) is not None and r[lajur] > nilai)
+        return self
+
+    def gte(self, lajur, nilai):
+        self.penapis.append(lambda r: r.get(lajur) is not None and r[lajur] >= nilai)
+        return self
+
+    def lte(self, lajur, nilai):
+        if lajur == 'id':
+            self.hingga_id = nilai
+            return self
+        self.penapis.append(lambda r: r.get(lajur) is not None and r[lajur] <= nilai)
+        return self
+
+    def eq(self, lajur, nilai):
+        self.penapis.append(lambda r: r.get(lajur) == nilai)
+        return self
+
+    def in_(self, lajur, nilai):
+        nilai = set(nilai)
+        self.penapis.append(lambda r: r.get(lajur) in nilai)
+        return self
+
+    def order(self, lajur, desc=False):
+        if lajur == 'id':
+            self.menurun = desc
+        else:
+            self.susun = (lajur, desc)
+        return self
+
+    def range(self, mula, akhir):
+        self.julat = (mula, akhir)
+        return self
+
+    def limit(self, n):
+        self.had = n
+        return self
+
+    def insert(self, baris):
+        self.operasi, self.muatan = 'insert', baris
+        return self
+
+    def delete(self):
+        self.operasi = 'delete'
+        return self
+
+    def execute(self):
+        return self.klien._laksana(self)
+
+class KlienPalsu:
+    def __init__(self, latensi=0.0, maks_baris=1000, serialisasi=True):
+        self.latensi = latensi          # saat setiap permintaan (pergi-balik rangkaian)
+        self.maks_baris = maks_baris    # had 'max-rows' PostgREST
+        self.serialisasi = serialisasi
+        self.bil_permintaan = 0
+        self._kunci = threading.Lock()
+        self._baris = {}
+        self._id = {}
+        self._kiraan_id = itertools.count(1)
+
+    def muat(self, jadual, df):
+        # Isi terus tanpa kependaman (data sedia ada sebelum tanda aras)
+        baris = json.loads(df.to_json(orient='records'))
+        with self._kunci:
+            for r in baris:
+                r['id'] = next(self._kiraan_id)
+                r['created_at'] = '2025-01-01T00:00:00'
+                r['Tempoh'] = tempoh_dari_bulan(r.get('BulanTahun'))
+            self._baris.setdefault(jadual, []).extend(baris)
+            self._id.setdefault(jadual, []).extend(r['id'] for r in baris)
+
+    def table(self, jadual):
+        return _Pertanyaan(self, jadual)
+
+    def _jawab(self, data):
+        return json.loads(json.dumps(data)) if self.serialisasi else data
+
+    def _laksana(self, q):
+        if self.latensi:
+            time.sleep(self.latensi)
+        with self._kunci:
+            self.bil_permintaan += 1
+            baris = self._baris.setdefault(q.jadual, [])
+            ids = self._id.setdefault(q.jadual, [])
+            if q.operasi == 'insert':
+                baru = q.muatan if isinstance(q.muatan, list) else [q.muatan]
+                baru = [dict(self._jawab(r), id=next(self._kiraan_id), created_at='2025-01-01T00:00:00',
+                             Tempoh=tempoh_dari_bulan(r.get('BulanTahun'))) for r in baru]
+                baris.extend(baru)
+                ids.extend(r['id'] for r in baru)
+                return Respon(self._jawab(baru))
+
+            mula = bisect.bisect_right(ids, q.dari_id) if q.dari_id is not None else 0
+            akhir = bisect.bisect_right(ids, q.hingga_id) if q.hingga_id is not None else len(baris)
+            if q.operasi == 'select' and not q.penapis and not q.susun:
+                # Laluan pantas halaman ikut id (corak ambil_jadual_selari)
+                a, b = q.julat or (0, akhir - mula)
+                had = min(b + 1 - a, self.maks_baris, q.had or self.maks_baris)
+                if q.menurun:
+                    padan = baris[max(akhir - a - had, mula):akhir - a][::-1]
+                else:
+                    padan = baris[mula + a:min(mula + a + had, akhir)]
+                jumlah = akhir - mula
+            else:
+                padan, jumlah = None, None
+        if padan is not None:
+            # Pengekodan JSON di luar kunci supaya halaman selari tidak beratur
+            return Respon(self._jawab(padan), jumlah if q.kira else None)
+
+        with self._kunci:
+            baris = self._baris[q.jadual]
+            mula = bisect.bisect_right(self._id[q.jadual], q.dari_id) if q.dari_id is not None else 0
+            akhir = bisect.bisect_right(self._id[q.jadual], q.hingga_id) if q.hingga_id is not None else len(baris)
+            padan = [r for r in itertools.islice(baris, mula, akhir) if all(f(r) for f in q.penapis)]
+            if q.menurun:
+                padan.reverse()
+            if q.operasi == 'delete':
+                buang = {id(r) for r in padan}
+                self._baris[q.jadual] = [r for r in baris if id(r) not in buang]
+                self._id[q.jadual] = [r['id'] for r in self._baris[q.jadual]]
+                return Respon(self._jawab(padan))
+
+        if q.susun:
+            padan.sort(key=lambda r: r.get(q.susun[0]), reverse=q.susun[1])
+        jumlah = len(padan)
+        if q.julat:
+            padan = padan[q.julat[0]:q.julat[1] + 1]
+        padan = padan[:min(q.had or self.maks_baris, self.maks_baris)]
+        return Respon(self._jawab(padan), jumlah if q.kira else None)
@@ -0,0 +1,255 @@
+# Nama fail: bench/tanda_aras.py
+# Tanda aras peringkat utama (muat data, kiraan, PDF, eksport) pada beberapa
+# saiz data sintetik. Setiap peringkat direkod: masa (median & minimum),
+# throughput baris/s dan memori puncak (tracemalloc). Keputusan disimpan
+# sebagai JSON dan boleh dibanding dengan larian asas untuk mengesan regresi:
+#   python -m bench --saiz kecil sederhana -o bench/hasil/asas.json
+#   python -m bench --saiz kecil sederhana --banding bench/hasil/asas.json
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from bench.data_sintetik import jana_data
+from bench.klien_palsu import KlienPalsu
+
+# (ladang, tahun, resit sebulan)
+SAIZ = {
+    'kecil': (1, 2, 100),
+    'sederhana': (1, 5, 1000),
+    'besar': (3, 10, 1000),
+}
+TOLERANSI = 0.25  # Lebih perlahan 25% berbanding asas = regresi
+
+def _log(mesej):
+    print(mesej, file=sys.stderr)
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+# ==========================================
+# PERINGKAT
+# ==========================================
+# Setiap peringkat: (nama, sediakan(data, args) -> (fungsi, bil_baris)).
+# sediakan() tidak dimasa; hanya fungsi() yang diukur.
+def _muat_data(data, args):
+    from sawit.data import SalinanTempatan
+    from sawit.storan import StoranSupabase
+
+    df_gaji, df_jualan, df_kos = data
+    klien = KlienPalsu(latensi=args.latensi / 1000)
+    for jadual, df in (('rekod_gaji', df_gaji), ('rekod_jualan', df_jualan), ('rekod_kos', df_kos)):
+        klien.muat(jadual, df)
+
+    def jalan():
+        SalinanTempatan(StoranSupabase(klien)).segerak()
+    return jalan, len(df_gaji) + len(df_jualan) + len(df_kos)
+
+def _ambil_bulan(data, args):
+    # Laluan halaman Cetak Semula / Edit: satu bulan melalui indeks Tempoh
+    from sawit.data import ambil_tempoh
+    from sawit.kiraan import tempoh_dari_bulan
+    from sawit.storan import StoranSupabase
+
+    klien = KlienPalsu(latensi=args.latensi / 1000)
+    for jadual, df in zip(('rekod_gaji', 'rekod_jualan', 'rekod_kos'), data):
+        klien.muat(jadual, df)
+    storan = StoranSupabase(klien)
+    t = tempoh_dari_bulan(data[1]['BulanTahun'].iloc[-1])
+    bil = int((data[1]['BulanTahun'] == data[1]['BulanTahun'].iloc[-1]).sum())
+    return (lambda: ambil_tempoh(storan, ('rekod_jualan', 'rekod_kos'), t, t)), bil
+
+def _proses_bulanan(data, args):
+    from sawit.kiraan import proses_dataframe_bulanan
+
+    return (lambda: proses_dataframe_bulanan(data[0])), len(data[0])
+
+def _kira_payroll(data, args):
+    # Laluan borang Kemasukan: satu bulan
+    from sawit.kiraan import kira_payroll
+
+    df_jualan, df_kos = data[1], data[2]
+    b = df_jualan['BulanTahun'].iloc[0]
+    resit = df_jualan[df_jualan['BulanTahun'] == b].to_dict('records')
+    kos = df_kos[df_kos['BulanTahun'] == b]['Jumlah_RM'].sum()
+    return (lambda: kira_payroll(resit, kos)), len(resit)
+
+def semak_payroll(df_jualan, df_kos):
+    # Enjin berkelompok mesti sama dengan kira_payroll() hingga sen bagi setiap bulan
+    import numpy as np
+    import pandas as pd
+    from sawit.kiraan import kira_payroll, kira_payroll_berkelompok
+
+    hasil = kira_payroll_berkelompok(df_jualan, df_kos)
+    kos = df_kos.groupby('BulanTahun', sort=False)['Jumlah_RM'].sum()
+    rujukan = pd.DataFrame.from_dict({b: kira_payroll(d.to_dict('records'), kos.get(b, 0.0))
+                                      for b, d in df_jualan.groupby('BulanTahun', sort=False)}, orient='index')
+    sama = np.isclose(hasil.loc[rujukan.index, rujukan.columns].to_numpy(dtype=float),
+                      rujukan.to_numpy(dtype=float), rtol=0, atol=0.005)
+    beza = rujukan.index[~sama.all(axis=1)].tolist()
+    if beza:
+        raise AssertionError(f"kira_payroll_berkelompok berbeza dengan kira_payroll: {beza[:5]}")
+    return len(hasil)
+
+def _kira_payroll_berkelompok(data, args):
+    from sawit.kiraan import kira_payroll_berkelompok
+
+    _log(f"  semakan: {semak_payroll(data[1], data[2])} bulan sepadan dengan kira_payroll()")
+    return (lambda: kira_payroll_berkelompok(data[1], data[2])), len(data[1])
+
+def _jana_pdf_binary(data, args):
+    from sawit.kiraan import kira_payroll
+    from sawit.laporan import jana_pdf_binary
+
+    df_jualan, df_kos = data[1], data[2]
+    b = df_jualan['BulanTahun'].iloc[0]
+    resit = df_jualan[df_jualan['BulanTahun'] == b].to_dict('records')
+    dat = kira_payroll(resit, df_kos[df_kos['BulanTahun'] == b]['Jumlah_RM'].sum())
+    return (lambda: jana_pdf_binary(b, resit, dat)), len(resit)
+
+def _jana_pdf_berkelompok(data, args):
+    # Laporan setahun penuh (tahun pertama)
+    from sawit.kiraan import kira_rollup_tempatan, pastikan_tempoh, tapis_tempoh
+    from sawit.laporan import jana_pdf_berkelompok
+
+    df_gaji, df_jualan, df_kos = (pastikan_tempoh(d) for d in data)
+    tahun = int(df_gaji['Tempoh'].min()) // 100
+    mula, akhir = tahun * 100 + 1, tahun * 100 + 12
+    d1 = tapis_tempoh(df_gaji, mula, akhir)
+    d2, d3 = tapis_tempoh(df_jualan, mula, akhir), tapis_tempoh(df_kos, mula, akhir)
+
+    def jalan():
+        rj, rk = kira_rollup_tempatan(d2, d3)
+        jana_pdf_berkelompok(f"Penuh {tahun}", d1, rj, rk)
+    return jalan, len(d2)
+
+def _to_excel(data, args):
+    from sawit.eksport import to_excel
+
+    return (lambda: to_excel(*data)), sum(len(d) for d in data)
+
+def _to_zip_csv(data, args):
+    from sawit.eksport import to_zip_csv
+
+    return (lambda: to_zip_csv(*data)), sum(len(d) for d in data)
+
+def _jana_syot(data, args):
+    from sawit.syot import jana_syot
+
+    return (lambda: jana_syot(*data)), sum(len(d) for d in data)
+
+PERINGKAT = {
+    'muat_data': _muat_data,
+    'ambil_bulan': _ambil_bulan,
+    'proses_dataframe_bulanan': _proses_bulanan,
+    'kira_payroll': _kira_payroll,
+    'kira_payroll_berkelompok': _kira_payroll_berkelompok,
+    'jana_pdf_binary': _jana_pdf_binary,
+    'jana_pdf_berkelompok': _jana_pdf_berkelompok,
+    'to_excel': _to_excel,
+    'to_zip_csv': _to_zip_csv,
+    'jana_syot': _jana_syot,
+}
+
+# ==========================================
+# PENGUKURAN
+# ==========================================
+def ukur(fungsi, ulang):
+    # Masa tanpa tracemalloc (overhead tinggi), kemudian satu larian untuk memori puncak
+    fungsi()  # panaskan: import, cache templat logo dsb.
+    masa = []
+    for _ in range(ulang):
+        gc.collect()
+        mula = time.perf_counter()
+        fungsi()
+        masa.append(time.perf_counter() - mula)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fungsi()
+        _, puncak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return masa, puncak
+
+def jalankan(senarai_saiz, senarai_peringkat, ulang, args):
+    keputusan = []
+    for nama_saiz in senarai_saiz:
+        ladang, tahun, resit = SAIZ[nama_saiz]
+        mula = time.perf_counter()
+        data = jana_data(ladang, tahun, resit, benih=args.benih)
+        _log(f"[{nama_saiz}] {ladang} ladang x {tahun} tahun x {resit} resit/bulan = "
+             f"{len(data[1]):,} resit (dijana dalam {time.perf_counter() - mula:.1f}s)")
+        for nama in senarai_peringkat:
+            fungsi, baris = PERINGKAT[nama](data, args)
+            masa, puncak = ukur(fungsi, ulang)
+            median = statistics.median(masa)
+            rekod = {
+                'peringkat': nama, 'saiz': nama_saiz, 'baris': baris, 'ulang': ulang,
+                'saat_median': round(median, 6), 'saat_min': round(min(masa), 6),
+                'baris_sesaat': round(baris / median, 1) if median else None,
+                'memori_puncak_mb': round(puncak / 2**20, 2),
+            }
+            keputusan.append(rekod)
+            _log(f"  {nama:<26} {median * 1000:>10.1f} ms  {rekod['baris_sesaat'] or 0:>12,.0f} baris/s  "
+                 f"{rekod['memori_puncak_mb']:>8.1f} MB")
+    return keputusan
+
+def banding(keputusan, laluan_asas, toleransi):
+    # Pulangkan bilangan regresi (median lebih perlahan melebihi toleransi)
+    with open(laluan_asas, encoding='utf-8') as f:
+        asas = {(r['peringkat'], r['saiz']): r for r in json.load(f)['keputusan']}
+    regresi = 0
+    _log(f"\nBanding dengan {laluan_asas} (toleransi {toleransi:.0%}):")
+    for r in keputusan:
+        a = asas.get((r['peringkat'], r['saiz']))
+        if not a:
+            continue
+        nisbah = r['saat_median'] / a['saat_median'] if a['saat_median'] else 1.0
+        tanda = "REGRESI" if nisbah > 1 + toleransi else ("lebih laju" if nisbah < 1 - toleransi else "")
+        regresi += tanda == "REGRESI"
+        _log(f"  {r['peringkat']:<26} {r['saiz']:<10} x{nisbah:5.2f}  {tanda}")
+    return regresi
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m bench", description="Tanda aras Sistem Gaji Sawit")
+    p.add_argument("--saiz", nargs="+", choices=list(SAIZ), default=['kecil', 'sederhana'])
+    p.add_argument("--peringkat", nargs="+", choices=list(PERINGKAT), default=list(PERINGKAT))
+    p.add_argument("--ulang", type=int, default=3, help="Larian bermasa setiap peringkat")
+    p.add_argument("--latensi", type=float, default=20.0, help="Kependaman Supabase palsu (ms/permintaan)")
+    p.add_argument("--benih", type=int, default=0)
+    p.add_argument("-o", "--output", help="Fail JSON keputusan (lalai: bench/hasil/<masa>.json)")
+    p.add_argument("--banding", help="JSON asas untuk dibanding; kod keluar 1 jika ada regresi")
+    p.add_argument("--toleransi", type=float, default=TOLERANSI)
+    args = p.parse_args(argv)
+
+    keputusan = jalankan(args.saiz, args.peringkat, args.ulang, args)
+    hasil = {
+        'masa': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu': os.cpu_count(),
+        'latensi_ms': args.latensi,
+        'keputusan': keputusan,
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "hasil",
+                                         f"{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(hasil, f, indent=2)
+    _log(f"Keputusan -> {output}")
+    if args.banding:
+        return 1 if banding(keputusan, args.banding, args.toleransi) else 0
+    return 0
@@ -0,0 +1,26 @@
+# Nama fail: sawit/__init__.py
+# Teras sistem gaji sawit (tanpa Streamlit). Submodul dimuat secara malas
+# supaya `import sawit` tidak menarik pandas/fpdf/openpyxl sehingga perlu.
+import importlib
+
+_EKSPORT = {
+    'kira_payroll': 'kiraan',
+    'kira_payroll_berkelompok': 'kiraan',
+    'kira_hasil_rm': 'kiraan',
+    'kira_senario': 'kiraan',
+    'proses_dataframe_bulanan': 'kiraan',
+    'jana_pdf_binary': 'laporan',
+    'jana_pdf_berkelompok': 'laporan',
+    'jana_pdf_pukal': 'laporan',
+    'to_excel': 'eksport',
+    'to_zip_csv': 'eksport',
+    'muat_dari_fail': 'data',
+}
+
+def __getattr__(nama):
+    if nama in _EKSPORT:
+        return getattr(importlib.import_module(f"sawit.{_EKSPORT[nama]}"), nama)
+    raise AttributeError(f"module 'sawit' has no attribute {nama!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_EKSPORT))
@@ -0,0 +1,4 @@
+# Nama fail: sawit/__main__.py
+from sawit.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,68 @@
+# Nama fail: sawit/carta.py
+# Rajah Plotly untuk dashboard. Dibina dari data yang sudah diagregat supaya
+# saiz rajah (dan JSON yang dihantar ke pelayar) tidak membesar mengikut
+# sejarah ladang: siri panjang diturunkan ke suku tahun atau tahun, dan
+# surih WebGL digunakan apabila titik masih banyak.
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+MAKS_TITIK = 60          # Titik maksimum setiap siri sebelum diagregat ke tahap lebih kasar
+SEMPADAN_WEBGL = 500     # Jumlah titik di mana Scattergl lebih laju daripada SVG
+SIRI_TREN = {
+    'JumlahJualan_RM': "Jualan",
+    'total_kos_operasi': "Kos Operasi",
+    'Keuntungan_RM': "Untung",
+    'BahagianPemilik_RM': "Pemilik",
+}
+
+def sampel_turun(df, lajur=tuple(SIRI_TREN), maks_titik=MAKS_TITIK):
+    # df = proses_dataframe_bulanan(); pulangkan (bingkai, tahap) dengan lajur
+    # 'Label' dan jumlah setiap tempoh. Tahap: 'bulan', 'suku' atau 'tahun'.
+    df = df.sort_values('Tempoh', kind='stable')
+    if len(df) <= maks_titik:
+        return df[['BulanTahun', *lajur]].rename(columns={'BulanTahun': 'Label'}), 'bulan'
+    suku = (df['BulanNombor'].to_numpy() - 1) // 3 + 1
+    tahun = df['Tahun'].to_numpy()
+    if len(np.unique(tahun * 10 + suku)) <= maks_titik:
+        kunci, label, tahap = tahun * 10 + suku, [f"S{s} {t}" for t, s in zip(tahun, suku)], 'suku'
+    else:
+        kunci, label, tahap = tahun, [str(t) for t in tahun], 'tahun'
+    kump = df[list(lajur)].groupby(kunci, sort=True).sum()
+    kump.insert(0, 'Label', pd.Series(label, index=kunci).groupby(level=0).first())
+    return kump.reset_index(drop=True), tahap
+
+def rajah_tren(df_proses, maks_titik=MAKS_TITIK):
+    data, tahap = sampel_turun(df_proses, maks_titik=maks_titik)
+    Surih = go.Scattergl if len(data) * len(SIRI_TREN) > SEMPADAN_WEBGL else go.Scatter
+    fig = go.Figure([Surih(x=data['Label'], y=data[c], name=nama, mode='lines+markers')
+                     for c, nama in SIRI_TREN.items()])
+    tajuk = {'bulan': "Bulanan", 'suku': "Suku Tahunan", 'tahun': "Tahunan"}[tahap]
+    fig.update_layout(title=f"Tren {tajuk}", xaxis_title=None, yaxis_title="RM", legend_title=None,
+                      hovermode='x unified')
+    return fig
+
+def rajah_pai(rollup, nama, nilai, tajuk):
+    # Rollup bulan x kategori -> satu nilai setiap kategori sebelum dihantar ke pelayar
+    jumlah = rollup.groupby(nama, observed=True)[nilai].sum()
+    fig = go.Figure(go.Pie(labels=jumlah.index.tolist(), values=jumlah.to_numpy()))
+    fig.update_layout(title=tajuk)
+    return fig
+
+def rajah_senario(senario, metrik, sebenar=None):
+    # senario = kira_senario(): satu garis setiap nisbah, paksi-x kadar lori
+    fig = go.Figure([go.Scatter(x=d['KadarLori_RM_per_kg'], y=d[metrik], name=f"{n * 100:g}/{100 - n * 100:g}",
+                                mode='lines+markers')
+                     for n, d in senario.groupby('NisbahPenumbak', sort=True)])
+    if sebenar is not None:
+        fig.add_hline(y=sebenar, line_dash='dash', annotation_text="Sebenar")
+    fig.update_layout(title=f"{metrik} mengikut Kadar Lori", xaxis_title="Kadar Lori (RM/kg)", yaxis_title="RM",
+                      legend_title="Penumbak/Pemilik", hovermode='x unified')
+    return fig
+
+def rajah_perbandingan(kepingan, tajuk, jenis='bar'):
+    # kepingan = KubusTahunan.kepingan(): bulan x tahun; satu surih setiap tahun
+    Surih = go.Bar if jenis == 'bar' else go.Scatter
+    fig = go.Figure([Surih(x=kepingan.index, y=kepingan[t], name=t) for t in kepingan.columns])
+    fig.update_layout(title=tajuk, barmode='group', legend_title=None, hovermode='x unified')
+    return fig
@@ -0,0 +1,249 @@
+# Nama fail: sawit/cli.py
+# Antara muka baris arahan untuk kerja pukal tanpa pelayar, contohnya:
+#   python -m sawit gaji backup_2025-01-31.xlsx -o gaji.csv
+#   python -m sawit laporan data/ --tahun 2024 -o laporan_2024.zip
+#   python -m sawit ringkasan backup.zip --tahun 2024 --separuh 2 -o ringkasan.pdf
+#   python -m sawit ringkasan backup.zip --julat 2024-07..2025-06
+#   python -m sawit eksport data/ -o backup.zip
+#   python -m sawit import backup_2025-01-31.xlsx --ke data/sawit.db
+#   python -m sawit syot supabase --ke syot/          (cron harian: syot beza)
+#   python -m sawit pulih syot/syot_20250131_020000_000000_beza.zip --ke data/sawit.db
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from sawit.kiraan import SENARAI_BULAN, bulan_dari_tempoh, julat_tempoh, pastikan_tempoh, tapis_tempoh
+
+def _log(mesej):
+    print(mesej, file=sys.stderr)
+
+def _muat(sumber):
+    from sawit.data import SalinanTempatan, muat_dari_fail
+
+    mula = time.perf_counter()
+    if sumber == 'supabase':
+        salinan = SalinanTempatan(_buka_storan('supabase'))
+        salinan.segerak()
+        df_gaji, df_jualan, df_kos = salinan.bingkai()
+    else:
+        df_gaji, df_jualan, df_kos = muat_dari_fail(sumber)
+    _log(f"Dimuat {len(df_gaji)} gaji, {len(df_jualan)} resit, {len(df_kos)} kos "
+         f"dalam {time.perf_counter() - mula:.2f}s dari {sumber}")
+    return df_gaji, df_jualan, df_kos
+
+def _pilih_bulan(args, df):
+    if args.bulan:
+        return args.bulan
+    if getattr(args, 'julat', None):
+        df = tapis_tempoh(pastikan_tempoh(df), *julat_tempoh(args.julat)).sort_values('Tempoh', kind='stable')
+        return list(dict.fromkeys(df['BulanTahun']))
+    if getattr(args, 'tahun', None):
+        return [b for b in (f"{n} {args.tahun}" for n in SENARAI_BULAN) if b in set(df['BulanTahun'])]
+    return list(dict.fromkeys(df['BulanTahun']))
+
+def _kira_gaji(df_gaji, df_jualan, df_kos):
+    # Kadar tersimpan setiap bulan (atau kadar berkuat kuasa bagi bulan tanpa rekod gaji)
+    from sawit.kiraan import kadar_bulanan, kira_payroll_berkelompok
+
+    kadar = kadar_bulanan(df_gaji, pd.concat([df_jualan['BulanTahun'], df_kos['BulanTahun']]))
+    return kira_payroll_berkelompok(df_jualan, df_kos, kadar['KadarLori_RM_per_kg'], kadar['NisbahPenumbak'])
+
+def arahan_gaji(args):
+    df_gaji, df_jualan, df_kos = _muat(args.sumber)
+    mula = time.perf_counter()
+    hasil = _kira_gaji(df_gaji, df_jualan, df_kos)
+    _log(f"Kiraan {len(hasil)} bulan dalam {(time.perf_counter() - mula) * 1000:.1f}ms")
+    pilihan = _pilih_bulan(args, hasil.reset_index())
+    hasil = hasil.loc[[b for b in pilihan if b in hasil.index]]
+    if args.output:
+        hasil.to_csv(args.output)
+        _log(f"Ditulis: {args.output}")
+    else:
+        print(hasil.to_string())
+    return 0
+
+def arahan_laporan(args):
+    from sawit.laporan import data_kiraan_dari_rekod, jana_pdf_pukal
+
+    df_gaji, df_jualan, df_kos = _muat(args.sumber)
+    pilihan = _pilih_bulan(args, df_gaji if not df_gaji.empty else df_jualan)
+    if not pilihan:
+        _log("Tiada bulan sepadan.")
+        return 1
+    # Guna ringkasan tersimpan (seperti Cetak Semula); jika tiada, kira dari resit
+    rekod_g = df_gaji.drop_duplicates('BulanTahun').set_index('BulanTahun')
+    kiraan = _kira_gaji(df_gaji, df_jualan, df_kos)
+    kump_j = {b: d.to_dict('records') for b, d in df_jualan[df_jualan['BulanTahun'].isin(pilihan)].groupby('BulanTahun')}
+    tugasan = []
+    for b in pilihan:
+        if b in rekod_g.index:
+            dt = data_kiraan_dari_rekod(rekod_g.loc[b].to_dict())
+        elif b in kiraan.index:
+            dt = kiraan.loc[b].to_dict()
+        else:
+            _log(f"Langkau {b}: tiada data.")
+            continue
+        tugasan.append((b, kump_j.get(b, []), dt))
+
+    mula = time.perf_counter()
+    kemajuan = lambda siap, jumlah: _log(f"  {siap}/{jumlah} laporan siap")
+    data_zip = jana_pdf_pukal(tugasan, args.nama, pekerja=args.pekerja, kemajuan=kemajuan)
+    output = args.output or f"Laporan_{tugasan[0][0]}_hingga_{tugasan[-1][0]}.zip"
+    with open(output, 'wb') as f:
+        f.write(data_zip)
+    _log(f"{len(tugasan)} laporan dalam {time.perf_counter() - mula:.2f}s -> {output}")
+    return 0
+
+def arahan_ringkasan(args):
+    from sawit.kiraan import kira_rollup_tempatan
+    from sawit.laporan import jana_pdf_berkelompok
+
+    df_gaji, df_jualan, df_kos = _muat(args.sumber)
+    if args.julat:
+        mula, akhir = julat_tempoh(args.julat)
+        tt = f"{bulan_dari_tempoh(mula)} - {bulan_dari_tempoh(akhir)}"
+    elif not args.tahun:
+        _log("Beri --tahun atau --julat.")
+        return 2
+    elif args.separuh == 1:
+        mula, akhir, tt = args.tahun * 100 + 1, args.tahun * 100 + 6, f"Separuh 1 {args.tahun}"
+    elif args.separuh == 2:
+        mula, akhir, tt = args.tahun * 100 + 7, args.tahun * 100 + 12, f"Separuh 2 {args.tahun}"
+    else:
+        mula, akhir, tt = args.tahun * 100 + 1, args.tahun * 100 + 12, f"Penuh {args.tahun}"
+    rj, rk = kira_rollup_tempatan(tapis_tempoh(df_jualan, mula, akhir), tapis_tempoh(df_kos, mula, akhir))
+    d1 = tapis_tempoh(df_gaji, mula, akhir)
+    if d1.empty:
+        _log("Tiada data.")
+        return 1
+    output = args.output or f"Laporan_{tt}.pdf"
+    with open(output, 'wb') as f:
+        f.write(jana_pdf_berkelompok(tt, d1, rj, rk, args.nama))
+    _log(f"Ditulis: {output}")
+    return 0
+
+def arahan_eksport(args):
+    from sawit.eksport import to_excel, to_zip_csv
+
+    df_gaji, df_jualan, df_kos = _muat(args.sumber)
+    mula = time.perf_counter()
+    data = (to_zip_csv if args.output.endswith('.zip') else to_excel)(df_gaji, df_jualan, df_kos)
+    with open(args.output, 'wb') as f:
+        f.write(data)
+    _log(f"Ditulis {len(data) / 1024:.0f} KB dalam {time.perf_counter() - mula:.2f}s -> {args.output}")
+    return 0
+
+def _buka_storan(sasaran):
+    from sawit.storan import buat_storan
+
+    if sasaran == 'supabase':
+        from supabase import create_client
+
+        return buat_storan('supabase', create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"]))
+    return buat_storan('sqlite', laluan_sqlite=sasaran)
+
+def arahan_import(args):
+    from sawit.import_pukal import import_pukal, ringkasan_import
+
+    storan = _buka_storan(args.ke)
+    kemajuan = lambda jadual, n: _log(f"  {jadual}: {n} baris dimasukkan")
+    statistik, ditolak = import_pukal(args.sumber, storan, ganti=args.ganti, kira_gaji=not args.tanpa_gaji,
+                                      kemajuan=kemajuan)
+    for baris in ringkasan_import(statistik):
+        _log(baris)
+    if statistik['bulan_diubah'] and not args.tanpa_gaji:
+        from sawit.data import KiraanSemula
+
+        kiraan = KiraanSemula(storan)
+        kiraan.tandakan(*statistik['bulan_diubah'])
+        dikemas = kiraan.jalankan()
+        _log(f"Ringkasan gaji dikira semula: {len(dikemas)} bulan")
+    if not ditolak.empty:
+        output = args.tolak or "import_ditolak.csv"
+        ditolak.to_csv(output, index=False)
+        _log(f"{len(ditolak)} baris ditolak -> {output}")
+    return 0
+
+def arahan_syot(args):
+    from sawit.syot import pangkas_syot, simpan_syot
+
+    df_gaji, df_jualan, df_kos = _muat(args.sumber)
+    mula = time.perf_counter()
+    laluan, manifest = simpan_syot(df_gaji, df_jualan, df_kos, args.ke, maks_rantai=args.rantai, penuh=args.penuh)
+    ubah = sum(m['baris_fail'] + m.get('padam', {}).get('baris', 0) for m in manifest['jadual'].values())
+    _log(f"Syot {manifest['jenis']} ({ubah} baris, {os.path.getsize(laluan) / 1024:.0f} KB) "
+         f"dalam {time.perf_counter() - mula:.2f}s -> {laluan}")
+    if args.pangkas:
+        buang = pangkas_syot(args.ke)
+        _log(f"Dipangkas {len(buang)} syot sebelum syot penuh terakhir")
+    return 0
+
+def arahan_pulih(args):
+    # Storan sasaran menjadi sama dengan syot (bulan di luar syot dikosongkan)
+    from sawit.import_pukal import pulih_syot, ringkasan_import
+
+    kemajuan = lambda bulan, siap, jumlah: _log(f"  {siap}/{jumlah} {bulan}")
+    statistik = pulih_syot(args.sumber, _buka_storan(args.ke), kemajuan=kemajuan)
+    for baris in ringkasan_import(statistik):
+        _log(baris)
+    if statistik['bulan_dipadam']:
+        _log(f"Dikosongkan (tiada dalam syot): {', '.join(statistik['bulan_dipadam'])}")
+    return 0
+
+def bina_parser():
+    p = argparse.ArgumentParser(prog="python -m sawit", description="Sistem Gaji Sawit - kerja pukal tanpa pelayar")
+    p.add_argument("--nama", default=os.environ.get("NAMA_ANDA", "Admin"), help="Nama dalam footer laporan")
+    sub = p.add_subparsers(dest="arahan", required=True)
+
+    def tambah(nama, fungsi, bantuan):
+        sp = sub.add_parser(nama, help=bantuan)
+        sp.add_argument("sumber", help="Backup .xlsx, ZIP CSV/syot, folder rekod_*.csv, .db atau 'supabase'")
+        sp.set_defaults(fungsi=fungsi)
+        return sp
+
+    sp = tambah("gaji", arahan_gaji, "Kira semula gaji semua bulan")
+    sp.add_argument("--bulan", nargs="+", help='Contoh: "Mac 2025"')
+    sp.add_argument("--tahun", type=int)
+    sp.add_argument("--julat", help="Julat tempoh, contoh: 2024-07..2025-06")
+    sp.add_argument("-o", "--output", help="Simpan sebagai CSV")
+
+    sp = tambah("laporan", arahan_laporan, "Jana PDF bulanan (ZIP)")
+    sp.add_argument("--bulan", nargs="+")
+    sp.add_argument("--tahun", type=int)
+    sp.add_argument("--julat", help="Julat tempoh, contoh: 2024-07..2025-06")
+    sp.add_argument("--pekerja", type=int, help="Bilangan proses (lalai: semua CPU)")
+    sp.add_argument("-o", "--output")
+
+    sp = tambah("ringkasan", arahan_ringkasan, "Jana PDF laporan berkelompok")
+    sp.add_argument("--tahun", type=int)
+    sp.add_argument("--separuh", type=int, choices=[1, 2])
+    sp.add_argument("--julat", help="Julat tempoh (ganti --tahun), contoh: 2024-07..2025-06")
+    sp.add_argument("-o", "--output")
+
+    sp = tambah("eksport", arahan_eksport, "Eksport backup (.xlsx atau .zip)")
+    sp.add_argument("-o", "--output", required=True)
+
+    sp = tambah("import", arahan_import, "Import pukal CSV/Excel ke storan")
+    sp.add_argument("--ke", default="data/sawit.db",
+                    help="Fail SQLite sasaran, atau 'supabase' (SUPABASE_URL/SUPABASE_KEY dari env)")
+    sp.add_argument("--ganti", action="store_true", help="Padam dahulu bulan sedia ada yang diimport")
+    sp.add_argument("--tanpa-gaji", action="store_true", help="Jangan jana rekod_gaji dari resit")
+    sp.add_argument("--tolak", help="CSV untuk baris ditolak (lalai: import_ditolak.csv)")
+
+    sp = tambah("syot", arahan_syot, "Simpan syot Parquet (beza berbanding syot terakhir)")
+    sp.add_argument("--ke", required=True, help="Folder syot")
+    sp.add_argument("--penuh", action="store_true", help="Paksa syot penuh")
+    sp.add_argument("--rantai", type=int, default=7, help="Syot beza berturut-turut sebelum syot penuh")
+    sp.add_argument("--pangkas", action="store_true", help="Buang syot sebelum syot penuh terakhir")
+
+    sp = tambah("pulih", arahan_pulih, "Pulihkan storan kepada keadaan syot (ganti_bulan_pukal atomik berkelompok)")
+    sp.add_argument("--ke", default="data/sawit.db",
+                    help="Fail SQLite sasaran, atau 'supabase' (SUPABASE_URL/SUPABASE_KEY dari env)")
+    return p
+
+def main(argv=None):
+    args = bina_parser().parse_args(argv)
+    return args.fungsi(args)
@@ -0,0 +1,501 @@
+# Nama fail: sawit/data.py
+# Akses data: segerak Supabase berperingkat, rollup dan sumber fail tempatan.
+import datetime
+import io
+import logging
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from sawit.kiraan import (LAJUR_KADAR, baris_rekod_gaji, isi_kadar, kira_payroll_berkelompok, kira_rollup_tempatan,
+                          pastikan_tempoh, tapis_tempoh, tempoh_dari_bulan)
+
+log = logging.getLogger(__name__)
+
+# Salinan tempatan bagi setiap jadual dikekalkan dalam proses. Setiap segerak
+# hanya mengambil baris dengan 'id' melebihi tanda air tertinggi (high-water
+# mark), jadi kos segar semula bergantung pada perubahan, bukan saiz sejarah.
+# Jadual disegerak hanya apabila diminta: halaman yang perlukan satu bulan
+# atau julat menggunakan ambil_tempoh() dan tidak memuat sejarah penuh.
+LAJUR_JADUAL = {
+    'rekod_gaji': ['BulanTahun', 'JumlahJualan_RM', 'JumlahBerat_kg', 'GajiLori_RM',
+                   'GajiPenumbak_RM', 'BahagianPemilik_RM', 'total_kos_operasi', *LAJUR_KADAR, 'Tempoh', 'id', 'created_at'],
+    'rekod_jualan': ['BulanTahun', 'IDResit', 'Gred', 'Berat_kg', 'Harga_RM_per_MT', 'Hasil_RM', 'Tempoh', 'id', 'created_at'],
+    'rekod_kos': ['BulanTahun', 'JenisKos', 'Jumlah_RM', 'Tempoh', 'id', 'created_at'],
+}
+# Diisi oleh pangkalan data; tidak pernah dihantar dalam insert
+LAJUR_TERBITAN = ('id', 'Tempoh')
+SELANG_SEGERAK_SAAT = 60        # Delta segerak paling kerap sekali seminit
+SELANG_PENUH_SAAT = 6 * 3600    # Muat penuh berkala untuk kesan padam dari proses lain
+SELANG_TERBIAR_SAAT = 15 * 60   # Selang penyegar latar apabila tiada pengguna
+TERBIAR_SELEPAS_SAAT = 10 * 60  # Tiada bacaan selama ini = terbiar
+MAKS_TUNDA_SAAT = 30 * 60       # Had backoff apabila Supabase tidak dapat dihubungi / dijeda
+# PostgREST memotong jawapan pada had 'max-rows' (1000 secara lalai di
+# Supabase), jadi setiap jadual diambil dalam halaman keyset (id > id terakhir)
+# bagi beberapa julat id secara selari.
+SAIZ_HALAMAN = 1000
+PEKERJA_MUAT = 6
+# id di bawah tanda air yang diimbas semula (id sahaja) pada setiap delta:
+# id yang commit lewat daripada id lebih besar, atau dipadam, tidak dibawa
+# oleh 'id > tanda air'
+JENDELA_ID = SAIZ_HALAMAN
+
+# --- JENIS DATA PADAT ---
+# Teks berulang (bulan, gred, jenis kos) disimpan sebagai kategori, integer
+# sebagai int32 dan created_at sebagai cap masa. Wang & berat kekal float64:
+# float32 hanya ~7 digit bererti, tidak selamat untuk jumlah RM setahun.
+LAJUR_KATEGORI = {'rekod_jualan': ('BulanTahun', 'Gred'), 'rekod_kos': ('BulanTahun', 'JenisKos')}
+LAJUR_INT32 = ('id', 'IDResit', 'Tempoh')
+
+# Salinan dikongsi semua sesi. Dengan Copy-on-Write (lalai sejak pandas 3),
+# bingkai() boleh memulangkan salinan cetek tanpa menyalin data, dan
+# pengubahsuaian oleh pemanggil tidak pernah sampai ke salinan kongsi. Pandas
+# lebih lama tanpa CoW menerima salinan penuh (tetapan global tidak diubah).
+SALINAN_CETEK = int(pd.__version__.split('.')[0]) >= 3
+
+def padatkan(jadual, df):
+    ubah = {}
+    for c in LAJUR_KATEGORI.get(jadual, ()):
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            ubah[c] = df[c].astype('category')
+    for c in LAJUR_INT32:
+        if c in df.columns and len(df) and df[c].dtype != 'int32':
+            s = pd.to_numeric(df[c], errors='coerce')
+            if s.notna().all() and s.abs().max() < 2**31 and (s % 1 == 0).all():
+                ubah[c] = s.astype('int32')
+    if 'created_at' in df.columns and len(df) and not pd.api.types.is_datetime64_any_dtype(df['created_at']):
+        ubah['created_at'] = pd.to_datetime(df['created_at'], utc=True, errors='coerce', format='ISO8601')
+    return df.assign(**ubah) if ubah else df
+
+def _sambung(jadual, lama, baru):
+    # Delta ditambah di hujung; kategori disatukan dahulu supaya concat tidak
+    # menukar lajur kategori kembali kepada rentetan.
+    baru = padatkan(jadual, baru)
+    if lama.empty:
+        return baru
+    for c in LAJUR_KATEGORI.get(jadual, ()):
+        kat = lama[c].cat.categories.union(baru[c].cat.categories)
+        lama = lama.assign(**{c: lama[c].cat.set_categories(kat)})
+        baru = baru.assign(**{c: baru[c].cat.set_categories(kat)})
+    return padatkan(jadual, pd.concat([lama, baru], ignore_index=True))
+
+def _ambil_halaman(klien, jadual, dari_id, saiz, hingga_id=None, kira=False):
+    q = klien.table(jadual).select("*", count="exact" if kira else None).gt('id', dari_id)
+    if hingga_id is not None:
+        q = q.lte('id', hingga_id)
+    return q.order('id', desc=False).limit(saiz).execute()
+
+def _ambil_julat_id(klien, jadual, dari_id, hingga_id, saiz):
+    # Halaman keyset dalam (dari_id, hingga_id]: setiap halaman bermula selepas
+    # id terakhir, jadi baris yang dipadam semasa muat turun tidak menganjakkan
+    # halaman (seperti offset range()) dan tiada baris tertinggal/berulang.
+    halaman = []
+    while True:
+        data = _ambil_halaman(klien, jadual, dari_id, saiz, hingga_id).data
+        halaman.append(data)
+        if len(data) < saiz or data[-1]['id'] >= hingga_id:
+            return halaman
+        dari_id = data[-1]['id']
+
+def _id_terakhir(klien, jadual):
+    res = klien.table(jadual).select("id").order('id', desc=True).limit(1).execute()
+    return res.data[0]['id'] if res.data else 0
+
+def ambil_jadual_selari(klien, senarai_jadual, dari_id=None, saiz_halaman=None, pekerja=None):
+    # Pulangkan ({jadual: DataFrame}, {jadual: statistik}). Halaman pertama
+    # setiap jadual membawa kiraan baris; baki dibahagi kepada julat id
+    # (anggaran satu halaman setiap julat) yang diambil serentak.
+    saiz_halaman = saiz_halaman or SAIZ_HALAMAN
+    dari_id = dari_id or {}
+    mula_masa = {j: time.perf_counter() for j in senarai_jadual}
+    with ThreadPoolExecutor(max_workers=pekerja or PEKERJA_MUAT) as pool:
+        pertama = {j: pool.submit(_ambil_halaman, klien, j, dari_id.get(j, 0), saiz_halaman, None, True)
+                   for j in senarai_jadual}
+        halaman, baki = {}, {}
+        for j, f in pertama.items():
+            res = f.result()
+            jumlah = res.count if res.count is not None else len(res.data)
+            # Jika pelayan memulangkan kurang daripada diminta, guna saiz sebenar
+            saiz = len(res.data) if 0 < len(res.data) < min(saiz_halaman, jumlah) else saiz_halaman
+            halaman[j], baki[j] = [res.data], []
+            if len(res.data) < saiz or jumlah <= len(res.data):
+                continue
+            mula, hingga = res.data[-1]['id'], _id_terakhir(klien, j)
+            bil = -(-(jumlah - len(res.data)) // saiz)
+            lebar = max(-(-(hingga - mula) // bil), 1)
+            baki[j] = [pool.submit(_ambil_julat_id, klien, j, a, min(a + lebar, hingga), saiz)
+                       for a in range(mula, hingga, lebar)]
+        hasil, statistik = {}, {}
+        for j in senarai_jadual:
+            for f in baki[j]:
+                halaman[j].extend(f.result())
+            baris = [r for h in halaman[j] for r in h]
+            hasil[j] = pd.DataFrame(baris)
+            statistik[j] = {"baris": len(baris), "halaman": len(halaman[j]),
+                            "saat": round(time.perf_counter() - mula_masa[j], 3)}
+    return hasil, statistik
+
+# 'storan' ialah mana-mana backend dalam sawit/storan.py. Bingkai dalam
+# self.df tidak pernah diubah di tempat: setiap segerak/pembatalan membina
+# bingkai baharu dan menukarnya di bawah kunci, jadi pembaca sedia ada
+# terus melihat versi lama yang konsisten. Rangkaian sentiasa di luar kunci.
+class SalinanTempatan:
+    def __init__(self, storan):
+        self.storan = storan
+        self.kunci = threading.Lock()
+        self.aktif = set()          # Jadual yang pernah diminta; dijaga segar oleh penyegar latar
+        self.masa_baca = 0.0
+        self.penyegar = None
+        self.selang = SELANG_SEGERAK_SAAT
+        self.picu = threading.Event()
+        self.status = {"ok": None, "masa": None, "ralat": None, "gagal": 0, "cuba_semula": None}
+        self._penuh_diminta = False
+        self._set_semula()
+
+    def _set_semula(self):
+        self.df = {j: pd.DataFrame(columns=c) for j, c in LAJUR_JADUAL.items()}
+        self.hwm = {j: 0 for j in LAJUR_JADUAL}
+        self.masa_segerak = {j: 0.0 for j in LAJUR_JADUAL}  # 0.0 = belum dimuat / kotor
+        self.masa_penuh = time.monotonic()
+        self.generasi = self.storan.generasi
+        self.statistik = {}
+        # Dinaikkan setiap kali kandungan berubah; kunci cache untuk rollup dsb.
+        self.versi = getattr(self, 'versi', 0) + 1
+        # Dinaikkan apabila baris dibuang/ditukar; delta yang diambil sebelum itu dibuang
+        self._tanda = getattr(self, '_tanda', 0) + 1
+
+    @staticmethod
+    def _gabung(jadual, lama, baru):
+        baru = pastikan_tempoh(baru)  # Supabase sebelum sql/003_tempoh.sql
+        df = _sambung(jadual, lama, baru)
+        if jadual == 'rekod_gaji':
+            # Satu baris setiap bulan; upsert (ganti_bulan) datang sebagai id baharu.
+            # Imbasan jendela boleh membawa id lebih kecil, jadi susun ikut id dahulu.
+            df = df.sort_values('id', kind='stable').drop_duplicates('BulanTahun', keep='last').reset_index(drop=True)
+        return df
+
+    def segerak(self, jadual=tuple(LAJUR_JADUAL), paksa=False):
+        with self.kunci:
+            kini = time.monotonic()
+            # generasi berubah = backend membuang baris (cth. padam dari proses lain).
+            # Dengan penyegar latar, muat penuh dibuat di latar (_muat_penuh_atomik).
+            if self.penyegar is None and (kini - self.masa_penuh > SELANG_PENUH_SAAT or self.storan.generasi != self.generasi):
+                self._set_semula()
+            selang = 0 if paksa else getattr(self.storan, 'selang_segerak', SELANG_SEGERAK_SAAT)
+            perlu = [j for j in jadual if kini - self.masa_segerak[j] >= selang]
+            if not perlu:
+                return
+            hwm, tanda = {j: self.hwm[j] for j in perlu}, self._tanda
+            jendela = {j: set(self.df[j]['id'][self.df[j]['id'] > hwm[j] - JENDELA_ID].tolist())
+                       for j in perlu if hwm[j]}
+        # Jendela di bawah tanda air dibanding dengan id backend: id yang tiada
+        # lagi dibuang, id yang commit lewat diambil bersama delta
+        hilang, dari_id = {}, dict(hwm)
+        for j, tempatan in jendela.items():
+            jauh = {i for i in self.storan.senarai_id(j, dari_id=max(hwm[j] - JENDELA_ID, 0)) if i <= hwm[j]}
+            hilang[j], lewat = tempatan - jauh, jauh - tempatan
+            if lewat:
+                dari_id[j] = min(lewat) - 1
+        semua_baru, statistik = self.storan.ambil(perlu, dari_id=dari_id)
+        if any(s['baris'] for s in statistik.values()):
+            log.debug("Muat data: %s", ", ".join(f"{j} {s['baris']} baris/{s['saat']}s" for j, s in statistik.items()))
+        with self.kunci:
+            if self._tanda != tanda:
+                return  # Salinan ditukar semasa muat turun; jadual kotor diambil semula
+            self.statistik.update(statistik)
+            for jadual, baru in semua_baru.items():
+                lama, buang = self.df[jadual], hilang.get(jadual)
+                if buang:
+                    lama = lama[~lama['id'].isin(buang)].reset_index(drop=True)
+                if not baru.empty:
+                    baru = baru[~baru['id'].isin(lama['id'])]  # segerak serentak (pengguna & latar)
+                if baru.empty and not buang:
+                    continue
+                if not baru.empty:
+                    lama = self._gabung(jadual, lama, baru)
+                    self.hwm[jadual] = max(self.hwm[jadual], int(baru['id'].max()))
+                self.df[jadual] = lama
+                self.versi += 1
+            for j in perlu:
+                self.masa_segerak[j] = kini
+
+    def _muat_penuh_atomik(self):
+        # Salinan baharu dibina di luar kunci dan ditukar sekali gus; pembaca
+        # terus menerima salinan lama sepanjang muat turun.
+        with self.kunci:
+            jadual, tanda, generasi = sorted(self.aktif), self._tanda, self.storan.generasi
+            self._penuh_diminta = False
+        semua, statistik = self.storan.ambil(jadual) if jadual else ({}, {})
+        if statistik:
+            log.debug("Muat penuh (latar): %s", ", ".join(f"{j} {s['baris']} baris/{s['saat']}s" for j, s in statistik.items()))
+        kosong = {j: pd.DataFrame(columns=LAJUR_JADUAL[j]) for j in jadual}
+        baru = {j: kosong[j] if semua[j].empty else self._gabung(j, kosong[j], semua[j]) for j in jadual}
+        with self.kunci:
+            if self._tanda != tanda:
+                self._penuh_diminta = True  # Tulisan tempatan semasa muat turun; ulang
+                return False
+            self._set_semula()
+            kini = time.monotonic()
+            for j in jadual:
+                self.df[j] = baru[j]
+                self.hwm[j] = int(baru[j]['id'].max()) if len(baru[j]) else 0
+                self.masa_segerak[j] = kini
+            self.generasi = generasi
+            self.statistik = statistik
+        return True
+
+    def baca(self, jadual=tuple(LAJUR_JADUAL)):
+        # Stale-while-revalidate untuk UI: dengan penyegar latar, salinan sedia
+        # ada dipulangkan serta-merta dan yang basi disegarkan di latar. Hanya
+        # jadual yang belum pernah dimuat, atau ditanda kotor oleh tulisan
+        # proses ini (delta kecil), disegerak sebelum pulang.
+        if self.penyegar is None:
+            self.segerak(jadual)
+            return self.bingkai()
+        with self.kunci:
+            kini = time.monotonic()
+            self.aktif.update(jadual)
+            self.masa_baca = kini
+            perlu = [j for j in jadual if self.masa_segerak[j] == 0.0]
+            basi = any(kini - self.masa_segerak[j] >= self.selang for j in jadual)
+        if perlu:
+            self.segerak(perlu, paksa=True)
+        elif basi and self.status['ok'] is not False:  # jangan ganggu backoff
+            self.picu.set()
+        return self.bingkai()
+
+    # --- penyegar latar ---
+    def mulakan_penyegar(self, selang=None):
+        # Delta berkala bagi jadual aktif, muat penuh atomik (berkala, apabila
+        # generasi berubah atau diminta) dan backoff eksponen apabila backend
+        # gagal/dijeda. Ketika tiada pengguna ia terus berjalan perlahan, jadi
+        # Supabase kekal aktif selagi proses aplikasi hidup.
+        if self.penyegar is None:
+            self.selang = selang or getattr(self.storan, 'selang_segerak', 0) or SELANG_SEGERAK_SAAT
+            self.masa_baca = time.monotonic()
+            self.penyegar = threading.Thread(target=self._gelung, name="penyegar-salinan", daemon=True)
+            self.penyegar.start()
+        return self.status
+
+    def _gelung(self):
+        while True:
+            try:
+                with self.kunci:
+                    aktif = tuple(self.aktif)
+                    penuh = (self._penuh_diminta or time.monotonic() - self.masa_penuh > SELANG_PENUH_SAAT
+                             or self.storan.generasi != self.generasi)
+                if penuh:
+                    self._muat_penuh_atomik()
+                elif aktif:
+                    self.segerak(aktif, paksa=True)
+                self.status.update(ok=True, ralat=None, gagal=0, cuba_semula=None)
+                terbiar = time.monotonic() - self.masa_baca > TERBIAR_SELEPAS_SAAT
+                tunda = SELANG_TERBIAR_SAAT if terbiar else self.selang
+            except Exception as e:
+                gagal = self.status['gagal'] + 1
+                tunda = min(self.selang * 2 ** gagal, MAKS_TUNDA_SAAT)
+                self.status.update(ok=False, ralat=str(e), gagal=gagal,
+                                   cuba_semula=datetime.datetime.now() + datetime.timedelta(seconds=tunda))
+                log.warning("Penyegar latar gagal (%dx), cuba semula dalam %.0fs: %s", gagal, tunda, e)
+            self.status["masa"] = datetime.datetime.now()
+            self.picu.wait(tunda)
+            self.picu.clear()
+
+    def batalkan_bulan(self, bulan_tahun, jadual=tuple(LAJUR_JADUAL)):
+        # Buang baris bulan yang dipadam/diedit; baris gantian (id baru) akan
+        # diambil oleh delta segerak seterusnya.
+        with self.kunci:
+            for j in jadual:
+                df = self.df[j]
+                if not df.empty:
+                    self.df[j] = df[df['BulanTahun'] != bulan_tahun].reset_index(drop=True)
+                self.masa_segerak[j] = 0.0
+            self.versi += 1
+            self._tanda += 1
+
+    def tandakan_basi(self):
+        with self.kunci:
+            self.masa_segerak = dict.fromkeys(self.masa_segerak, 0.0)
+
+    def muat_semula_penuh(self):
+        # Dengan penyegar: dimuat di latar dan ditukar atomik (pulang True)
+        if self.penyegar is not None:
+            with self.kunci:
+                self._penuh_diminta = True
+            self.picu.set()
+            return True
+        with self.kunci:
+            self._set_semula()
+        return False
+
+    def bingkai(self):
+        return self.bingkai_versi()[1]
+
+    def bingkai_versi(self):
+        # Versi dibaca di bawah kunci yang sama dengan bingkai; kunci cache
+        # yang dibina daripadanya sentiasa sepadan dengan kandungan
+        with self.kunci:
+            return self.versi, tuple(self.df[j].copy(deep=not SALINAN_CETEK) for j in LAJUR_JADUAL)
+
+    def saiz_memori(self):
+        with self.kunci:
+            return {j: int(df.memory_usage(deep=True).sum()) for j, df in self.df.items()}
+
+def ambil_rollup(storan, salinan=None, mula=None, akhir=None):
+    # Rollup dari backend (view Supabase / SQLite); jika tiada, kira daripada salinan tempatan.
+    # mula/akhir (yyyymm) ditapis di pelayan melalui indeks Tempoh.
+    try:
+        rj, rk = storan.rollup(mula, akhir)
+        rj_t, rk_t = kira_rollup_tempatan(pd.DataFrame(), pd.DataFrame())
+        return (rj if not rj.empty else rj_t), (rk if not rk.empty else rk_t)
+    except Exception as e:
+        log.warning("Rollup pelayan tiada, guna kiraan tempatan: %s", e)
+        if salinan is None:
+            return kira_rollup_tempatan(pd.DataFrame(), pd.DataFrame())
+        salinan.segerak(('rekod_jualan', 'rekod_kos'))
+        _, df_jualan, df_kos = salinan.bingkai()
+        return kira_rollup_tempatan(tapis_tempoh(pastikan_tempoh(df_jualan), mula, akhir),
+                                    tapis_tempoh(pastikan_tempoh(df_kos), mula, akhir))
+
+def ambil_tempoh(storan, senarai_jadual, mula, akhir, salinan=None):
+    # Hirisan satu bulan/julat (Tempoh yyyymm) terus dari backend melalui
+    # indeks; jika lajur Tempoh belum wujud (sebelum sql/003_tempoh.sql),
+    # segerak jadual itu ke salinan tempatan dan tapis di sini.
+    try:
+        hasil = storan.ambil_tempoh(list(senarai_jadual), mula, akhir)
+    except Exception as e:
+        if salinan is None:
+            raise
+        log.warning("Pertanyaan Tempoh gagal, guna salinan tempatan: %s", e)
+        salinan.segerak(tuple(senarai_jadual))
+        semua = dict(zip(LAJUR_JADUAL, salinan.bingkai()))
+        hasil = {j: tapis_tempoh(pastikan_tempoh(semua[j]), mula, akhir) for j in senarai_jadual}
+    return tuple(_lengkapkan(j, hasil[j]).reset_index(drop=True) for j in senarai_jadual)
+
+# ==============================================================================
+# KIRAAN SEMULA BULAN KOTOR
+# ==============================================================================
+# rekod_gaji menyimpan jumlah terbitan (jualan, kos, gaji, bahagian pemilik).
+# Apabila resit/kos sesuatu bulan berubah tanpa menulis semula gaji (borang
+# kos, import), bulan itu ditanda kotor dan hanya baris gaji bulan tersebut
+# diterbitkan semula daripada resit & kos semasa, dengan kadar tersimpan,
+# melalui kira_payroll_berkelompok (hasil sama seperti kira_payroll).
+LAJUR_BANDING = ('JumlahJualan_RM', 'JumlahBerat_kg', 'GajiLori_RM', 'GajiPenumbak_RM',
+                 'BahagianPemilik_RM', 'total_kos_operasi')
+
+def _julat_berturut(senarai_tempoh):
+    # [202401, 202402, 202405] -> [(202401, 202402), (202405, 202405)]
+    julat = []
+    for t in sorted(set(senarai_tempoh)):
+        seterusnya = julat[-1][1] + (89 if julat and julat[-1][1] % 100 == 12 else 1) if julat else None
+        if julat and t == seterusnya:
+            julat[-1] = (julat[-1][0], t)
+        else:
+            julat.append((t, t))
+    return julat
+
+def cari_bulan_basi(df_gaji, rollup_jualan, rollup_kos, toleransi=0.005):
+    # Bulan yang ringkasan gajinya tidak lagi sepadan dengan resit/kos
+    # (dibanding dengan rollup, tanpa memuat resit). Vektor, tiada gelung.
+    if df_gaji.empty:
+        return []
+    gaji = df_gaji.drop_duplicates('BulanTahun', keep='last').set_index('BulanTahun')
+    jualan = rollup_jualan.groupby('BulanTahun', observed=True)[['Hasil_RM', 'Berat_kg']].sum()
+    kos = rollup_kos.groupby('BulanTahun', observed=True)['Jumlah_RM'].sum()
+    jualan, kos = jualan.reindex(gaji.index, fill_value=0.0), kos.reindex(gaji.index, fill_value=0.0)
+    beza = ((gaji['JumlahJualan_RM'].astype(float) - jualan['Hasil_RM']).abs() > toleransi) \
+        | ((gaji['JumlahBerat_kg'].astype(float) - jualan['Berat_kg']).abs() > toleransi) \
+        | ((gaji['total_kos_operasi'].astype(float).fillna(0.0) - kos).abs() > toleransi)
+    return beza[beza].index.astype(str).tolist()
+
+class KiraanSemula:
+    def __init__(self, storan, salinan=None):
+        self.storan = storan
+        self.salinan = salinan
+        self.kunci = threading.Lock()
+        self.kotor = set()
+
+    def tandakan(self, *bulan):
+        with self.kunci:
+            self.kotor.update(b for b in bulan if tempoh_dari_bulan(b) is not None)
+
+    def jalankan(self):
+        # Terbitkan semula gaji bagi semua bulan kotor sekali gus. Hanya bulan
+        # yang sudah ada rekod_gaji disentuh (kos boleh dimasukkan sebelum
+        # gaji). Pulangkan bulan yang benar-benar berubah.
+        with self.kunci:
+            bulan, self.kotor = self.kotor, set()
+        if not bulan:
+            return []
+        try:
+            bahagian = [ambil_tempoh(self.storan, ('rekod_gaji', 'rekod_jualan', 'rekod_kos'), m, a, self.salinan)
+                        for m, a in _julat_berturut(tempoh_dari_bulan(b) for b in bulan)]
+            df_gaji, df_jualan, df_kos = (pd.concat([b[i] for b in bahagian], ignore_index=True) for i in range(3))
+            df_gaji = isi_kadar(df_gaji[df_gaji['BulanTahun'].isin(bulan)]).drop_duplicates('BulanTahun', keep='last')
+            if df_gaji.empty:
+                return []
+            sasaran = df_gaji['BulanTahun'].astype(str)
+            df_jualan = df_jualan[df_jualan['BulanTahun'].isin(sasaran)].astype({'BulanTahun': str})
+            df_kos = df_kos[df_kos['BulanTahun'].isin(sasaran)].astype({'BulanTahun': str})
+            kadar = df_gaji.set_index(sasaran)
+            kiraan = kira_payroll_berkelompok(df_jualan, df_kos, kadar['KadarLori_RM_per_kg'], kadar['NisbahPenumbak'])
+            kiraan = kiraan.reindex(sasaran)  # Bulan tanpa resit & kos -> jumlah sifar
+            kiraan = kiraan.fillna({'kadar_lori_per_kg': kadar['KadarLori_RM_per_kg'], 'nisbah_penumbak': kadar['NisbahPenumbak']}).fillna(0.0)
+
+            baru = pd.DataFrame([baris_rekod_gaji(b, d) for b, d in kiraan.to_dict('index').items()]).set_index('BulanTahun')
+            lama = kadar[list(LAJUR_BANDING)].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+            berubah = ~np.isclose(baru[list(LAJUR_BANDING)].to_numpy(float), lama.loc[baru.index].to_numpy(float),
+                                  rtol=0, atol=0.005).all(axis=1)
+            dikemas = baru.index[berubah].tolist()
+            for b in dikemas:
+                self.storan.ganti_bulan(b, gaji=[{'BulanTahun': b, **baru.loc[b].to_dict()}])
+                if self.salinan is not None:
+                    self.salinan.batalkan_bulan(b, jadual=['rekod_gaji'])
+            return dikemas
+        except Exception:
+            self.tandakan(*bulan)  # Cuba semula pada panggilan seterusnya
+            raise
+
+# ==============================================================================
+# SUMBER FAIL TEMPATAN (untuk CLI & kerja pukal tanpa Supabase)
+# ==============================================================================
+# Terima backup Excel (3 helaian dari to_excel), ZIP CSV (dari to_zip_csv),
+# pangkalan data SQLite (sawit/storan.py) atau folder yang mengandungi
+# rekod_gaji.csv / rekod_jualan.csv / rekod_kos.csv.
+HELAIAN_EXCEL = {'rekod_gaji': 'Ringkasan_Gaji', 'rekod_jualan': 'Butiran_Jualan', 'rekod_kos': 'Butiran_Kos'}
+
+def _lengkapkan(jadual, df):
+    df = pastikan_tempoh(df)
+    for c in LAJUR_JADUAL[jadual]:
+        if c not in df.columns:
+            df[c] = LAJUR_KADAR.get(c, pd.NA)
+    return df
+
+def muat_dari_fail(laluan):
+    from sawit.syot import adalah_syot, baca_syot  # sawit.syot mengimport modul ini
+
+    if os.path.isdir(laluan):
+        df = {j: pd.read_csv(os.path.join(laluan, f"{j}.csv")) if os.path.exists(os.path.join(laluan, f"{j}.csv"))
+              else pd.DataFrame(columns=LAJUR_JADUAL[j]) for j in LAJUR_JADUAL}
+    elif laluan.endswith('.zip') and adalah_syot(laluan):
+        df = dict(zip(LAJUR_JADUAL, baca_syot(laluan)))
+    elif laluan.endswith('.zip'):
+        with zipfile.ZipFile(laluan) as zf:
+            nama = set(zf.namelist())
+            df = {j: pd.read_csv(io.BytesIO(zf.read(f"{j}.csv"))) if f"{j}.csv" in nama
+                  else pd.DataFrame(columns=LAJUR_JADUAL[j]) for j in LAJUR_JADUAL}
+    elif laluan.endswith(('.db', '.sqlite')):
+        from sawit.storan import StoranSQLite
+
+        df, _ = StoranSQLite(laluan).ambil(list(LAJUR_JADUAL))
+    elif laluan.endswith(('.xlsx', '.xlsm')):
+        helaian = pd.read_excel(laluan, sheet_name=None)
+        df = {j: helaian.get(h, pd.DataFrame(columns=LAJUR_JADUAL[j])) for j, h in HELAIAN_EXCEL.items()}
+    else:
+        raise ValueError(f"Format sumber tidak disokong: {laluan}")
+    return tuple(_lengkapkan(j, df[j]) for j in LAJUR_JADUAL)
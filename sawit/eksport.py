@@ -0,0 +1,37 @@
+# Nama fail: sawit/eksport.py
+# Eksport backup (Excel / CSV termampat).
+import io
+import zipfile
+
+import pandas as pd
+
+from sawit.prestasi import diukur
+
+@diukur('eksport')
+def to_excel(df_gaji, df_jualan, df_kos):
+    # Buku kerja 'write-only': baris ditulis terus ke fail sementara, jadi
+    # memori tidak membesar mengikut saiz sejarah.
+    import openpyxl  # dimuat hanya apabila eksport Excel diminta
+
+    wb = openpyxl.Workbook(write_only=True)
+    for nama, df in (('Ringkasan_Gaji', df_gaji), ('Butiran_Jualan', df_jualan), ('Butiran_Kos', df_kos)):
+        ws = wb.create_sheet(nama)
+        # Excel tidak menyokong zon waktu; created_at disimpan dalam UTC
+        zon = {c: df[c].dt.tz_localize(None) for c in df.columns if isinstance(df[c].dtype, pd.DatetimeTZDtype)}
+        df = df.assign(**zon) if zon else df
+        ws.append(list(df.columns))
+        for baris in df.itertuples(index=False, name=None):
+            ws.append([None if pd.isna(v) else v for v in baris])
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+@diukur('eksport')
+def to_zip_csv(df_gaji, df_jualan, df_kos):
+    # Satu CSV bagi setiap jadual dalam ZIP termampat (lebih kecil & laju untuk data besar)
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for nama, df in (('rekod_gaji', df_gaji), ('rekod_jualan', df_jualan), ('rekod_kos', df_kos)):
+            with zf.open(f"{nama}.csv", "w") as f, io.TextIOWrapper(f, encoding="utf-8", newline="") as teks:
+                df.to_csv(teks, index=False, chunksize=10000)
+    return output.getvalue()
@@ -0,0 +1,406 @@
+# Nama fail: sawit/import_pukal.py
+# Import pukal rekod sejarah dari CSV, Excel (termasuk backup_*.xlsx sendiri),
+# ZIP/folder rekod_*.csv atau syot Parquet (pemulihan). Fail dibaca
+# berpotongan dan setiap potongan disahkan secara vektor serta Hasil_RM
+# dikira semula; baris sah kemudian ditulis sebulan demi sebulan dengan satu
+# ganti_bulan() (atomik) dengan cuba semula.
+# Juga: tiket kilang satu bulan yang ditampal/dimuat naik (Kemasukan Data Baru).
+import io
+import logging
+import os
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from sawit.data import HELAIAN_EXCEL, LAJUR_JADUAL, LAJUR_TERBITAN, _julat_berturut, ambil_tempoh
+from sawit.kiraan import (LAJUR_RESIT, PETA_BULAN, baris_rekod_gaji, isi_kadar, kadar_bulanan, kira_hasil_rm,
+                          kira_payroll_berkelompok, tempoh_dari_bulan)
+from sawit.prestasi import diukur
+from sawit.syot import adalah_syot, baca_syot
+
+log = logging.getLogger(__name__)
+
+SAIZ_BACA = 20000       # Baris setiap potongan baca/pengesahan
+CUBA_SEMULA = 4         # Cubaan bagi setiap bulan (tunggu 0.5s, 1s, 2s)
+GRED_DIKENALI = ('A', 'B', 'C')  # Gred lain diterima, hanya diberi amaran
+SAIZ_PULIH = 5000       # Baris sasaran setiap ganti_bulan_pukal() semasa pemulihan syot
+CORAK_BULAN = rf"^(?:{'|'.join(PETA_BULAN)}) \d{{4}}$"
+SAIZ_PRATONTON = 50     # Baris setiap halaman pratonton tiket
+LAJUR_TIKET = ['Gred', 'Berat_kg', 'Harga_RM_per_MT']  # Susunan andaian jika tiada kepala
+LAJUR_NOMBOR = {
+    'rekod_gaji': ['JumlahJualan_RM', 'JumlahBerat_kg', 'GajiLori_RM', 'GajiPenumbak_RM',
+                   'BahagianPemilik_RM', 'total_kos_operasi'],
+    'rekod_jualan': ['Berat_kg', 'Harga_RM_per_MT'],
+    'rekod_kos': ['Jumlah_RM'],
+}
+
+# ==========================================
+# 1. BACA SUMBER BERPOTONGAN
+# ==========================================
+def _kenal_jadual(nama, lajur):
+    # Nama fail/helaian dahulu (rekod_jualan.csv, Butiran_Jualan), kemudian lajur
+    asas = os.path.splitext(os.path.basename(nama or ''))[0]
+    for j, h in HELAIAN_EXCEL.items():
+        if asas in (j, h):
+            return j
+    lajur = set(lajur)
+    if {'Berat_kg', 'Harga_RM_per_MT'} <= lajur:
+        return 'rekod_jualan'
+    if 'JenisKos' in lajur:
+        return 'rekod_kos'
+    if 'GajiPenumbak_RM' in lajur:
+        return 'rekod_gaji'
+    return None
+
+def _baca_csv(f, nama, saiz):
+    for df in pd.read_csv(f, chunksize=saiz, dtype={'BulanTahun': str, 'Gred': str, 'JenisKos': str}):
+        jadual = _kenal_jadual(nama, df.columns)
+        if jadual is None:
+            raise ValueError(f"Tidak dapat kenal pasti jadual untuk {nama}")
+        yield jadual, df
+
+def _baca_excel(f, saiz):
+    # Mod read_only openpyxl membaca baris secara strim, bukan seluruh helaian
+    from openpyxl import load_workbook
+
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            baris = ws.iter_rows(values_only=True)
+            kepala = next(baris, None)
+            if not kepala:
+                continue
+            kepala = [str(k) for k in kepala]
+            jadual = _kenal_jadual(ws.title, kepala)
+            if jadual is None:
+                continue
+            kumpulan = []
+            for r in baris:
+                if any(v is not None for v in r):
+                    kumpulan.append(r)
+                if len(kumpulan) >= saiz:
+                    yield jadual, pd.DataFrame(kumpulan, columns=kepala)
+                    kumpulan = []
+            if kumpulan:
+                yield jadual, pd.DataFrame(kumpulan, columns=kepala)
+    finally:
+        wb.close()
+
+def baca_sumber(sumber, nama=None, saiz=SAIZ_BACA):
+    # Jana (jadual, DataFrame) bagi setiap potongan. 'sumber' boleh laluan
+    # atau objek fail (cth. UploadedFile Streamlit) dengan 'nama' diberi.
+    nama = nama or getattr(sumber, 'name', None) or str(sumber)
+    if isinstance(sumber, str) and os.path.isdir(sumber):
+        for j in LAJUR_JADUAL:
+            laluan = os.path.join(sumber, f"{j}.csv")
+            if os.path.exists(laluan):
+                yield from _baca_csv(laluan, laluan, saiz)
+    elif nama.endswith('.zip') and adalah_syot(sumber):
+        # Syot bukan tambahan baris tetapi keadaan penuh storan
+        raise ValueError("Fail ini syot Parquet; pulihkan dengan pulih_syot() (python -m sawit pulih)")
+    elif nama.endswith('.zip'):
+        with zipfile.ZipFile(sumber) as zf:
+            for n in sorted(zf.namelist(), key=lambda n: (_kenal_jadual(n, []) not in LAJUR_JADUAL, n)):
+                if n.endswith('.csv'):
+                    with zf.open(n) as f:
+                        yield from _baca_csv(io.TextIOWrapper(f, encoding='utf-8'), n, saiz)
+    elif nama.endswith(('.xlsx', '.xlsm')):
+        yield from _baca_excel(sumber, saiz)
+    elif nama.endswith('.csv'):
+        yield from _baca_csv(sumber, nama, saiz)
+    else:
+        raise ValueError(f"Format sumber tidak disokong: {nama}")
+
+# ==========================================
+# 2. PENGESAHAN VEKTOR
+# ==========================================
+def sahkan(jadual, df, mula_baris=0):
+    # Pulangkan (baris sah, baris ditolak beserta '_sebab'). Tiada gelung per baris.
+    df = df.reset_index(drop=True).copy()
+    df['BulanTahun'] = df.get('BulanTahun', pd.Series(index=df.index, dtype=object)).astype('string').str.strip()
+    for c in LAJUR_NOMBOR[jadual]:
+        df[c] = pd.to_numeric(df[c], errors='coerce') if c in df.columns else np.nan
+
+    syarat = [(~df['BulanTahun'].fillna('').str.match(CORAK_BULAN), "BulanTahun tidak sah")]
+    if jadual == 'rekod_jualan':
+        df['Gred'] = df.get('Gred', pd.Series(index=df.index, dtype=object)).astype('string').str.strip().str.upper()
+        syarat += [
+            (df['Gred'].fillna('') == '', "Gred kosong"),
+            (~(df['Berat_kg'] > 0), "Berat_kg mesti > 0"),
+            (~(df['Harga_RM_per_MT'] >= 0), "Harga_RM_per_MT tidak sah"),
+        ]
+    elif jadual == 'rekod_kos':
+        df['JenisKos'] = df.get('JenisKos', pd.Series(index=df.index, dtype=object)).astype('string').str.strip()
+        syarat += [
+            (df['JenisKos'].fillna('') == '', "JenisKos kosong"),
+            (~(df['Jumlah_RM'] >= 0), "Jumlah_RM tidak sah"),
+        ]
+    else:
+        df = isi_kadar(df)  # Backup lama tanpa lajur kadar -> kadar lalai
+        syarat += [
+            (df['JumlahJualan_RM'].isna(), "JumlahJualan_RM tidak sah"),
+            (~df['NisbahPenumbak'].between(0, 1), "NisbahPenumbak mesti 0-1"),
+        ]
+
+    # Sebab pertama yang gagal bagi setiap baris
+    sebab = pd.Series(np.select([m.to_numpy(bool) for m, _ in syarat], [s for _, s in syarat], default=''),
+                      index=df.index)
+    tolak = sebab != ''
+    ditolak = df[tolak].assign(_jadual=jadual, _baris=df.index[tolak] + mula_baris + 2, _sebab=sebab[tolak])
+    sah = df[~tolak]
+    if jadual == 'rekod_jualan':
+        sah = sah.assign(Hasil_RM=kira_hasil_rm(sah))
+    return sah, ditolak
+
+def _ke_rekod(jadual, df):
+    # id ditetapkan oleh storan sasaran; created_at asal dikekalkan jika ada
+    lajur = [c for c in LAJUR_JADUAL[jadual] if c in df.columns and c not in LAJUR_TERBITAN]
+    df = df[lajur]
+    # Timestamp (cth. dari syot Parquet) -> teks ISO seperti yang dipulangkan Supabase
+    masa = df.select_dtypes(include=['datetime', 'datetimetz']).columns
+    df = df.assign(**{c: df[c].map(lambda t: t.isoformat(), na_action='ignore') for c in masa}).astype(object)
+    return df.where(df.notna(), None).to_dict('records')
+
+# ==========================================
+# 3. SIMPAN SEBULAN DEMI SEBULAN
+# ==========================================
+def _cuba_semula(fungsi, cuba=CUBA_SEMULA):
+    for i in range(cuba):
+        try:
+            return fungsi()
+        except Exception:
+            if i == cuba - 1:
+                raise
+            time.sleep(0.5 * 2 ** i)
+
+def _nombor_resit(df, asas):
+    # IDResit sumber dikekalkan jika lengkap dan bulan itu kosong; jika tidak,
+    # resit dinombor (ikut susunan sumber) bersambung dari 'asas', iaitu
+    # IDResit terbesar sedia ada
+    id_asal = pd.to_numeric(df.get('IDResit', pd.Series(np.nan, index=df.index)), errors='coerce')
+    if asas or id_asal.isna().any():
+        id_asal = pd.Series(np.arange(asas + 1, asas + len(df) + 1), index=df.index)
+    return df.assign(IDResit=id_asal.astype(int))
+
+@diukur('import')
+def import_pukal(sumber, storan, nama=None, ganti=False, kira_gaji=True, kemajuan=None, cuba=CUBA_SEMULA):
+    # Pulangkan (statistik, df_ditolak). Setiap bulan ditulis dengan satu
+    # ganti_bulan(), jadi bulan yang gagal disimpan kekal seperti asal.
+    # ganti=True: jadual yang ada dalam sumber bagi sesuatu bulan diganti;
+    # ganti=False: baris sumber ditambah selepas baris sedia ada dan IDResit
+    # bersambung. kira_gaji=True menjana rekod_gaji (dari resit & kos akhir
+    # bulan itu) untuk bulan yang ada resit tetapi tiada ringkasan gaji dalam
+    # sumber. statistik['bulan_diubah'] = bulan yang resit/kosnya berubah tanpa
+    # gaji ditulis; ringkasan tersimpannya mungkin basi (lihat KiraanSemula).
+    # statistik['gred_baharu'] = gred selain A/B/C yang diterima.
+    statistik = {j: {'dibaca': 0, 'dimasukkan': 0, 'ditolak': 0, 'saat': 0.0} for j in LAJUR_JADUAL}
+    ditolak, sah_semua = [], {j: [] for j in LAJUR_JADUAL}
+    mula = time.perf_counter()
+    for jadual, df in baca_sumber(sumber, nama):
+        sah, tolak = sahkan(jadual, df, statistik[jadual]['dibaca'])
+        statistik[jadual]['dibaca'] += len(df)
+        statistik[jadual]['ditolak'] += len(tolak)
+        if not tolak.empty:
+            ditolak.append(tolak)
+        if not sah.empty:
+            sah_semua[jadual].append(sah)
+    kumpulan = {j: dict(tuple(pd.concat(v, ignore_index=True).groupby('BulanTahun', sort=False))) if v else {}
+                for j, v in sah_semua.items()}
+    bulan = sorted(set().union(*kumpulan.values()), key=tempoh_dari_bulan)
+
+    gred = sorted(set().union(*(set(df['Gred']) for df in kumpulan['rekod_jualan'].values())) - set(GRED_DIKENALI))
+    statistik['gred_baharu'] = gred
+    if gred:
+        log.warning("Gred baharu diterima: %s", ", ".join(gred))
+
+    # Resit & kos sedia ada bagi bulan yang disentuh (untuk tambah dan gaji)
+    sedia = {'rekod_jualan': {}, 'rekod_kos': {}}
+    try:
+        bahagian = [ambil_tempoh(storan, sedia, m, a) for m, a in _julat_berturut(tempoh_dari_bulan(b) for b in bulan)]
+    except Exception as e:
+        log.warning("Pertanyaan Tempoh gagal, ambil jadual penuh: %s", e)
+        semua = storan.ambil(list(sedia))[0]
+        bahagian = [tuple(semua[j][semua[j]['BulanTahun'].isin(bulan)] for j in sedia)] if bulan else []
+    for hasil in bahagian:
+        for j, df in zip(sedia, hasil):
+            sedia[j].update(tuple(df.groupby('BulanTahun', sort=False)))
+
+    muatan = {b: dict.fromkeys(LAJUR_JADUAL) for b in bulan}
+    for j in sedia:
+        for b, baru in kumpulan[j].items():
+            lama = None if ganti else sedia[j].get(b)
+            if j == 'rekod_jualan':
+                asas = 0 if lama is None else int(pd.to_numeric(lama['IDResit'], errors='coerce').fillna(0).max())
+                baru = _nombor_resit(baru, asas)
+            muatan[b][j] = baru if lama is None else pd.concat([lama, baru], ignore_index=True)
+    for b, df in kumpulan['rekod_gaji'].items():
+        muatan[b]['rekod_gaji'] = df.tail(1)  # Satu ringkasan sebulan; baris terakhir menang
+
+    kira = [b for b in kumpulan['rekod_jualan'] if b not in kumpulan['rekod_gaji']] if kira_gaji else []
+    if kira:
+        # Kadar berkuat kuasa: rekod_gaji sedia ada + rekod_gaji dalam sumber
+        rujukan = pd.concat([storan.ambil(['rekod_gaji'])[0]['rekod_gaji'], *kumpulan['rekod_gaji'].values()],
+                            ignore_index=True)
+        kadar = kadar_bulanan(rujukan, kira)
+        kos = [muatan[b]['rekod_kos'] if muatan[b]['rekod_kos'] is not None else sedia['rekod_kos'].get(b) for b in kira]
+        kiraan = kira_payroll_berkelompok(pd.concat([muatan[b]['rekod_jualan'] for b in kira], ignore_index=True),
+                                          pd.concat([d for d in kos if d is not None] or [pd.DataFrame(columns=['BulanTahun', 'Jumlah_RM'])],
+                                                    ignore_index=True),
+                                          kadar['KadarLori_RM_per_kg'], kadar['NisbahPenumbak'])
+        for b, d in kiraan.reindex(kira).to_dict('index').items():
+            muatan[b]['rekod_gaji'] = pd.DataFrame([baris_rekod_gaji(b, d)])
+
+    bulan_diubah, t0 = [], time.perf_counter()
+    for b in bulan:
+        baris = {j: None if df is None else _ke_rekod(j, df) for j, df in muatan[b].items()}
+        try:
+            _cuba_semula(lambda: storan.ganti_bulan(b, gaji=baris['rekod_gaji'], jualan=baris['rekod_jualan'],
+                                                    kos=baris['rekod_kos']), cuba)
+        except Exception as e:
+            for j, df in kumpulan.items():
+                if b in df:
+                    ditolak.append(df[b].assign(_jadual=j, _baris=pd.NA, _sebab=f"Gagal simpan: {e}"))
+                    statistik[j]['ditolak'] += len(df[b])
+            continue
+        for j, df in muatan[b].items():
+            if df is not None:
+                # Baris sumber (atau gaji dijana), bukan baris sedia ada yang ditulis semula
+                statistik[j]['dimasukkan'] += len(kumpulan[j].get(b, df))
+                if kemajuan:
+                    kemajuan(j, statistik[j]['dimasukkan'])
+        if baris['rekod_gaji'] is None:
+            bulan_diubah.append(b)
+
+    statistik['saat'] = time.perf_counter() - mula
+    for j in LAJUR_JADUAL:
+        statistik[j]['saat'] = time.perf_counter() - t0
+    statistik['bulan_diubah'] = bulan_diubah
+    df_ditolak = pd.concat(ditolak, ignore_index=True) if ditolak else pd.DataFrame(columns=['_jadual', '_baris', '_sebab'])
+    return statistik, df_ditolak
+
+def ringkasan_import(statistik):
+    # Baris teks untuk CLI/app: dibaca, dimasukkan, ditolak dan kadar baris/s
+    baris = []
+    for j in LAJUR_JADUAL:
+        s = statistik[j]
+        if s['dibaca'] or s['dimasukkan']:
+            kadar = s['dimasukkan'] / s['saat'] if s['saat'] else 0.0
+            baris.append(f"{j}: {s['dibaca']} dibaca, {s['dimasukkan']} dimasukkan, "
+                         f"{s['ditolak']} ditolak ({kadar:,.0f} baris/s)")
+    if statistik.get('gred_baharu'):
+        baris.append(f"Gred baharu diterima: {', '.join(statistik['gred_baharu'])}")
+    baris.append(f"Jumlah masa: {statistik['saat']:.2f}s")
+    return baris
+
+# ==========================================
+# 4. PEMULIHAN SYOT
+# ==========================================
+def _bulan_storan(storan):
+    # Semua bulan dalam storan: rekod_gaji (satu baris sebulan) + rollup
+    # jualan/kos (satu baris sebulan/gred), bukan setiap resit
+    bulan = set(storan.ambil(['rekod_gaji'])[0]['rekod_gaji'].get('BulanTahun', []))
+    try:
+        rollup = storan.rollup()
+    except Exception as e:
+        log.warning("Rollup tiada, ambil jadual penuh: %s", e)
+        semua = storan.ambil(['rekod_jualan', 'rekod_kos'])[0]
+        rollup = (semua['rekod_jualan'], semua['rekod_kos'])
+    for df in rollup:
+        bulan.update(df.get('BulanTahun', pd.Series(dtype=object)).dropna())
+    return bulan
+
+def _kelompok_bulan(senarai, saiz_bulan, saiz):
+    # Bulan berturut-turut dikumpul sehingga ~saiz baris (sekurang-kurangnya sebulan)
+    kelompok, n = [], 0
+    for b in senarai:
+        if not kelompok or n + saiz_bulan.get(b, 0) > saiz:
+            kelompok.append([])
+            n = 0
+        kelompok[-1].append(b)
+        n += saiz_bulan.get(b, 0)
+    return kelompok
+
+@diukur('import')
+def pulih_syot(sumber, storan, direktori=None, kemajuan=None, cuba=CUBA_SEMULA, saiz=SAIZ_PULIH):
+    # Storan dijadikan sama dengan syot: bulan dalam syot ATAU storan diganti
+    # berkelompok (~saiz baris) dengan satu ganti_bulan_pukal() (atomik) yang
+    # memasukkan setiap jadual sekali gus dengan created_at asal, jadi
+    # bulan/jadual yang tiada dalam syot dikosongkan. Jika satu kelompok gagal,
+    # pemulihan berhenti dengan kelompok itu utuh; jalankan semula untuk sambung.
+    # Pulangkan statistik (format import_pukal) + 'bulan_dipadam'.
+    mula = time.perf_counter()
+    syot = dict(zip(LAJUR_JADUAL, baca_syot(sumber, direktori)))
+    bulan_syot = set().union(*(df['BulanTahun'] for df in syot.values()))
+    senarai = sorted(bulan_syot | _bulan_storan(storan), key=lambda b: tempoh_dari_bulan(b) or 0)
+    saiz_bulan = pd.concat([df['BulanTahun'] for df in syot.values()]).value_counts().to_dict()
+    statistik = {j: {'dibaca': len(df), 'dimasukkan': 0, 'ditolak': 0, 'saat': 0.0} for j, df in syot.items()}
+    siap = 0
+    for bulan in _kelompok_bulan(senarai, saiz_bulan, saiz):
+        baris = {j: _ke_rekod(j, df[df['BulanTahun'].isin(bulan)]) for j, df in syot.items()}
+        try:
+            _cuba_semula(lambda: storan.ganti_bulan_pukal(bulan, gaji=baris['rekod_gaji'], jualan=baris['rekod_jualan'],
+                                                          kos=baris['rekod_kos']), cuba)
+        except Exception as e:
+            julat = bulan[0] if len(bulan) == 1 else f"{bulan[0]} - {bulan[-1]}"
+            raise RuntimeError(f"Pemulihan terhenti pada {bulan[0]} ({siap}/{len(senarai)} bulan siap; "
+                               f"{julat} tidak diubah). Jalankan semula untuk sambung: {e}") from e
+        siap += len(bulan)
+        for j in LAJUR_JADUAL:
+            statistik[j]['dimasukkan'] += len(baris[j])
+        if kemajuan:
+            kemajuan(bulan[-1], siap, len(senarai))
+    statistik['saat'] = time.perf_counter() - mula
+    for j in LAJUR_JADUAL:
+        statistik[j]['saat'] = statistik['saat']
+    statistik['bulan_diubah'] = []
+    statistik['bulan_dipadam'] = [b for b in senarai if b not in bulan_syot]
+    return statistik
+
+# ==========================================
+# 5. TIKET KILANG SATU BULAN
+# ==========================================
+def _lajur_tiket(nilai):
+    # 'Gred', 'Berat (kg)', 'harga rm/mt' ... -> nama lajur jadual
+    nilai = str(nilai).lower()
+    for kunci, lajur in (('gred', 'Gred'), ('berat', 'Berat_kg'), ('harga', 'Harga_RM_per_MT')):
+        if kunci in nilai:
+            return lajur
+    return None
+
+def baca_tiket(sumber, nama=None):
+    # Teks ditampal (dari Excel: tab; atau ; / ,) atau fail CSV/Excel. Baris
+    # kepala pilihan. Pulangkan (DataFrame rentetan, ada_kepala).
+    if isinstance(sumber, str):
+        teks = sumber.strip()
+        sep = '\t' if '\t' in teks else (';' if ';' in teks else ',')
+        df = pd.read_csv(io.StringIO(teks), sep=sep, header=None, dtype=str, skipinitialspace=True)
+        if sep != ',':
+            df = df.apply(lambda c: c.str.replace(',', '', regex=False))  # pemisah ribu 1,250.5
+    elif (nama or getattr(sumber, 'name', '')).endswith(('.xlsx', '.xlsm')):
+        df = pd.read_excel(sumber, header=None, dtype=str)
+    else:
+        df = pd.read_csv(sumber, header=None, dtype=str, skipinitialspace=True)
+    df = df.dropna(how='all')
+
+    peta = {c: _lajur_tiket(v) for c, v in df.iloc[0].items()} if len(df) else {}
+    if {'Berat_kg', 'Harga_RM_per_MT'} <= set(peta.values()):
+        return df.iloc[1:].rename(columns=peta)[[c for c in LAJUR_TIKET if c in peta.values()]], True
+    if df.shape[1] < len(LAJUR_TIKET):
+        raise ValueError(f"Perlu {len(LAJUR_TIKET)} lajur: {', '.join(LAJUR_TIKET)}")
+    return df.iloc[:, :len(LAJUR_TIKET)].set_axis(LAJUR_TIKET, axis=1), False
+
+def sahkan_tiket(sumber, bulan_tahun, nama=None):
+    # Tiket -> (resit sedia disimpan dengan Hasil_RM & IDResit, baris ditolak).
+    # Pengesahan sama seperti import pukal, semuanya vektor.
+    df, ada_kepala = baca_tiket(sumber, nama)
+    sah, ditolak = sahkan('rekod_jualan', df.assign(BulanTahun=bulan_tahun), 0 if ada_kepala else -1)
+    sah = sah.reset_index(drop=True).astype({'Berat_kg': float, 'Harga_RM_per_MT': float})
+    sah['IDResit'] = sah.index + 1
+    return sah[LAJUR_RESIT], ditolak[[*LAJUR_TIKET, '_baris', '_sebab']]
+
+def ringkasan_tiket(sah):
+    # Jumlah mengikut gred untuk pratonton (Gred kategori: observed=True)
+    return (sah.groupby('Gred', observed=True)
+               .agg(Tiket=('IDResit', 'size'), Berat_kg=('Berat_kg', 'sum'), Hasil_RM=('Hasil_RM', 'sum')))
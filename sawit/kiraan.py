@@ -0,0 +1,314 @@
+# Nama fail: sawit/kiraan.py
+# Kiraan gaji & pemprosesan data bulanan. Tiada kebergantungan Streamlit,
+# Supabase atau fpdf supaya boleh digunakan oleh app.py, CLI dan kerja pukal.
+import numpy as np
+import pandas as pd
+
+from sawit.prestasi import diukur
+
+PETA_BULAN = {
+    "Januari": 1, "Februari": 2, "Mac": 3, "April": 4, "Mei": 5, "Jun": 6,
+    "Julai": 7, "Ogos": 8, "September": 9, "Oktober": 10, "November": 11, "Disember": 12
+}
+SENARAI_BULAN = list(PETA_BULAN)
+
+# Kunci tempoh integer yyyymm ("Mac 2025" -> 202503). Lajur 'Tempoh' dijana
+# oleh pangkalan data (sql/003_tempoh.sql) dan diindeks, jadi tapisan julat
+# dan susunan ialah perbandingan integer, bukan huraian rentetan.
+def tempoh_dari_bulan(bulan_tahun):
+    try:
+        nama, tahun = bulan_tahun.split(' ')
+        return int(tahun) * 100 + PETA_BULAN[nama]
+    except (AttributeError, KeyError, ValueError):
+        return None
+
+def bulan_dari_tempoh(tempoh):
+    return f"{SENARAI_BULAN[int(tempoh) % 100 - 1]} {int(tempoh) // 100}"
+
+def kira_tempoh(siri_bulan):
+    # Hanya nilai unik (bilangan bulan, bukan bilangan baris) yang dihurai
+    peta = {b: tempoh_dari_bulan(b) for b in pd.unique(siri_bulan.dropna())}
+    return siri_bulan.map(peta).astype('Int64')
+
+def pastikan_tempoh(df):
+    # Data lama / fail tanpa lajur Tempoh: isi dari BulanTahun
+    if 'Tempoh' not in df.columns or df['Tempoh'].isna().any():
+        df = df.assign(Tempoh=kira_tempoh(df['BulanTahun']) if 'BulanTahun' in df.columns else pd.NA)
+    return df
+
+def julat_tempoh(teks):
+    # "2024-07..2025-06" -> (202407, 202506); "2024" -> (202401, 202412); "2024-07" -> (202407, 202407)
+    def hujung(t, akhir):
+        tahun, _, bulan = t.strip().partition('-')
+        return int(tahun) * 100 + (int(bulan) if bulan else (12 if akhir else 1))
+    mula, _, akhir = teks.partition('..')
+    return hujung(mula, False), hujung(akhir or mula, True)
+
+def tapis_tempoh(df, mula=None, akhir=None):
+    tempoh = df['Tempoh']
+    topeng = pd.Series(True, index=df.index)
+    if mula is not None:
+        topeng &= tempoh >= mula
+    if akhir is not None:
+        topeng &= tempoh <= akhir
+    return df[topeng.fillna(False).astype(bool)]
+
+# Kadar lalai; kadar sebenar disimpan bersama setiap bulan dalam rekod_gaji
+# (sql/004_kadar_gaji.sql) kerana ia dirunding dan berubah dari masa ke masa.
+KADAR_LORI_PER_KG = 0.07
+NISBAH_PENUMBAK = 0.5   # Bahagian penumbak daripada hasil bersih; pemilik dapat bakinya
+LAJUR_KADAR = {'KadarLori_RM_per_kg': KADAR_LORI_PER_KG, 'NisbahPenumbak': NISBAH_PENUMBAK}
+LAJUR_RESIT = ['BulanTahun', 'IDResit', 'Gred', 'Berat_kg', 'Harga_RM_per_MT', 'Hasil_RM']
+
+def kira_hasil_rm(df_jualan):
+    return (df_jualan['Berat_kg'] / 1000) * df_jualan['Harga_RM_per_MT']
+
+def _kadar_bulan(kadar, indeks, lalai):
+    # Skalar, atau dict/Series BulanTahun -> kadar (bulan tanpa kadar guna lalai)
+    if isinstance(kadar, (dict, pd.Series)):
+        return pd.Series(kadar, dtype=float).reindex(indeks).fillna(lalai)
+    return pd.Series(float(kadar), index=indeks)
+
+def _payroll_bulan(jumlah_hasil, jumlah_berat, total_kos, kadar, nisbah):
+    # Formula satu bulan; skalar (kira_payroll) atau Series (berkelompok)
+    gaji_lori = jumlah_berat * kadar
+    baki_bersih = jumlah_hasil - gaji_lori - total_kos
+    return {
+        "jumlah_hasil_jualan": jumlah_hasil,
+        "jumlah_berat_kg": jumlah_berat,
+        "jumlah_berat_mt": jumlah_berat / 1000,
+        "gaji_lori": gaji_lori,
+        "total_kos_operasi": total_kos,
+        "baki_bersih": baki_bersih,
+        "gaji_penumbak": baki_bersih * nisbah,
+        "bahagian_pemilik": baki_bersih * (1 - nisbah),
+        "kadar_lori_per_kg": kadar,
+        "nisbah_penumbak": nisbah,
+    }
+
+def _jumlah_bulan(df, lajur):
+    # Jumlah setiap BulanTahun (tertib bulan pertama muncul), sepenuhnya vektor
+    return df.groupby('BulanTahun', sort=False)[lajur].sum().astype(float)
+
+@diukur('kiraan')
+def kira_payroll_berkelompok(df_jualan, df_kos=None, kadar_lori_per_kg=KADAR_LORI_PER_KG, nisbah_penumbak=NISBAH_PENUMBAK):
+    # Kiraan gaji untuk SEMUA bulan dalam satu laluan berkumpulan. Satu baris
+    # bagi setiap BulanTahun, lajur sama dengan kunci kira_payroll() dan nilai
+    # sama hingga sen (tertib penjumlahan berbeza). Kadar boleh jadi skalar atau per bulan (dict/Series
+    # ikut BulanTahun).
+    jualan = _jumlah_bulan(df_jualan, ['Hasil_RM', 'Berat_kg']) if not df_jualan.empty else None
+    kos = _jumlah_bulan(df_kos, ['Jumlah_RM']) if df_kos is not None and not df_kos.empty else None
+    df = pd.concat([jualan if jualan is not None else pd.DataFrame(columns=['Hasil_RM', 'Berat_kg'], dtype=float),
+                    kos if kos is not None else pd.DataFrame(columns=['Jumlah_RM'], dtype=float)], axis=1)
+    df = df.fillna(0.0).astype(float)
+    df.index.name = 'BulanTahun'
+
+    kadar = _kadar_bulan(kadar_lori_per_kg, df.index, KADAR_LORI_PER_KG)
+    nisbah = _kadar_bulan(nisbah_penumbak, df.index, NISBAH_PENUMBAK)
+    return pd.DataFrame(_payroll_bulan(df['Hasil_RM'], df['Berat_kg'], df['Jumlah_RM'], kadar, nisbah), index=df.index)
+
+def kira_payroll(senarai_resit, total_kos, kadar_lori_per_kg=KADAR_LORI_PER_KG, nisbah_penumbak=NISBAH_PENUMBAK):
+    # Laluan satu bulan (borang, tiket, edit, PDF): aritmetik skalar tanpa pandas
+    jumlah_hasil = sum(float(r['Hasil_RM']) for r in senarai_resit)
+    jumlah_berat = sum(float(r['Berat_kg']) for r in senarai_resit)
+    return _payroll_bulan(jumlah_hasil, jumlah_berat, float(total_kos), float(kadar_lori_per_kg), float(nisbah_penumbak))
+
+def sediakan_resit(df_editor, bulan_tahun):
+    # Baris data_editor -> resit lengkap (Hasil_RM, BulanTahun, IDResit) tanpa gelung
+    df = df_editor[df_editor['Berat_kg'] > 0].reset_index(drop=True)
+    df['Hasil_RM'] = kira_hasil_rm(df)
+    df['BulanTahun'] = bulan_tahun
+    df['IDResit'] = range(1, len(df) + 1)
+    return df[LAJUR_RESIT]
+
+def baris_rekod_gaji(bulan_tahun, dat):
+    return {'BulanTahun': bulan_tahun, 'JumlahJualan_RM': dat['jumlah_hasil_jualan'], 'JumlahBerat_kg': dat['jumlah_berat_kg'],
+            'GajiLori_RM': dat['gaji_lori'], 'GajiPenumbak_RM': dat['gaji_penumbak'],
+            'BahagianPemilik_RM': dat['bahagian_pemilik'], 'total_kos_operasi': dat['total_kos_operasi'],
+            'KadarLori_RM_per_kg': dat['kadar_lori_per_kg'], 'NisbahPenumbak': dat['nisbah_penumbak']}
+
+def isi_kadar(df_gaji):
+    # Rekod sebelum kadar disimpan (atau sumber lama tanpa lajur) -> kadar lalai
+    return df_gaji.assign(**{c: pd.to_numeric(df_gaji[c], errors='coerce').fillna(v) if c in df_gaji.columns else v
+                             for c, v in LAJUR_KADAR.items()})
+
+def kadar_tempoh(df_gaji, tempoh=None):
+    # Kadar berkuat kuasa untuk bulan baharu: kadar bulan tersimpan terakhir
+    # pada/sebelum 'tempoh' (None = terkini; sebelum rekod pertama = kadar
+    # bulan pertama); tiada rekod -> lalai.
+    if df_gaji.empty:
+        return dict(LAJUR_KADAR)
+    df = isi_kadar(pastikan_tempoh(df_gaji)).dropna(subset=['Tempoh']).sort_values('Tempoh', kind='stable')
+    if tempoh is not None:
+        df = df[df['Tempoh'] <= tempoh] if (df['Tempoh'] <= tempoh).any() else df.iloc[:1]
+    return {c: float(df[c].iloc[-1]) for c in LAJUR_KADAR} if len(df) else dict(LAJUR_KADAR)
+
+def kadar_bulanan(df_gaji, senarai_bulan):
+    # kadar_tempoh() bagi banyak bulan sekaligus: DataFrame ikut BulanTahun
+    # dengan lajur LAJUR_KADAR, sedia untuk kira_payroll_berkelompok().
+    bulan = pd.unique(pd.Series(senarai_bulan, dtype=object).dropna())
+    hasil = pd.DataFrame(LAJUR_KADAR, index=pd.Index(bulan, name='BulanTahun'))
+    df = isi_kadar(pastikan_tempoh(df_gaji)).dropna(subset=['Tempoh']) if not df_gaji.empty else df_gaji
+    if df.empty or hasil.empty:
+        return hasil
+    df = df.sort_values('Tempoh', kind='stable')
+    tempoh = pd.Series([tempoh_dari_bulan(b) for b in bulan], dtype=float)
+    i = np.searchsorted(df['Tempoh'].to_numpy(dtype=float), tempoh.to_numpy(), side='right') - 1
+    sah = tempoh.notna().to_numpy()
+    hasil.loc[sah, list(LAJUR_KADAR)] = df[list(LAJUR_KADAR)].to_numpy(dtype=float)[np.clip(i[sah], 0, None)]
+    return hasil
+
+@diukur('kiraan')
+def proses_dataframe_bulanan(df_gaji_raw):
+    if df_gaji_raw.empty:
+        return pd.DataFrame(columns=['BulanTahun', 'Tempoh', 'Tahun', 'BulanNombor', 'BulanString', 'JumlahJualan_RM', 'total_kos_operasi', 'Keuntungan_RM'])
+
+    df = pastikan_tempoh(df_gaji_raw).sort_values('Tempoh', kind='stable').reset_index(drop=True)
+    if 'total_kos_operasi' not in df.columns:
+        df['total_kos_operasi'] = 0.0
+    df['total_kos_operasi'] = df['total_kos_operasi'].fillna(0)
+
+    df['Keuntungan_RM'] = df['JumlahJualan_RM'] - df['GajiLori_RM'] - df['total_kos_operasi']
+
+    # Tahun/bulan terus dari integer; BulanTahun yang tidak sah -> 2000/1/'N/A' seperti dahulu
+    tempoh = df['Tempoh'].fillna(200001).astype(int)
+    df['Tahun'] = tempoh // 100
+    df['BulanNombor'] = tempoh % 100
+    df['BulanString'] = np.array(SENARAI_BULAN, dtype=object)[df['BulanNombor'] - 1]
+    df.loc[df['Tempoh'].isna(), 'BulanString'] = 'N/A'
+    return df
+
+# --- ROLLUP BULANAN (lihat sql/001_rollup_bulanan.sql) ---
+def kira_rollup_tempatan(df_jualan, df_kos):
+    # Lajur sama dengan view rollup (termasuk Tempoh) supaya boleh ditapis ikut julat
+    if df_jualan.empty:
+        rj = pd.DataFrame(columns=['BulanTahun', 'Tempoh', 'Gred', 'Berat_kg', 'Hasil_RM', 'PurataHarga_RM_per_MT', 'BilResit'])
+    else:
+        rj = pastikan_tempoh(df_jualan).groupby(['BulanTahun', 'Tempoh', 'Gred'], as_index=False, dropna=False, observed=True).agg(
+            Berat_kg=('Berat_kg', 'sum'), Hasil_RM=('Hasil_RM', 'sum'), BilResit=('Hasil_RM', 'size'))
+        rj['PurataHarga_RM_per_MT'] = (rj['Hasil_RM'] / (rj['Berat_kg'] / 1000)).where(rj['Berat_kg'] > 0, 0.0)
+    if df_kos.empty:
+        rk = pd.DataFrame(columns=['BulanTahun', 'Tempoh', 'JenisKos', 'Jumlah_RM', 'BilRekod'])
+    else:
+        rk = pastikan_tempoh(df_kos).groupby(['BulanTahun', 'Tempoh', 'JenisKos'], as_index=False, dropna=False, observed=True).agg(
+            Jumlah_RM=('Jumlah_RM', 'sum'), BilRekod=('Jumlah_RM', 'size'))
+    return rj, rk
+
+# --- AGREGAT LAPORAN BERKELOMPOK ---
+# Susunan lajur jadual bulanan dalam PDF
+LAJUR_LAPORAN = ['JumlahJualan_RM', 'total_kos_operasi', 'GajiLori_RM', 'GajiPenumbak_RM',
+                 'BahagianPemilik_RM', 'JumlahBerat_kg']
+
+def kira_agregat_laporan(df_gaji, df_jualan, df_kos):
+    # Semua bahagian laporan dalam satu laluan berkumpulan bagi setiap jadual:
+    # baris bulanan tersusun (mana-mana julat, merentas tahun), KPI, setiap
+    # gred yang wujud dan kos ikut jenis. df_jualan/df_kos boleh jadi resit
+    # mentah atau rollup bulanan (lajur sama). Input tidak diubah.
+    bulan = pastikan_tempoh(df_gaji).sort_values('Tempoh', kind='stable')
+    bulan = bulan.assign(**{c: pd.to_numeric(bulan[c], errors='coerce').fillna(0.0) if c in bulan.columns else 0.0
+                            for c in LAJUR_LAPORAN})[['BulanTahun', 'Tempoh', *LAJUR_LAPORAN]].reset_index(drop=True)
+    kpi = bulan[LAJUR_LAPORAN].sum().to_dict()
+    kpi['BilBulan'] = len(bulan)
+    kpi['PurataHarga_RM_per_MT'] = (kpi['JumlahJualan_RM'] / (kpi['JumlahBerat_kg'] / 1000)
+                                    if kpi['JumlahBerat_kg'] > 0 else 0.0)
+
+    if df_jualan.empty:
+        gred = pd.DataFrame(columns=['Berat_kg', 'Hasil_RM'], dtype=float)
+    else:
+        gred = df_jualan.groupby('Gred', observed=True)[['Berat_kg', 'Hasil_RM']].sum().sort_index()
+    gred['Peratus_Berat'] = gred['Berat_kg'] / gred['Berat_kg'].sum() * 100 if gred['Berat_kg'].sum() > 0 else 0.0
+    if df_kos.empty:
+        kos = pd.Series(dtype=float, name='Jumlah_RM')
+    else:
+        kos = df_kos.groupby('JenisKos', observed=True)['Jumlah_RM'].sum().sort_values(ascending=False)
+    return {'kpi': kpi, 'bulan': bulan, 'gred': gred, 'kos': kos}
+
+# --- SENARIO KADAR ---
+# Harga semula sejarah di bawah grid kadar lori x nisbah penumbak. Gaji adalah
+# linear pada berat, jualan & kos bulan, jadi julat dijumlahkan sekali dan
+# seluruh grid dikira dengan siaran numpy; tiada gelung bulan atau resit.
+def kira_senario(df_gaji, senarai_kadar, senarai_nisbah):
+    # df_gaji = rekod_gaji (satu baris sebulan). Pulangkan satu baris bagi
+    # setiap pasangan (kadar, nisbah) dengan jumlah & beza berbanding sebenar.
+    df = isi_kadar(df_gaji)
+    berat = pd.to_numeric(df['JumlahBerat_kg'], errors='coerce').fillna(0.0).to_numpy(float)
+    kos = pd.to_numeric(df.get('total_kos_operasi', 0.0), errors='coerce')
+    kos = kos.fillna(0.0).to_numpy(float) if isinstance(kos, pd.Series) else np.zeros(len(df))
+    jualan = pd.to_numeric(df['JumlahJualan_RM'], errors='coerce').fillna(0.0).to_numpy(float)
+    kadar = np.asarray(senarai_kadar, dtype=float)
+    nisbah = np.asarray(senarai_nisbah, dtype=float)
+
+    lori = berat.sum() * kadar                                  # (K,)
+    baki = jualan.sum() - kos.sum() - lori                      # (K,)
+    penumbak = baki[:, None] * nisbah[None, :]                  # (K, N)
+    k, n = np.meshgrid(kadar, nisbah, indexing='ij')
+    sebenar_penumbak = pd.to_numeric(df['GajiPenumbak_RM'], errors='coerce').fillna(0.0).sum()
+    sebenar_pemilik = pd.to_numeric(df['BahagianPemilik_RM'], errors='coerce').fillna(0.0).sum()
+    hasil = pd.DataFrame({
+        'KadarLori_RM_per_kg': k.ravel(),
+        'NisbahPenumbak': n.ravel(),
+        'GajiLori_RM': np.repeat(lori, len(nisbah)),
+        'GajiPenumbak_RM': penumbak.ravel(),
+        'BahagianPemilik_RM': (baki[:, None] - penumbak).ravel(),
+    })
+    hasil['BezaPenumbak_RM'] = hasil['GajiPenumbak_RM'] - sebenar_penumbak
+    hasil['BezaPemilik_RM'] = hasil['BahagianPemilik_RM'] - sebenar_pemilik
+    return hasil
+
+# --- KUBUS PERBANDINGAN TAHUNAN ---
+BULAN_PENDEK = ["Jan", "Feb", "Mac", "Apr", "Mei", "Jun", "Jul", "Ogos", "Sep", "Okt", "Nov", "Dis"]
+METRIK_KUBUS = {
+    "Jualan (RM)": 'JumlahJualan_RM',
+    "Berat (kg)": 'JumlahBerat_kg',
+    "Untung (RM)": 'Keuntungan_RM',
+    "Pemilik (RM)": 'BahagianPemilik_RM',
+    "Kos Operasi (RM)": 'total_kos_operasi',
+    "Harga (RM/MT)": None,  # nisbah Jualan / Berat, dikira dari jumlah setiap mod
+}
+MOD_KUBUS = {"Bulanan": 0, "Kumulatif (YTD)": 1, "Bergulir 12 Bulan": 2}
+
+class KubusTahunan:
+    # Tatasusunan [mod, tahun, bulan, metrik] dibina sekali daripada
+    # proses_dataframe_bulanan(). Memilih tahun/metrik/mod di UI hanya
+    # menghiris tatasusunan ini. Bulan tanpa data = NaN (tiada titik).
+    def __init__(self, df_proses):
+        df = df_proses[df_proses['Tempoh'].notna()] if 'Tempoh' in df_proses.columns else df_proses.iloc[0:0]
+        self.tahun = sorted(int(t) for t in df['Tahun'].unique())
+        self.metrik = list(METRIK_KUBUS)
+        jumlah = [c for c in METRIK_KUBUS.values() if c]
+        if not self.tahun:
+            self.nilai = np.full((len(MOD_KUBUS), 0, 12, len(self.metrik)), np.nan)
+            return
+
+        # Garis masa bulanan berterusan dari Jan tahun pertama hingga Dis tahun akhir
+        self._tahun_awal = self.tahun[0]
+        bil_tahun = self.tahun[-1] - self._tahun_awal + 1
+        i = (df['Tahun'].to_numpy(int) - self._tahun_awal) * 12 + df['BulanNombor'].to_numpy(int) - 1
+        bulanan = np.full((bil_tahun * 12, len(jumlah)), np.nan)
+        kump = df[jumlah].astype(float).groupby(i).sum()
+        bulanan[kump.index.to_numpy()] = kump.to_numpy()
+        ada = ~np.isnan(bulanan[:, 0])
+        sifar = np.nan_to_num(bulanan)
+
+        ytd = sifar.reshape(bil_tahun, 12, -1).cumsum(axis=1).reshape(bil_tahun * 12, -1)
+        kumulatif = np.vstack([np.zeros((1, len(jumlah))), sifar.cumsum(axis=0)])
+        gulir = np.full_like(bulanan, np.nan)
+        gulir[11:] = kumulatif[12:] - kumulatif[:-12]
+        gulir[:np.argmax(ada) + 11] = np.nan  # tetingkap pertama mesti penuh dalam sejarah
+        ytd[~ada] = np.nan
+        gulir[~ada] = np.nan
+
+        lapisan = []
+        for m in (bulanan, ytd, gulir):
+            jualan, berat = m[:, jumlah.index('JumlahJualan_RM')], m[:, jumlah.index('JumlahBerat_kg')]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                harga = np.where(berat > 0, jualan / (berat / 1000), np.nan)
+            lapisan.append(np.column_stack([m, harga]))
+        self.nilai = np.stack(lapisan).reshape(len(MOD_KUBUS), bil_tahun, 12, len(self.metrik))
+
+    def kepingan(self, senarai_tahun, metrik, mod="Bulanan"):
+        # DataFrame bulan x tahun untuk satu metrik/mod (hirisan, tanpa kiraan semula)
+        senarai_tahun = [int(t) for t in senarai_tahun]
+        i = [t - self._tahun_awal for t in senarai_tahun]
+        data = self.nilai[MOD_KUBUS[mod], i, :, self.metrik.index(metrik)].T
+        return pd.DataFrame(data, index=BULAN_PENDEK, columns=[str(t) for t in senarai_tahun])
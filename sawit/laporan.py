@@ -0,0 +1,410 @@
+# Nama fail: sawit/laporan.py
+# Penjanaan laporan PDF. Diasingkan daripada app.py supaya boleh diimport oleh
+# proses pekerja (cetak pukal) tanpa menjalankan skrip Streamlit.
+import datetime
+import functools
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import multiprocessing
+import multiprocessing.spawn
+
+import pandas as pd
+
+from sawit.kiraan import KADAR_LORI_PER_KG, LAJUR_LAPORAN, NISBAH_PENUMBAK, isi_kadar, kira_agregat_laporan
+from sawit.prestasi import catat_cache, diukur
+
+# fpdf hanya diimport ketika PDF pertama dijana (permulaan app/CLI lebih pantas)
+
+LOGO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logo.png")
+# Naikkan setiap kali susun atur/kandungan PDF berubah supaya cache lama tidak dipakai
+VERSI_TEMPLAT = 3
+
+# ==============================================================================
+# ASET STATIK (DIBACA SEKALI SETIAP PROSES)
+# ==============================================================================
+@functools.lru_cache(maxsize=1)
+def _templat_logo():
+    # logo.png dinyahkod sekali dan disimpan sebagai bait JPEG (atas latar
+    # putih, seperti halaman PDF). fpdf menyalin data JPEG terus ke PDF tanpa
+    # nyahkod/mampat semula, jadi setiap dokumen hanya membaca pengepalanya.
+    if not os.path.exists(LOGO):
+        return None
+    from PIL import Image
+
+    with Image.open(LOGO) as im:
+        rgba = im.convert("RGBA")
+    latar = Image.new("RGB", rgba.size, "white")
+    latar.paste(rgba, mask=rgba)
+    bait = io.BytesIO()
+    latar.save(bait, "JPEG", quality=95, subsampling=0)
+    return bait.getvalue()
+
+def _letak_logo(pdf):
+    # API awam fpdf2 sahaja: pdf.image() menerima BytesIO
+    templat = _templat_logo()
+    if templat is None:
+        return False
+    pdf.image(io.BytesIO(templat), 10, 8, 25)
+    return True
+
+@diukur('pdf')
+def jana_pdf_binary(bulan_tahun, senarai_resit, data_kiraan, nama_anda='Admin'):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    
+    # --- LOGO & HEADER ---
+    # Jika logo wujud, letak di penjuru kiri atas
+    if _letak_logo(pdf):
+        # Anjakkan tajuk ke bawah sedikit supaya tidak bertindih logo
+        pdf.set_y(35)
+    else:
+        pdf.set_y(20)
+
+    pdf.set_font("Helvetica", 'B', 18)
+    pdf.cell(0, 10, f"LADANG SAWIT SATIN LUNG MANIS", ln=True, align='C')
+    pdf.set_font("Helvetica", 'B', 14)
+    pdf.cell(0, 10, f"Laporan Kiraan Gaji - {bulan_tahun}", ln=True, align='C')
+    pdf.ln(10)
+    
+    # Bahagian 1: Jualan
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, "Bahagian 1: Butiran Jualan (Resit)", ln=True)
+    pdf.set_font("Helvetica", size=11)
+    for i, resit in enumerate(senarai_resit):
+        gred = resit.get('Gred', 'N/A')
+        berat_kg = resit.get('Berat_kg', 0)
+        harga_per_mt = resit.get('Harga_RM_per_MT', 0)
+        hasil_resit = resit.get('Hasil_RM', 0)
+        teks_resit = f"  Resit #{i+1} (Gred {gred}): {berat_kg:.2f} kg @ RM{harga_per_mt:.2f}/MT = RM{hasil_resit:.2f}"
+        pdf.cell(0, 8, teks_resit, ln=True)
+    pdf.ln(5)
+    
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, f"Jumlah Berat Keseluruhan: {data_kiraan.get('jumlah_berat_kg', 0):.2f} kg", ln=True)
+    pdf.cell(0, 8, f"Jumlah Hasil Jualan Kasar: RM{data_kiraan.get('jumlah_hasil_jualan', 0):.2f}", ln=True)
+    pdf.ln(10)
+
+    # Bahagian 2: Kiraan Gaji
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, "Bahagian 2: Pengiraan Gaji dan Pembahagian", ln=True)
+    
+    # Gaji Lori
+    pdf.set_font("Helvetica", 'BU', 11)
+    pdf.cell(0, 8, "Gaji Pekerja 1 (Lori):", ln=True)
+    pdf.set_font("Helvetica", size=11)
+    pdf.cell(0, 8, f"  Kiraan: {data_kiraan.get('jumlah_berat_kg', 0):.2f} kg x RM{data_kiraan.get('kadar_lori_per_kg', KADAR_LORI_PER_KG):.3f}/kg", ln=True)
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, f"  Jumlah Gaji Lori = RM{data_kiraan.get('gaji_lori', 0):.2f}", ln=True)
+    pdf.ln(5)
+
+    # Kos Operasi
+    pdf.set_font("Helvetica", 'BU', 11)
+    pdf.cell(0, 8, "Kos Operasi Bulanan (Baja, Racun, dll):", ln=True)
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, f"  Jumlah Kos Operasi = RM{data_kiraan.get('total_kos_operasi', 0):.2f}", ln=True)
+    pdf.ln(5)
+
+    # Baki Bersih
+    pdf.set_font("Helvetica", 'BU', 11)
+    pdf.cell(0, 8, "Hasil Bersih (Untuk Dibahagi):", ln=True)
+    pdf.set_font("Helvetica", size=11)
+    pdf.cell(0, 8, f"  Kiraan: RM{data_kiraan.get('jumlah_hasil_jualan', 0):.2f} (Jualan) - RM{data_kiraan.get('gaji_lori', 0):.2f} (Lori) - RM{data_kiraan.get('total_kos_operasi', 0):.2f} (Kos Operasi)", ln=True)
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, f"  Hasil Bersih = RM{data_kiraan.get('baki_bersih', 0):.2f}", ln=True)
+    pdf.ln(5)
+
+    # Pembahagian ikut nisbah bulan itu (lalai 50/50)
+    nisbah = data_kiraan.get('nisbah_penumbak', NISBAH_PENUMBAK)
+    pdf.set_font("Helvetica", 'BU', 11)
+    pdf.cell(0, 8, f"Pembahagian Hasil Bersih ({nisbah * 100:g}/{100 - nisbah * 100:g}):", ln=True)
+    pdf.set_font("Helvetica", size=11)
+    pdf.cell(0, 8, f"  Kiraan: RM{data_kiraan.get('baki_bersih', 0):.2f} x {nisbah * 100:g}% (Penumbak)", ln=True)
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 8, f"  Gaji Pekerja 2 (Penumbak) = RM{data_kiraan.get('gaji_penumbak', 0):.2f}", ln=True)
+    pdf.cell(0, 8, f"  Bahagian Pemilik Ladang = RM{data_kiraan.get('bahagian_pemilik', 0):.2f}", ln=True)
+    pdf.ln(15)
+    
+    # Footer
+    pdf.set_font("Helvetica", 'I', 9)
+    pdf.cell(0, 5, "Laporan ini disediakan oleh:", ln=True, align='L')
+    pdf.set_font("Helvetica", 'B', 9)
+    pdf.cell(0, 5, "Mohamad Saifullah Satin", ln=True, align='L')
+    pdf.set_font("Helvetica", 'I', 9)
+    pdf.cell(0, 5, "Telefon: 019-840 6421", ln=True, align='L')
+    pdf.cell(0, 5, "Email: msaifullahsatin@gmail.com", ln=True, align='L')
+    tarikh_jana = datetime.date.today().strftime("%d-%m-%Y")
+    pdf.set_y(-15)
+    pdf.set_font("Helvetica", 'I', 8)
+    pdf.cell(0, 10, f"Laporan dijana secara automatik pada {tarikh_jana} oleh {nama_anda}", ln=True, align='C')
+    
+    return bytes(pdf.output(dest='S'))
+
+# df_jualan_filtered / df_kos_filtered boleh jadi resit mentah atau rollup
+# bulanan (lajur Berat_kg, Hasil_RM, JenisKos, Jumlah_RM yang sama).
+@diukur('pdf')
+def jana_pdf_berkelompok(laporan_title, df_gaji_filtered, df_jualan_filtered, df_kos_filtered, nama_anda='Admin'):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    
+    # --- LOGO & HEADER ---
+    if _letak_logo(pdf):
+        pdf.set_y(35)
+    else:
+        pdf.set_y(20)
+
+    pdf.set_font("Helvetica", 'B', 18)
+    pdf.cell(0, 10, f"LADANG SAWIT SATIN LUNG MANIS", ln=True, align='C')
+    pdf.set_font("Helvetica", 'B', 16)
+    pdf.cell(0, 10, f"Ringkasan Laporan - {laporan_title}", ln=True, align='C')
+    pdf.ln(10)
+
+    agregat = kira_agregat_laporan(df_gaji_filtered, df_jualan_filtered, df_kos_filtered)
+    kpi = agregat['kpi']
+
+    # 2. Ringkasan Keseluruhan (KPI)
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, "Ringkasan Prestasi Keseluruhan", ln=True)
+    
+    pdf.set_font("Helvetica", '', 11)
+    pdf.cell(0, 8, f"Jumlah Jualan Kasar: RM {kpi['JumlahJualan_RM']:,.2f}", ln=True)
+    pdf.cell(0, 8, f"Jumlah Berat Jualan: {kpi['JumlahBerat_kg']:,.2f} kg", ln=True)
+    pdf.cell(0, 8, f"Purata Harga: RM {kpi['PurataHarga_RM_per_MT']:,.2f} / MT ({kpi['BilBulan']} bulan)", ln=True)
+    pdf.cell(0, 8, f"Jumlah Kos Operasi: RM {kpi['total_kos_operasi']:,.2f}", ln=True)
+    pdf.cell(0, 8, f"Jumlah Gaji Lori: RM {kpi['GajiLori_RM']:,.2f}", ln=True)
+    pdf.cell(0, 8, f"Jumlah Gaji Penumbak: RM {kpi['GajiPenumbak_RM']:,.2f}", ln=True)
+    pdf.cell(0, 8, f"Jumlah Bahagian Pemilik: RM {kpi['BahagianPemilik_RM']:,.2f}", ln=True)
+    pdf.ln(10)
+
+    # 3. Jadual Ringkasan Mengikut Bulan
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, "Pecahan Mengikut Bulan", ln=True)
+    
+    w_bulan = 40
+    w_angka = 25 
+    tajuk = ["Jualan (RM)", "Kos Ops (RM)", "Gaji Lori (RM)", "Gaji Pnumbak (RM)", "Pemilik (RM)", "Berat (kg)"]
+
+    def kepala():
+        pdf.set_font("Helvetica", 'B', 8)
+        pdf.cell(w_bulan, 8, "Bulan", 1, align='C')
+        for i, t in enumerate(tajuk):
+            pdf.cell(w_angka, 8, t, 1, ln=i == len(tajuk) - 1, align='C')
+        pdf.set_font("Helvetica", '', 8)
+
+    def baris(label, nilai):
+        pdf.cell(w_bulan, 8, label, 1)
+        for i, v in enumerate(nilai):
+            pdf.cell(w_angka, 8, f"{v:,.2f}", 1, ln=i == len(nilai) - 1, align='R')
+
+    # Julat berbilang tahun melimpah ke halaman baru: kepala jadual diulang
+    kepala()
+    bulan = agregat['bulan']
+    for label, nilai in zip(bulan['BulanTahun'].astype(str).tolist(), bulan[LAJUR_LAPORAN].to_numpy().tolist()):
+        if pdf.will_page_break(8):
+            pdf.add_page()
+            kepala()
+        baris(label, nilai)
+    if pdf.will_page_break(8):
+        pdf.add_page()
+        kepala()
+    pdf.set_font("Helvetica", 'B', 8)
+    baris("JUMLAH", [kpi[c] for c in LAJUR_LAPORAN])
+    
+    pdf.ln(10)
+    
+    # 4. Ringkasan Pecahan Jualan (Gred) & Kos
+    pdf.set_font("Helvetica", 'B', 12)
+    pdf.cell(0, 10, "Pecahan Keseluruhan (Gred & Kos)", ln=True)
+    pdf.set_font("Helvetica", '', 11)
+
+    # Pecahan Gred: setiap gred yang wujud dalam data, bukan hanya A/B/C
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(95, 8, "Pecahan Jualan (Gred)", 1, ln=True, align='C')
+    pdf.set_font("Helvetica", '', 10)
+    if agregat['gred'].empty:
+        pdf.cell(0, 8, "Tiada jualan direkodkan.", ln=True)
+    for gred, berat, hasil, peratus in agregat['gred'][['Berat_kg', 'Hasil_RM', 'Peratus_Berat']].itertuples():
+        pdf.cell(0, 8, f"Gred {gred}: {berat:,.2f} kg ({peratus:.1f}%)  |  RM {hasil:,.2f}", ln=True)
+    pdf.ln(5)
+
+    # Pecahan Kos
+    pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(95, 8, "Pecahan Kos Operasi", 1, ln=True, align='C')
+    pdf.set_font("Helvetica", '', 10)
+    if not agregat['kos'].empty:
+        for jenis, jumlah in agregat['kos'].items():
+            pdf.cell(0, 8, f"{jenis}: RM {jumlah:,.2f}", ln=True)
+    else:
+        pdf.cell(0, 8, "Tiada kos operasi direkodkan.", ln=True)
+    
+    # 5. Footer
+    tarikh_jana = datetime.date.today().strftime("%d-%m-%Y")
+    pdf.set_y(-15)
+    pdf.set_font("Helvetica", 'I', 8)
+    pdf.cell(0, 10, f"Laporan dijana secara automatik pada {tarikh_jana} oleh {nama_anda}", ln=True, align='C')
+    
+    return bytes(pdf.output(dest='S'))
+
+# ==============================================================================
+# CACHE PDF (BERALAMAT KANDUNGAN)
+# ==============================================================================
+# Kunci = hash input laporan + versi templat + tarikh jana (dicetak dalam
+# footer). PDF hanya dibina semula apabila data bulan itu benar-benar berubah.
+def kunci_kandungan(*bahagian):
+    h = hashlib.sha256(f"v{VERSI_TEMPLAT}|{datetime.date.today()}".encode())
+    for b in bahagian:
+        if isinstance(b, pd.DataFrame):
+            h.update(json.dumps(list(map(str, b.columns))).encode())
+            h.update(pd.util.hash_pandas_object(b, index=False).values.tobytes())
+        else:
+            h.update(json.dumps(b, sort_keys=True, default=str).encode())
+        h.update(b"|")
+    return h.hexdigest()
+
+class CachePDF:
+    def __init__(self, had_bait=64 * 1024 * 1024):
+        self.had_bait = had_bait
+        self.kunci = threading.Lock()
+        self.data = OrderedDict()
+        self.saiz = 0
+        self.kena = 0
+        self.terlepas = 0
+
+    def dapat(self, k):
+        with self.kunci:
+            if k in self.data:
+                self.data.move_to_end(k)
+                self.kena += 1
+                catat_cache('pdf', True)
+                return self.data[k]
+            self.terlepas += 1
+            catat_cache('pdf', False)
+            return None
+
+    def simpan(self, k, pdf_bytes):
+        with self.kunci:
+            if k in self.data:
+                self.saiz -= len(self.data.pop(k))
+            self.data[k] = pdf_bytes
+            self.saiz += len(pdf_bytes)
+            # Buang yang paling lama tidak digunakan (LRU) sehingga bawah had
+            while self.saiz > self.had_bait and len(self.data) > 1:
+                _, lama = self.data.popitem(last=False)
+                self.saiz -= len(lama)
+
+cache_pdf = CachePDF()
+
+def jana_pdf_bercache(bulan_tahun, senarai_resit, data_kiraan, nama_anda='Admin'):
+    k = kunci_kandungan("bulanan", bulan_tahun, senarai_resit, data_kiraan, nama_anda)
+    pdf = cache_pdf.dapat(k)
+    if pdf is None:
+        pdf = jana_pdf_binary(bulan_tahun, senarai_resit, data_kiraan, nama_anda)
+        cache_pdf.simpan(k, pdf)
+    return pdf
+
+def jana_pdf_berkelompok_bercache(laporan_title, df_gaji_filtered, df_jualan_filtered, df_kos_filtered, nama_anda='Admin'):
+    k = kunci_kandungan("berkelompok", laporan_title, df_gaji_filtered, df_jualan_filtered, df_kos_filtered, nama_anda)
+    pdf = cache_pdf.dapat(k)
+    if pdf is None:
+        pdf = jana_pdf_berkelompok(laporan_title, df_gaji_filtered, df_jualan_filtered, df_kos_filtered, nama_anda)
+        cache_pdf.simpan(k, pdf)
+    return pdf
+
+def data_kiraan_dari_rekod(dg):
+    # Bina semula data_kiraan daripada satu baris rekod_gaji (untuk cetak semula),
+    # dengan kadar yang disimpan bersama bulan itu
+    kadar = isi_kadar(pd.DataFrame([dg])).iloc[0]
+    return {'jumlah_hasil_jualan': dg['JumlahJualan_RM'], 'jumlah_berat_kg': dg['JumlahBerat_kg'], 'gaji_lori': dg['GajiLori_RM'],
+            'total_kos_operasi': dg.get('total_kos_operasi', 0.0), 'kadar_lori_per_kg': float(kadar['KadarLori_RM_per_kg']),
+            'nisbah_penumbak': float(kadar['NisbahPenumbak']),
+            'baki_bersih': dg['GajiPenumbak_RM'] + dg['BahagianPemilik_RM'],
+            'gaji_penumbak': dg['GajiPenumbak_RM'], 'bahagian_pemilik': dg['BahagianPemilik_RM']}
+
+# ==============================================================================
+# CETAK PUKAL (BANYAK BULAN SERENTAK)
+# ==============================================================================
+def _jana_satu(tugasan):
+    bulan_tahun, senarai_resit, data_kiraan, nama_anda = tugasan
+    return f"Laporan_{bulan_tahun}.pdf", jana_pdf_binary(bulan_tahun, senarai_resit, data_kiraan, nama_anda)
+
+# Pekerja forkserver menjalankan semula fail __main__ induk (bagi Streamlit:
+# keseluruhan skrip UI) kecuali __main__ mereka sendiri sudah menunjuk ke fail
+# itu. Forkserver mengimport modul ini (preload) dengan __main__ tanpa fail,
+# jadi di situ __main__ ditanda sebagai skrip induk; anak-anaknya mewarisi
+# tanda itu. sys.modules proses Streamlit tidak pernah disentuh.
+_SKRIP_INDUK = "SAWIT_SKRIP_INDUK"
+if os.environ.get(_SKRIP_INDUK) and getattr(sys.modules['__main__'], '__file__', None) is None:
+    sys.modules['__main__'].__file__ = os.environ[_SKRIP_INDUK]
+
+def buat_kolam_pekerja(pekerja=None):
+    # fork tidak selamat dalam pelayan Streamlit yang berbilang benang. Tanpa
+    # forkserver (Windows) pekerja spawn menjalankan semula skrip UI, jadi PDF
+    # dijana dalam benang sahaja.
+    pekerja = pekerja or os.cpu_count()
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return ThreadPoolExecutor(max_workers=pekerja)
+    skrip = multiprocessing.spawn.get_preparation_data('kolam').get('init_main_from_path')
+    if skrip:
+        # Diwarisi forkserver apabila ia dimulakan. Python 3.11 tidak memberi
+        # sys.path induk kepadanya, jadi akar pakej ditambah ke PYTHONPATH
+        # supaya preload modul ini berjaya dari mana-mana direktori kerja.
+        akar = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        laluan = [p for p in os.environ.get('PYTHONPATH', '').split(os.pathsep) if p]
+        if akar not in laluan:
+            os.environ['PYTHONPATH'] = os.pathsep.join([akar] + laluan)
+        os.environ[_SKRIP_INDUK] = skrip
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload([__name__])
+    kolam = ProcessPoolExecutor(max_workers=pekerja, mp_context=ctx)
+    for f in [kolam.submit(int) for _ in range(pekerja)]:
+        f.result()
+    return kolam
+
+@diukur('pdf')
+def jana_pdf_pukal(senarai_tugasan, nama_anda='Admin', kolam=None, kemajuan=None, pekerja=None):
+    # senarai_tugasan: [(bulan_tahun, senarai_resit, data_kiraan), ...]
+    # Pulangkan bait fail ZIP yang mengandungi satu PDF bagi setiap bulan.
+    tugasan = [(b, r, d, nama_anda) for b, r, d in senarai_tugasan]
+    kunci = {f"Laporan_{t[0]}.pdf": kunci_kandungan("bulanan", *t) for t in tugasan}
+    hasil = {n: cache_pdf.dapat(k) for n, k in kunci.items()}
+    hasil = {n: d for n, d in hasil.items() if d is not None}
+    siap_awal = len(hasil)
+    tugasan_baki = [t for t in tugasan if f"Laporan_{t[0]}.pdf" not in hasil]
+    if kemajuan and siap_awal: kemajuan(siap_awal, len(tugasan))
+    if len(tugasan_baki) <= 2:
+        for i, t in enumerate(tugasan_baki, siap_awal + 1):
+            nama, data = _jana_satu(t)
+            hasil[nama] = data
+            if kemajuan: kemajuan(i, len(tugasan))
+    else:
+        kolam_sendiri = kolam is None
+        kolam = kolam or buat_kolam_pekerja(pekerja)
+        try:
+            niaga = [kolam.submit(_jana_satu, t) for t in tugasan_baki]
+            for i, f in enumerate(as_completed(niaga), siap_awal + 1):
+                nama, data = f.result()
+                hasil[nama] = data
+                if kemajuan: kemajuan(i, len(tugasan))
+        finally:
+            if kolam_sendiri: kolam.shutdown()
+
+    for nama, k in kunci.items():
+        cache_pdf.simpan(k, hasil[nama])
+
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        # Susunan fail ikut susunan tugasan, bukan susunan siap
+        for b, _, _, _ in tugasan:
+            nama = f"Laporan_{b}.pdf"
+            zf.writestr(nama, hasil[nama])
+    return output.getvalue()
@@ -0,0 +1,187 @@
+# Nama fail: sawit/prestasi.py
+# Instrumentasi laluan panas: masa setiap panggilan storan, kena/terlepas
+# cache, PDF, eksport dan rajah, dikumpul bagi setiap rerun (larian).
+# Tidak bergantung pada Streamlit. Larian semasa disimpan per-thread (setiap
+# rerun Streamlit berjalan dalam thread skrip sendiri), jadi panggilan di luar
+# larian (thread latar, CLI, tanda aras) tidak direkod dan hampir tiada kos.
+import contextlib
+import datetime
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+SEJARAH_LARIAN = 20     # Larian terakhir yang disimpan bagi setiap sesi
+MAKS_FASA = 300         # Fasa terperinci setiap larian; selebihnya hanya dijumlahkan
+
+_semasa = threading.local()
+_kunci_log = threading.Lock()
+
+class Larian:
+    def __init__(self, halaman):
+        self.halaman = halaman
+        self.masa = datetime.datetime.now().isoformat(timespec='seconds')
+        self.mula = time.perf_counter()
+        self.saat = None
+        self.status = 'berjalan'
+        self.fasa = []
+        self.kategori = {}      # kategori -> masa sendiri (tanpa fasa bersarang)
+        self.cache = {}         # nama -> [kena, terlepas]
+        self._tindanan = []     # masa anak bagi fasa yang sedang terbuka
+
+    def catat(self, kategori, nama, saat, sendiri, **info):
+        self.kategori[kategori] = self.kategori.get(kategori, 0.0) + sendiri
+        if len(self.fasa) < MAKS_FASA:
+            self.fasa.append({'kategori': kategori, 'nama': nama, 'saat': round(saat, 6),
+                              'aras': len(self._tindanan), **info})
+
+    def tamat(self, status='siap'):
+        self.saat = time.perf_counter() - self.mula
+        self.status = status
+
+    def ringkasan(self):
+        # Satu baris rata untuk jadual panel: jumlah, masa sendiri setiap kategori & cache
+        jumlah = self.saat if self.saat is not None else time.perf_counter() - self.mula
+        baris = {'masa': self.masa, 'halaman': self.halaman, 'status': self.status, 'jumlah_ms': round(jumlah * 1000, 1)}
+        for k, s in sorted(self.kategori.items()):
+            baris[f'{k}_ms'] = round(s * 1000, 1)
+        baris['lain_ms'] = round(max(jumlah - sum(self.kategori.values()), 0.0) * 1000, 1)
+        baris['cache_kena'] = sum(k for k, _ in self.cache.values())
+        baris['cache_terlepas'] = sum(t for _, t in self.cache.values())
+        return baris
+
+    def ke_dict(self):
+        return {**self.ringkasan(), 'cache': {n: {'kena': k, 'terlepas': t} for n, (k, t) in self.cache.items()},
+                'fasa': self.fasa}
+
+def larian_semasa():
+    return getattr(_semasa, 'larian', None)
+
+# ==========================================
+# PEREKOD (SATU BAGI SETIAP SESI)
+# ==========================================
+class Perekod:
+    def __init__(self, maks=SEJARAH_LARIAN, fail_log=None):
+        self.larian = deque(maxlen=maks)
+        self.fail_log = fail_log  # Jika ditetapkan, setiap larian ditambah sebagai satu baris JSON
+
+    def mula(self, halaman):
+        # st.rerun()/st.stop() memintas tamat(); larian itu ditutup di sini
+        if self.larian and self.larian[-1].status == 'berjalan':
+            self._tutup(self.larian[-1], 'terganggu')
+        larian = Larian(halaman)
+        self.larian.append(larian)
+        _semasa.larian = larian
+        return larian
+
+    def tamat(self):
+        larian = larian_semasa()
+        if larian is not None and larian.status == 'berjalan':
+            self._tutup(larian, 'siap')
+        _semasa.larian = None
+        return larian
+
+    def _tutup(self, larian, status):
+        larian.tamat(status)
+        if self.fail_log:
+            try:
+                with _kunci_log, open(self.fail_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(larian.ke_dict(), default=str) + "\n")
+            except OSError as e:
+                log.warning("Log prestasi gagal: %s", e)
+
+    def ringkasan(self):
+        return [l.ringkasan() for l in self.larian]
+
+    def jsonl(self):
+        return "".join(json.dumps(l.ke_dict(), default=str) + "\n" for l in self.larian).encode('utf-8')
+
+# ==========================================
+# TITIK UKURAN
+# ==========================================
+@contextlib.contextmanager
+def fasa(kategori, nama=None, **info):
+    larian = larian_semasa()
+    if larian is None:
+        yield
+        return
+    larian._tindanan.append(0.0)
+    mula = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        info['ralat'] = type(e).__name__
+        raise
+    finally:
+        saat = time.perf_counter() - mula
+        anak = larian._tindanan.pop()
+        if larian._tindanan:
+            larian._tindanan[-1] += saat
+        larian.catat(kategori, nama or kategori, saat, saat - anak, **info)
+
+def diukur(kategori, nama=None):
+    def balut(fungsi):
+        @functools.wraps(fungsi)
+        def dalam(*args, **kwargs):
+            if larian_semasa() is None:
+                return fungsi(*args, **kwargs)
+            with fasa(kategori, nama or fungsi.__name__):
+                return fungsi(*args, **kwargs)
+        return dalam
+    return balut
+
+def catat_cache(nama, kena):
+    larian = larian_semasa()
+    if larian is not None:
+        kiraan = larian.cache.setdefault(nama, [0, 0])
+        kiraan[0 if kena else 1] += 1
+
+def pantau_cache(penghias, nama=None, kategori='cache'):
+    # penghias = st.cache_data(...) / st.cache_resource(...). Badan fungsi hanya
+    # berjalan apabila cache terlepas, jadi panggilan tanpa badan = kena.
+    def balut(fungsi):
+        label = nama or fungsi.__name__
+
+        @functools.wraps(fungsi)
+        def badan(*args, **kwargs):
+            _semasa.terlepas = True
+            return fungsi(*args, **kwargs)
+        bercache = penghias(badan)
+
+        @functools.wraps(fungsi)
+        def luar(*args, **kwargs):
+            sebelum = getattr(_semasa, 'terlepas', False)
+            _semasa.terlepas = False
+            try:
+                with fasa(kategori, label):
+                    return bercache(*args, **kwargs)
+            finally:
+                catat_cache(label, not _semasa.terlepas)
+                _semasa.terlepas = sebelum
+        luar.clear = bercache.clear
+        return luar
+    return balut
+
+class StoranDiukur:
+    # Proksi backend storan (sawit/storan.py): setiap kaedah awam dimasa
+    # sebagai fasa 'db'; atribut lain (generasi, status, ...) diteruskan.
+    def __init__(self, storan):
+        self._storan = storan
+
+    def __getattr__(self, nama):
+        atribut = getattr(self._storan, nama)
+        if nama.startswith('_') or not callable(atribut):
+            return atribut
+
+        @functools.wraps(atribut)
+        def dalam(*args, **kwargs):
+            if larian_semasa() is None:
+                return atribut(*args, **kwargs)
+            label = f"{nama}({args[0]})" if args and isinstance(args[0], str) else nama
+            with fasa('db', label):
+                return atribut(*args, **kwargs)
+        return dalam
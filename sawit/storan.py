@@ -0,0 +1,530 @@
+# Nama fail: sawit/storan.py
+# Lapisan storan boleh tukar. Semua bahagian lain (SalinanTempatan, app.py,
+# CLI) hanya memanggil kaedah di bawah, jadi backend boleh ditukar melalui
+# rahsia STORAN:
+#   "supabase" - terus ke Supabase (lalai, seperti dahulu)
+#   "sqlite"   - fail SQLite tempatan sahaja (luar talian sepenuhnya)
+#   "berlapis" - baca dari SQLite tempatan; tulis ke SQLite dahulu kemudian
+#                disegerak ke Supabase oleh benang latar (boleh luar talian)
+#
+# Kaedah setiap backend:
+#   ambil(senarai_jadual, dari_id=None)  -> ({jadual: DataFrame}, statistik)
+#   masukkan(jadual, baris)              -> senarai baris yang disimpan (dengan id)
+#   padam_bulan(jadual, bulan_tahun)
+#   ganti_bulan(bulan_tahun, gaji=None, jualan=None, kos=None)
+#                                        -> {jadual: [id...]}; ganti semua jadual bulan
+#                                           itu secara atomik (None = tidak disentuh,
+#                                           [] = padam)
+#   ganti_bulan_pukal(senarai_bulan, gaji=None, jualan=None, kos=None)
+#                                        -> seperti ganti_bulan bagi banyak bulan sekali
+#                                           gus; setiap baris membawa BulanTahun dan
+#                                           created_at (jika ada) dikekalkan
+#   rollup(mula=None, akhir=None)        -> (rollup_jualan, rollup_kos), pilihan julat
+#                                           Tempoh yyyymm (indeks, sql/003_tempoh.sql)
+#   ambil_tempoh(senarai_jadual, mula, akhir)
+#                                        -> {jadual: DataFrame}; baris dengan Tempoh
+#                                           dalam julat sahaja (satu bulan/tahun)
+#   senarai_id(jadual, bulan=None, dari_id=0)
+#                                        -> [id...] tersusun; pilihan senarai BulanTahun
+#                                           dan id > dari_id (imbasan jendela delta)
+# dan atribut 'generasi' (naik apabila baris dibuang dari luar aplikasi) serta
+# 'selang_segerak' (saat minimum antara delta segerak SalinanTempatan).
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from sawit.data import LAJUR_JADUAL, LAJUR_TERBITAN, SAIZ_HALAMAN, SELANG_SEGERAK_SAAT, ambil_jadual_selari
+from sawit.kiraan import LAJUR_KADAR, PETA_BULAN
+
+log = logging.getLogger(__name__)
+
+SELANG_SEGERAK_LATAR_SAAT = 30
+SELANG_SELARAS_PENUH_SAAT = 6 * 3600
+
+# ==============================================================================
+# SUPABASE
+# ==============================================================================
+class StoranSupabase:
+    generasi = 0
+    selang_segerak = SELANG_SEGERAK_SAAT
+
+    def __init__(self, klien, saiz_halaman=None, pekerja=None):
+        self.klien = klien
+        self.saiz_halaman = saiz_halaman or SAIZ_HALAMAN
+        self.pekerja = pekerja
+
+    def ambil(self, senarai_jadual, dari_id=None):
+        return ambil_jadual_selari(self.klien, senarai_jadual, dari_id=dari_id,
+                                   saiz_halaman=self.saiz_halaman, pekerja=self.pekerja)
+
+    def masukkan(self, jadual, baris):
+        if jadual == 'rekod_gaji':
+            # Kunci unik bulan (sql/002): upsert melalui ganti_bulan supaya baris
+            # yang dikemas kini mendapat id baharu, sama seperti StoranSQLite
+            baris = baris if isinstance(baris, list) else [baris]
+            return [dict(r, id=self.ganti_bulan(r['BulanTahun'], gaji=[r])['rekod_gaji'][0]) for r in baris]
+        return self.klien.table(jadual).insert(baris).execute().data
+
+    def padam_bulan(self, jadual, bulan_tahun):
+        self.klien.table(jadual).delete().eq('BulanTahun', bulan_tahun).execute()
+
+    def ganti_bulan(self, bulan_tahun, gaji=None, jualan=None, kos=None):
+        # Satu permintaan ke fungsi ganti_bulan (sql/002_ganti_bulan.sql). Tiada
+        # laluan padam+masukkan berasingan: bulan separuh dipadam mesti mustahil.
+        return self._rpc('ganti_bulan', {'p_bulan': bulan_tahun, 'p_gaji': gaji, 'p_jualan': jualan, 'p_kos': kos})
+
+    def ganti_bulan_pukal(self, senarai_bulan, gaji=None, jualan=None, kos=None):
+        # Satu permintaan, satu insert setiap jadual (sql/005_ganti_bulan_pukal.sql)
+        return self._rpc('ganti_bulan_pukal', {'p_bulan': list(senarai_bulan), 'p_gaji': gaji,
+                                               'p_jualan': jualan, 'p_kos': kos})
+
+    def _rpc(self, fungsi, param):
+        try:
+            return self.klien.rpc(fungsi, param).execute().data
+        except Exception as e:
+            if getattr(e, 'code', None) == 'PGRST202':  # PGRST202 = fungsi tidak wujud
+                raise RuntimeError(f"Fungsi {fungsi} tiada di Supabase. Jalankan sql/002_ganti_bulan.sql "
+                                   "(dan migrasi sql/ seterusnya) dalam SQL Editor Supabase; tiada data diubah.") from e
+            raise
+
+    def senarai_id(self, jadual, bulan=None, dari_id=0):
+        # Halaman keyset ikut id (tidak beralih jika baris dipadam semasa
+        # membaca); bulan = hadkan kepada senarai BulanTahun
+        ids = []
+        while True:
+            q = self.klien.table(jadual).select("id")
+            if bulan is not None:
+                q = q.in_('BulanTahun', list(bulan))
+            res = q.gt('id', ids[-1] if ids else dari_id).order('id').limit(self.saiz_halaman).execute()
+            ids.extend(r['id'] for r in res.data)
+            if len(res.data) < self.saiz_halaman:
+                return ids
+
+    def _ambil_julat(self, nama, susun, dari=None, hingga=None):
+        baris, mula = [], 0
+        while True:
+            q = self.klien.table(nama).select("*")
+            if dari is not None:
+                q = q.gte('Tempoh', dari)
+            if hingga is not None:
+                q = q.lte('Tempoh', hingga)
+            for c in susun:
+                q = q.order(c)
+            res = q.range(mula, mula + self.saiz_halaman - 1).execute()
+            baris.extend(res.data)
+            if len(res.data) < self.saiz_halaman:
+                return pd.DataFrame(baris)
+            mula += len(res.data)
+
+    def rollup(self, mula=None, akhir=None):
+        # View dari sql/001_rollup_bulanan.sql (lajur Tempoh dari sql/003_tempoh.sql)
+        return (self._ambil_julat('rollup_jualan_bulanan', ('Tempoh', 'Gred'), mula, akhir),
+                self._ambil_julat('rollup_kos_bulanan', ('Tempoh', 'JenisKos'), mula, akhir))
+
+    def ambil_tempoh(self, senarai_jadual, mula, akhir):
+        # Jadual diambil serentak; biasanya satu halaman setiap jadual
+        with ThreadPoolExecutor(max_workers=len(senarai_jadual) or 1) as pool:
+            niaga = {j: pool.submit(self._ambil_julat, j, ('id',), mula, akhir) for j in senarai_jadual}
+            return {j: f.result() for j, f in niaga.items()}
+
+# ==============================================================================
+# SQLITE (TERBENAM)
+# ==============================================================================
+# Skema sama dengan jadual Supabase. 'id_jauh' hanya digunakan oleh mod
+# berlapis untuk memetakan baris tempatan kepada id Supabase.
+JENIS_LAJUR = {
+    'BulanTahun': 'TEXT', 'Gred': 'TEXT', 'JenisKos': 'TEXT', 'IDResit': 'INTEGER',
+}
+
+# Tempoh (yyyymm) dijana dari BulanTahun, sama seperti tempoh_bulan() di Postgres
+EKSPR_TEMPOH = ('CAST(substr("BulanTahun", instr("BulanTahun", \' \') + 1) AS INTEGER) * 100 + '
+                'CASE substr("BulanTahun", 1, instr("BulanTahun", \' \') - 1) '
+                + " ".join(f"WHEN '{b}' THEN {n}" for b, n in PETA_BULAN.items()) + ' END')
+
+def _jenis(c):
+    # Lajur kadar (rekod_gaji) mempunyai lalai seperti sql/004_kadar_gaji.sql
+    return JENIS_LAJUR.get(c, "REAL") + (f" DEFAULT {LAJUR_KADAR[c]}" if c in LAJUR_KADAR else "")
+
+def _ddl_jadual(jadual):
+    lajur = [c for c in LAJUR_JADUAL[jadual] if c not in ('id', 'created_at', 'Tempoh')]
+    defn = ",\n    ".join(f'"{c}" {_jenis(c)}' for c in lajur)
+    return f'''CREATE TABLE IF NOT EXISTS {jadual} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {defn},
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+    id_jauh INTEGER UNIQUE,
+    "Tempoh" INTEGER GENERATED ALWAYS AS ({EKSPR_TEMPOH}) STORED
+);
+CREATE INDEX IF NOT EXISTS {jadual}_bulan ON {jadual} ("BulanTahun");'''
+
+DDL_ROLLUP = '''
+DROP VIEW IF EXISTS rollup_jualan_bulanan;
+CREATE VIEW rollup_jualan_bulanan AS
+SELECT "BulanTahun", "Gred", SUM("Berat_kg") AS "Berat_kg", SUM("Hasil_RM") AS "Hasil_RM",
+       CASE WHEN SUM("Berat_kg") > 0 THEN SUM("Hasil_RM") / (SUM("Berat_kg") / 1000.0) ELSE 0 END AS "PurataHarga_RM_per_MT",
+       COUNT(*) AS "BilResit", "Tempoh"
+FROM rekod_jualan GROUP BY "BulanTahun", "Tempoh", "Gred";
+DROP VIEW IF EXISTS rollup_kos_bulanan;
+CREATE VIEW rollup_kos_bulanan AS
+SELECT "BulanTahun", "JenisKos", SUM("Jumlah_RM") AS "Jumlah_RM", COUNT(*) AS "BilRekod", "Tempoh"
+FROM rekod_kos GROUP BY "BulanTahun", "Tempoh", "JenisKos";
+CREATE TABLE IF NOT EXISTS _outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    operasi TEXT NOT NULL,
+    jadual TEXT NOT NULL,
+    muatan TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS _meta (kunci TEXT PRIMARY KEY, nilai TEXT);
+'''
+
+def _asli(nilai):
+    # Jenis numpy (int64 dll) -> jenis Python yang diterima sqlite3
+    return nilai.item() if hasattr(nilai, 'item') else nilai
+
+class StoranSQLite:
+    selang_segerak = 0  # bacaan tempatan hanya beberapa ms; semak pada setiap rerun
+
+    def __init__(self, laluan):
+        self.laluan = laluan
+        self.generasi = 0
+        if laluan != ':memory:' and os.path.dirname(laluan):
+            os.makedirs(os.path.dirname(laluan), exist_ok=True)
+        self.kunci = threading.RLock()
+        self.sambungan = sqlite3.connect(laluan, check_same_thread=False, isolation_level=None)
+        self.sambungan.execute("PRAGMA journal_mode=WAL")
+        self.sambungan.execute("PRAGMA synchronous=NORMAL")
+        with self.kunci:
+            self.sambungan.executescript("\n".join(_ddl_jadual(j) for j in LAJUR_JADUAL))
+            for j in LAJUR_JADUAL:
+                # Fail lama (sebelum Tempoh): lajur maya boleh ditambah tanpa tulis semula jadual
+                ada = {r[1] for r in self.sambungan.execute(f"PRAGMA table_xinfo({j})")}
+                if 'Tempoh' not in ada:
+                    self.sambungan.execute(f'ALTER TABLE {j} ADD COLUMN "Tempoh" INTEGER GENERATED ALWAYS AS ({EKSPR_TEMPOH}) VIRTUAL')
+                for c in LAJUR_JADUAL[j]:
+                    if c in LAJUR_KADAR and c not in ada:  # Fail lama (sebelum kadar disimpan)
+                        self.sambungan.execute(f'ALTER TABLE {j} ADD COLUMN "{c}" {_jenis(c)}')
+                self.sambungan.execute(f'CREATE INDEX IF NOT EXISTS {j}_tempoh ON {j} ("Tempoh")')
+            # Satu baris gaji sebulan, seperti rekod_gaji_bulan_unik (sql/002). Fail
+            # lama mungkin ada pendua: yang terakhir disimpan dikekalkan.
+            if not self.sambungan.execute("SELECT 1 FROM sqlite_master WHERE name = 'rekod_gaji_bulan_unik'").fetchone():
+                self.sambungan.execute('DELETE FROM rekod_gaji WHERE id NOT IN (SELECT MAX(id) FROM rekod_gaji GROUP BY "BulanTahun")')
+                self.sambungan.execute('CREATE UNIQUE INDEX rekod_gaji_bulan_unik ON rekod_gaji ("BulanTahun")')
+            self.sambungan.executescript(DDL_ROLLUP)
+
+    def _pertanyaan(self, sql, param=()):
+        with self.kunci:
+            return pd.read_sql_query(sql, self.sambungan, params=param)
+
+    def ambil(self, senarai_jadual, dari_id=None):
+        dari_id = dari_id or {}
+        hasil, statistik = {}, {}
+        for j in senarai_jadual:
+            mula = time.perf_counter()
+            lajur = ", ".join(f'"{c}"' for c in LAJUR_JADUAL[j])
+            hasil[j] = self._pertanyaan(f'SELECT {lajur} FROM {j} WHERE id > ? ORDER BY id', (dari_id.get(j, 0),))
+            statistik[j] = {"baris": len(hasil[j]), "halaman": 1, "saat": round(time.perf_counter() - mula, 3)}
+        return hasil, statistik
+
+    def _masukkan(self, jadual, baris, id_jauh=None):
+        # Dipanggil dalam transaksi; pulangkan baris lengkap dengan id tempatan.
+        # rekod_gaji: upsert ikut bulan dengan id baharu (seperti ganti_bulan di
+        # Supabase), jadi delta segerak (id > tanda air) nampak kemas kini.
+        lajur_sah = [c for c in LAJUR_JADUAL[jadual] if c not in LAJUR_TERBITAN]
+        disimpan = []
+        for i, r in enumerate(baris):
+            lajur = [c for c in lajur_sah if c in r and r[c] is not None]
+            nilai = [_asli(r[c]) for c in lajur]
+            if id_jauh is not None:
+                lajur, nilai = lajur + ['id_jauh'], nilai + [id_jauh[i]]
+            sql = (f'INSERT {"OR REPLACE " if jadual == "rekod_gaji" else ""}INTO {jadual} ({", ".join(chr(34) + c + chr(34) for c in lajur)}) '
+                   f'VALUES ({", ".join("?" * len(lajur))})')
+            if id_jauh is not None:
+                sql += ' ON CONFLICT(id_jauh) DO NOTHING'
+            cur = self.sambungan.execute(sql, nilai)
+            if cur.rowcount:
+                disimpan.append(dict(r, id=cur.lastrowid))
+        return disimpan
+
+    def masukkan(self, jadual, baris):
+        baris = baris if isinstance(baris, list) else [baris]
+        with self.kunci, self.sambungan:
+            self.sambungan.execute("BEGIN")
+            return self._masukkan(jadual, baris)
+
+    def padam_bulan(self, jadual, bulan_tahun):
+        with self.kunci:
+            self.sambungan.execute(f'DELETE FROM {jadual} WHERE "BulanTahun" = ?', (bulan_tahun,))
+
+    def _ganti_bulan_pukal(self, senarai_bulan, muatan):
+        # Dipanggil dalam transaksi; muatan = {jadual: baris (dengan BulanTahun)
+        # atau None}. Baris di luar senarai_bulan diabaikan, seperti di Supabase.
+        bulan = list(senarai_bulan)
+        ada, hasil = set(bulan), {}
+        for j, baris in muatan.items():
+            if baris is None:
+                continue
+            self.sambungan.execute(f'DELETE FROM {j} WHERE "BulanTahun" IN ({", ".join("?" * len(bulan))})', bulan)
+            hasil[j] = [r['id'] for r in self._masukkan(j, [r for r in baris if r.get('BulanTahun') in ada])]
+        return hasil
+
+    def _ganti_bulan(self, bulan_tahun, muatan):
+        return self._ganti_bulan_pukal([bulan_tahun], {j: None if baris is None else [dict(r, BulanTahun=bulan_tahun) for r in baris]
+                                                       for j, baris in muatan.items()})
+
+    def ganti_bulan(self, bulan_tahun, gaji=None, jualan=None, kos=None):
+        with self.kunci, self.sambungan:
+            self.sambungan.execute("BEGIN")
+            return self._ganti_bulan(bulan_tahun, {'rekod_gaji': gaji, 'rekod_jualan': jualan, 'rekod_kos': kos})
+
+    def ganti_bulan_pukal(self, senarai_bulan, gaji=None, jualan=None, kos=None):
+        with self.kunci, self.sambungan:
+            self.sambungan.execute("BEGIN")
+            return self._ganti_bulan_pukal(senarai_bulan, {'rekod_gaji': gaji, 'rekod_jualan': jualan, 'rekod_kos': kos})
+
+    def rollup(self, mula=None, akhir=None):
+        julat = (mula if mula is not None else 0, akhir if akhir is not None else 999999)
+        return (self._pertanyaan('SELECT * FROM rollup_jualan_bulanan WHERE "Tempoh" BETWEEN ? AND ? '
+                                 'ORDER BY "Tempoh", "Gred"', julat),
+                self._pertanyaan('SELECT * FROM rollup_kos_bulanan WHERE "Tempoh" BETWEEN ? AND ? '
+                                 'ORDER BY "Tempoh", "JenisKos"', julat))
+
+    def ambil_tempoh(self, senarai_jadual, mula, akhir):
+        hasil = {}
+        for j in senarai_jadual:
+            lajur = ", ".join(f'"{c}"' for c in LAJUR_JADUAL[j])
+            hasil[j] = self._pertanyaan(f'SELECT {lajur} FROM {j} WHERE "Tempoh" BETWEEN ? AND ? ORDER BY id', (mula, akhir))
+        return hasil
+
+    def senarai_id(self, jadual, bulan=None, dari_id=0):
+        sql, param = f'SELECT id FROM {jadual} WHERE id > ?', [dari_id]
+        if bulan is not None:
+            bulan = list(bulan)
+            sql += f' AND "BulanTahun" IN ({", ".join("?" * len(bulan))})'
+            param += bulan
+        with self.kunci:
+            return [r[0] for r in self.sambungan.execute(sql + ' ORDER BY id', param)]
+
+    # --- sokongan mod berlapis ---
+    def meta(self, kunci, lalai=None):
+        with self.kunci:
+            row = self.sambungan.execute("SELECT nilai FROM _meta WHERE kunci = ?", (kunci,)).fetchone()
+        return json.loads(row[0]) if row else lalai
+
+    def set_meta(self, kunci, nilai):
+        with self.kunci:
+            self.sambungan.execute("INSERT INTO _meta VALUES (?, ?) ON CONFLICT(kunci) DO UPDATE SET nilai = excluded.nilai",
+                                   (kunci, json.dumps(nilai)))
+
+# ==============================================================================
+# BERLAPIS: REPLIKA BACA TEMPATAN + SEGERAK LATAR KE SUPABASE
+# ==============================================================================
+# Setiap tulisan disimpan dalam SQLite dan direkod dalam '_outbox' dalam
+# transaksi yang sama, jadi tiada perubahan hilang jika Supabase tidur atau
+# aplikasi dimulakan semula. Benang latar menolak outbox mengikut turutan,
+# kemudian menarik baris baharu dari Supabase (delta ikut id) dan membuang
+# baris bulan yang telah diganti/dipadam di sana (_bulan_berubah).
+class StoranBerlapis:
+    selang_segerak = 0
+
+    def __init__(self, tempatan, jauh, selang=SELANG_SEGERAK_LATAR_SAAT):
+        self.tempatan = tempatan
+        self.jauh = jauh
+        self.selang = selang
+        self.picu = threading.Event()
+        self.status = {"ok": None, "masa": None, "ralat": None, "menunggu": self._bil_outbox()}
+        self._masa_selaras = 0.0
+        threading.Thread(target=self._gelung, name="segerak-berlapis", daemon=True).start()
+
+    @property
+    def generasi(self):
+        return self.tempatan.generasi
+
+    # --- baca: sentiasa tempatan ---
+    def ambil(self, senarai_jadual, dari_id=None):
+        return self.tempatan.ambil(senarai_jadual, dari_id)
+
+    def rollup(self, mula=None, akhir=None):
+        return self.tempatan.rollup(mula, akhir)
+
+    def ambil_tempoh(self, senarai_jadual, mula, akhir):
+        return self.tempatan.ambil_tempoh(senarai_jadual, mula, akhir)
+
+    def senarai_id(self, jadual, bulan=None, dari_id=0):
+        return self.tempatan.senarai_id(jadual, bulan, dari_id)
+
+    # --- tulis: tempatan + outbox dalam satu transaksi ---
+    def _outbox(self, operasi, jadual, muatan):
+        self.tempatan.sambungan.execute("INSERT INTO _outbox (operasi, jadual, muatan) VALUES (?, ?, ?)",
+                                        (operasi, jadual, json.dumps(muatan, default=str)))
+
+    def masukkan(self, jadual, baris):
+        baris = baris if isinstance(baris, list) else [baris]
+        t = self.tempatan
+        with t.kunci, t.sambungan:
+            t.sambungan.execute("BEGIN")
+            disimpan = t._masukkan(jadual, baris)
+            self._outbox('masukkan', jadual, {"id": [r['id'] for r in disimpan], "baris": baris})
+        self._selepas_tulis()
+        return disimpan
+
+    def padam_bulan(self, jadual, bulan_tahun):
+        t = self.tempatan
+        with t.kunci, t.sambungan:
+            t.sambungan.execute("BEGIN")
+            t.sambungan.execute(f'DELETE FROM {jadual} WHERE "BulanTahun" = ?', (bulan_tahun,))
+            self._outbox('padam_bulan', jadual, {"BulanTahun": bulan_tahun})
+        self._selepas_tulis()
+
+    def ganti_bulan(self, bulan_tahun, gaji=None, jualan=None, kos=None):
+        muatan = {'rekod_gaji': gaji, 'rekod_jualan': jualan, 'rekod_kos': kos}
+        t = self.tempatan
+        with t.kunci, t.sambungan:
+            t.sambungan.execute("BEGIN")
+            ids = t._ganti_bulan(bulan_tahun, muatan)
+            self._outbox('ganti_bulan', '*', {"BulanTahun": bulan_tahun, "muatan": muatan, "id": ids})
+        self._selepas_tulis()
+        return ids
+
+    def ganti_bulan_pukal(self, senarai_bulan, gaji=None, jualan=None, kos=None):
+        muatan = {'rekod_gaji': gaji, 'rekod_jualan': jualan, 'rekod_kos': kos}
+        t = self.tempatan
+        with t.kunci, t.sambungan:
+            t.sambungan.execute("BEGIN")
+            ids = t._ganti_bulan_pukal(senarai_bulan, muatan)
+            self._outbox('ganti_bulan_pukal', '*', {"bulan": list(senarai_bulan), "muatan": muatan, "id": ids})
+        self._selepas_tulis()
+        return ids
+
+    def _selepas_tulis(self):
+        self.status["menunggu"] = self._bil_outbox()
+        self.picu.set()
+
+    def _bil_outbox(self):
+        with self.tempatan.kunci:
+            return self.tempatan.sambungan.execute("SELECT COUNT(*) FROM _outbox").fetchone()[0]
+
+    # --- segerak latar ---
+    def _tolak(self):
+        t = self.tempatan
+        while True:
+            with t.kunci:
+                row = t.sambungan.execute("SELECT seq, operasi, jadual, muatan FROM _outbox ORDER BY seq LIMIT 1").fetchone()
+            if row is None:
+                return
+            seq, operasi, jadual, muatan = row[0], row[1], row[2], json.loads(row[3])
+            if operasi == 'masukkan':
+                jauh = self.jauh.masukkan(jadual, muatan["baris"])
+                with t.kunci, t.sambungan:
+                    t.sambungan.execute("BEGIN")
+                    t.sambungan.executemany(f"UPDATE {jadual} SET id_jauh = ? WHERE id = ?",
+                                            [(r['id'], i) for r, i in zip(jauh, muatan["id"])])
+                    t.sambungan.execute("DELETE FROM _outbox WHERE seq = ?", (seq,))
+            elif operasi in ('ganti_bulan', 'ganti_bulan_pukal'):
+                bulan = muatan["BulanTahun"] if operasi == 'ganti_bulan' else muatan["bulan"]
+                jauh = getattr(self.jauh, operasi)(bulan, muatan["muatan"]['rekod_gaji'],
+                                                   muatan["muatan"]['rekod_jualan'], muatan["muatan"]['rekod_kos'])
+                with t.kunci, t.sambungan:
+                    t.sambungan.execute("BEGIN")
+                    for j, ids in muatan["id"].items():
+                        t.sambungan.executemany(f"UPDATE {j} SET id_jauh = ? WHERE id = ?",
+                                                list(zip(jauh.get(j, []), ids)))
+                    t.sambungan.execute("DELETE FROM _outbox WHERE seq = ?", (seq,))
+            else:
+                self.jauh.padam_bulan(jadual, muatan["BulanTahun"])
+                with t.kunci:
+                    t.sambungan.execute("DELETE FROM _outbox WHERE seq = ?", (seq,))
+
+    def _tarik(self):
+        t = self.tempatan
+        hwm = t.meta('hwm_jauh', {j: 0 for j in LAJUR_JADUAL})
+        baru, _ = self.jauh.ambil(list(LAJUR_JADUAL), dari_id=hwm)
+        with t.kunci, t.sambungan:
+            t.sambungan.execute("BEGIN")
+            for j, df in baru.items():
+                if df.empty:
+                    continue
+                rekod = df.astype(object).where(df.notna(), None).to_dict('records')
+                # rekod_gaji: versi lama bulan itu diganti oleh upsert _masukkan
+                t._masukkan(j, rekod, id_jauh=[r['id'] for r in rekod])
+                hwm[j] = int(df['id'].max())
+        t.set_meta('hwm_jauh', hwm)
+        # Delta id tidak membawa pemadaman: selaraskan bulan yang mungkin
+        # berubah di Supabase supaya resit yang diganti tidak dikira dua kali
+        dibuang = self._buang_hilang('rekod_gaji', self.jauh.senarai_id('rekod_gaji'))
+        for j, bulan in self._bulan_berubah(baru).items():
+            if bulan:
+                dibuang += self._buang_hilang(j, self.jauh.senarai_id(j, sorted(bulan)), bulan)
+        if dibuang:
+            t.generasi += 1
+
+    def _bulan_berubah(self, baru):
+        # Bulan resit/kos yang barisnya mungkin dipadam oleh proses lain: ada
+        # baris baharu ditarik (ganti_bulan memadam versi lama dahulu), atau
+        # bilangan baris dalam rollup Supabase berbeza dengan baris tersegerak
+        # tempatan (padam_bulan). Tanpa view rollup, hanya yang pertama;
+        # _selaras_padam tetap menangkap selebihnya.
+        t = self.tempatan
+        bulan = {j: set(baru[j]['BulanTahun']) if not baru[j].empty else set() for j in ('rekod_jualan', 'rekod_kos')}
+        try:
+            rj, rk = self.jauh.rollup()
+        except Exception:
+            return bulan
+        for j, lajur, df in (('rekod_jualan', 'BilResit', rj), ('rekod_kos', 'BilRekod', rk)):
+            jauh = df.groupby('BulanTahun')[lajur].sum().to_dict() if not df.empty else {}
+            with t.kunci:
+                tempatan = dict(t.sambungan.execute(
+                    f'SELECT "BulanTahun", COUNT(*) FROM {j} WHERE id_jauh IS NOT NULL GROUP BY "BulanTahun"').fetchall())
+            bulan[j].update(b for b in jauh.keys() | tempatan.keys() if int(jauh.get(b, 0)) != tempatan.get(b, 0))
+        return bulan
+
+    def _buang_hilang(self, jadual, ids, bulan=None):
+        # Buang baris tersegerak (ada id_jauh) yang tiada lagi dalam 'ids'
+        # Supabase; bulan = hadkan kepada bulan yang id-nya diambil
+        t = self.tempatan
+        sql = f"DELETE FROM {jadual} WHERE id_jauh IS NOT NULL AND id_jauh NOT IN (SELECT id FROM _id_jauh)"
+        if bulan is not None:
+            sql += f' AND "BulanTahun" IN ({", ".join("?" * len(bulan))})'
+        with t.kunci, t.sambungan:
+            t.sambungan.execute("BEGIN")
+            t.sambungan.execute("CREATE TEMP TABLE IF NOT EXISTS _id_jauh (id INTEGER PRIMARY KEY)")
+            t.sambungan.execute("DELETE FROM _id_jauh")
+            t.sambungan.executemany("INSERT INTO _id_jauh VALUES (?)", [(i,) for i in ids])
+            return t.sambungan.execute(sql, list(bulan or ())).rowcount
+
+    def _selaras_padam(self):
+        # Buang baris yang telah dipadam di Supabase oleh proses lain (semua bulan)
+        dibuang = sum(self._buang_hilang(j, self.jauh.senarai_id(j)) for j in LAJUR_JADUAL)
+        if dibuang:
+            self.tempatan.generasi += 1
+
+    def segerak_sekarang(self):
+        self._tolak()
+        self._tarik()
+        if time.monotonic() - self._masa_selaras > SELANG_SELARAS_PENUH_SAAT and self._bil_outbox() == 0:
+            self._selaras_padam()
+            self._masa_selaras = time.monotonic()
+
+    def _gelung(self):
+        while True:
+            try:
+                self.segerak_sekarang()
+                self.status.update(ok=True, ralat=None)
+            except Exception as e:
+                self.status.update(ok=False, ralat=str(e))
+                log.warning("Segerak berlapis gagal: %s", e)
+            self.status.update(masa=time.time(), menunggu=self._bil_outbox())
+            self.picu.wait(self.selang)
+            self.picu.clear()
+
+def buat_storan(mod, klien=None, laluan_sqlite="data/sawit.db", saiz_halaman=None, pekerja=None):
+    if mod == "sqlite":
+        return StoranSQLite(laluan_sqlite)
+    if mod == "berlapis":
+        return StoranBerlapis(StoranSQLite(laluan_sqlite), StoranSupabase(klien, saiz_halaman, pekerja))
+    return StoranSupabase(klien, saiz_halaman, pekerja)
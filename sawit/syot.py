@@ -0,0 +1,211 @@
+# Nama fail: sawit/syot.py
+# Syot kilat (snapshot) rekod_gaji, rekod_jualan & rekod_kos: satu ZIP yang
+# mengandungi Parquet (zstd) bagi setiap jadual dan manifest.json dengan
+# checksum. Syot 'beza' hanya menyimpan baris baharu/berubah dan id yang
+# dipadam berbanding syot sebelumnya dalam folder yang sama; baca_syot()
+# menyusun semula rantai itu dan mengesahkan cap setiap jadual. Pemulihan
+# dibuat melalui pulih_syot (sawit/import_pukal.py); import_pukal menolak ZIP syot.
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import zipfile
+
+import pandas as pd
+
+from sawit.data import LAJUR_JADUAL
+from sawit.prestasi import diukur
+
+log = logging.getLogger(__name__)
+
+# pyarrow hanya diimport apabila syot ditulis/dibaca
+
+VERSI_FORMAT = 1
+NAMA_MANIFEST = "manifest.json"
+MAMPATAN = "zstd"
+MAKS_RANTAI = 7     # Syot beza berturut-turut sebelum syot penuh baharu
+LAJUR_TEKS = ('BulanTahun', 'Gred', 'JenisKos')
+LAJUR_INTEGER = ('id', 'IDResit', 'Tempoh')
+
+# ==========================================
+# 1. BENTUK KANONIK & CHECKSUM
+# ==========================================
+def _normal(jadual, df):
+    # Jenis tetap (tanpa kategori/int32 salinan tempatan) supaya cap sama
+    # tidak kira dari mana bingkai datang, disusun ikut id
+    df = df[[c for c in LAJUR_JADUAL[jadual] if c in df.columns]]
+    jenis = {}
+    for c in df.columns:
+        if c in LAJUR_TEKS:
+            jenis[c] = df[c].astype('string')
+        elif c in LAJUR_INTEGER:
+            jenis[c] = pd.to_numeric(df[c], errors='coerce').astype('Int64')
+        elif c == 'created_at':
+            jenis[c] = pd.to_datetime(df[c], utc=True, errors='coerce', format='mixed')
+        else:
+            jenis[c] = pd.to_numeric(df[c], errors='coerce').astype('float64')
+    df = df.assign(**jenis)
+    if 'id' in df.columns:
+        df = df.sort_values('id', kind='stable')
+    return df.reset_index(drop=True)
+
+def _hash_baris(df):
+    return pd.util.hash_pandas_object(df, index=False)
+
+def _cap(df):
+    # Cap keadaan jadual: sama bagi data sama, walaupun dari rantai beza
+    h = hashlib.sha256(json.dumps(list(df.columns)).encode())
+    h.update(_hash_baris(df).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _parquet(df):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    output = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), output, compression=MAMPATAN)
+    return output.getvalue()
+
+def _baca_parquet(bait):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(io.BytesIO(bait)).to_pandas()
+
+# ==========================================
+# 2. TULIS
+# ==========================================
+@diukur('eksport')
+def jana_syot(df_gaji, df_jualan, df_kos, asas=None):
+    # Pulangkan (bait ZIP, manifest). asas = (nama_fail, manifest, bingkai)
+    # syot sebelumnya -> syot beza; None (atau tiada id) -> syot penuh.
+    semasa = {j: _normal(j, df) for j, df in zip(LAJUR_JADUAL, (df_gaji, df_jualan, df_kos))}
+    boleh_beza = asas is not None and all('id' in df.columns and df['id'].notna().all() for df in semasa.values())
+    manifest = {
+        'versi': VERSI_FORMAT,
+        'masa': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'jenis': 'beza' if boleh_beza else 'penuh',
+        'asas': asas[0] if boleh_beza else None,
+        'rantai': asas[1]['rantai'] + 1 if boleh_beza else 0,
+        'jadual': {},
+    }
+    output = io.BytesIO()
+    # Parquet sudah dimampat; ZIP hanya bekas
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as zf:
+        for j, df in semasa.items():
+            info = {'baris': len(df), 'cap': _cap(df)}
+            if boleh_beza:
+                # Baris kekal = id dan hash kandungan sama; selebihnya dipadam/ditambah
+                lama = _normal(j, asas[2][j])
+                kekal = pd.DataFrame({'id': lama['id'], 'h': _hash_baris(lama).to_numpy()}).merge(
+                    pd.DataFrame({'id': df['id'], 'h': _hash_baris(df).to_numpy()}), on=['id', 'h'])['id']
+                padam = lama.loc[~lama['id'].isin(kekal), ['id']]
+                df = df[~df['id'].isin(kekal)]
+                bait_padam = _parquet(padam)
+                zf.writestr(f"{j}.padam.parquet", bait_padam)
+                info['padam'] = {'fail': f"{j}.padam.parquet", 'baris': len(padam),
+                                 'sha256': hashlib.sha256(bait_padam).hexdigest()}
+            bait = _parquet(df)
+            zf.writestr(f"{j}.parquet", bait)
+            info.update(fail=f"{j}.parquet", baris_fail=len(df), sha256=hashlib.sha256(bait).hexdigest())
+            manifest['jadual'][j] = info
+        zf.writestr(NAMA_MANIFEST, json.dumps(manifest, indent=2))
+    return output.getvalue(), manifest
+
+def simpan_syot(df_gaji, df_jualan, df_kos, direktori, maks_rantai=MAKS_RANTAI, penuh=False):
+    # Syot berjadual: beza berbanding syot terakhir dalam folder (jika rantai
+    # belum mencapai maks_rantai dan boleh dibaca), jika tidak syot penuh.
+    # Pulangkan (laluan, manifest).
+    os.makedirs(direktori, exist_ok=True)
+    asas = None
+    terakhir = senarai_syot(direktori)[-1:]
+    if terakhir and not penuh:
+        laluan_asas = os.path.join(direktori, terakhir[0])
+        try:
+            manifest_asas = baca_manifest(laluan_asas)
+            if manifest_asas['rantai'] < maks_rantai:
+                asas = (terakhir[0], manifest_asas, dict(zip(LAJUR_JADUAL, baca_syot(laluan_asas))))
+        except (ValueError, KeyError, OSError, zipfile.BadZipFile) as e:
+            # Asas rantai hilang/rosak (cth. cache CI dibuang): mula rantai baharu
+            log.warning("Syot %s tidak boleh dijadikan asas, syot penuh diambil: %s", terakhir[0], e)
+    bait, manifest = jana_syot(df_gaji, df_jualan, df_kos, asas)
+    # Mikrosaat: dua syot dalam saat yang sama tidak berkongsi nama (dan
+    # susunan nama kekal susunan masa untuk senarai_syot)
+    laluan = os.path.join(direktori, f"syot_{datetime.datetime.now():%Y%m%d_%H%M%S_%f}_{manifest['jenis']}.zip")
+    with open(laluan + ".tmp", 'wb') as f:
+        f.write(bait)
+    try:
+        # link() gagal jika nama sudah wujud: syot sedia ada (mungkin asas
+        # rantai) tidak pernah ditimpa. Tiada syot separuh jika proses terhenti.
+        os.link(laluan + ".tmp", laluan)
+    except FileExistsError:
+        raise FileExistsError(f"Syot {os.path.basename(laluan)} sudah wujud; tidak ditimpa") from None
+    finally:
+        os.remove(laluan + ".tmp")
+    return laluan, manifest
+
+# ==========================================
+# 3. BACA & SAHKAN
+# ==========================================
+def senarai_syot(direktori):
+    return sorted(n for n in os.listdir(direktori) if n.startswith("syot_") and n.endswith(".zip"))
+
+def pangkas_syot(direktori):
+    # Buang syot sebelum syot penuh terakhir; rantai semasa cukup untuk
+    # pemulihan. Pulangkan nama fail yang dibuang.
+    senarai = senarai_syot(direktori)
+    penuh = [n for n in senarai if baca_manifest(os.path.join(direktori, n))['jenis'] == 'penuh']
+    buang = [n for n in senarai if penuh and n < penuh[-1]]
+    for n in buang:
+        os.remove(os.path.join(direktori, n))
+    return buang
+
+def adalah_syot(sumber):
+    # ZIP dengan manifest.json (berbanding ZIP CSV dari to_zip_csv)
+    kedudukan = sumber.tell() if hasattr(sumber, 'tell') else None
+    try:
+        with zipfile.ZipFile(sumber) as zf:
+            return NAMA_MANIFEST in zf.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return False
+    finally:
+        if kedudukan is not None:
+            sumber.seek(kedudukan)
+
+def baca_manifest(sumber):
+    with zipfile.ZipFile(sumber) as zf:
+        return json.loads(zf.read(NAMA_MANIFEST))
+
+def _ahli(zf, info):
+    bait = zf.read(info['fail'])
+    if hashlib.sha256(bait).hexdigest() != info['sha256']:
+        raise ValueError(f"Checksum tidak sepadan: {info['fail']}")
+    return _baca_parquet(bait)
+
+@diukur('import')
+def baca_syot(sumber, direktori=None):
+    # Pulangkan (df_gaji, df_jualan, df_kos). Syot beza dibaca bersama
+    # asasnya (rekursif) dari 'direktori' (lalai: folder syot itu sendiri).
+    direktori = direktori or (os.path.dirname(os.path.abspath(sumber)) if isinstance(sumber, str) else None)
+    with zipfile.ZipFile(sumber) as zf:
+        manifest = json.loads(zf.read(NAMA_MANIFEST))
+        if manifest['versi'] > VERSI_FORMAT:
+            raise ValueError(f"Format syot v{manifest['versi']} lebih baharu daripada sistem ini")
+        if manifest['jenis'] == 'beza':
+            if direktori is None or not os.path.exists(os.path.join(direktori, manifest['asas'])):
+                raise ValueError(f"Syot beza memerlukan asasnya: {manifest['asas']}")
+            asas = dict(zip(LAJUR_JADUAL, baca_syot(os.path.join(direktori, manifest['asas']), direktori)))
+        hasil = []
+        for j in LAJUR_JADUAL:
+            info = manifest['jadual'][j]
+            df = _ahli(zf, info)
+            if manifest['jenis'] == 'beza':
+                buang = _ahli(zf, info['padam'])['id']
+                lama = asas[j][~asas[j]['id'].isin(buang)]
+                df = pd.concat([lama, df], ignore_index=True) if len(df) else lama
+            df = _normal(j, df)
+            if _cap(df) != info['cap']:
+                raise ValueError(f"Cap jadual {j} tidak sepadan selepas pemulihan")
+            hasil.append(df)
+    return tuple(hasil)
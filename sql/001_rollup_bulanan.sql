@@ -0,0 +1,29 @@
+-- Nama fail: sql/001_rollup_bulanan.sql
+-- Rollup bulanan supaya dashboard & laporan tidak perlu memuat turun setiap
+-- resit/kos hanya untuk menjumlahkannya. Jalankan dalam Supabase SQL Editor.
+
+create or replace view rollup_jualan_bulanan
+with (security_invoker = true) as
+select
+    "BulanTahun",
+    "Gred",
+    sum("Berat_kg")  as "Berat_kg",
+    sum("Hasil_RM")  as "Hasil_RM",
+    case when sum("Berat_kg") > 0
+         then sum("Hasil_RM") / (sum("Berat_kg") / 1000.0)
+         else 0 end  as "PurataHarga_RM_per_MT",
+    count(*)         as "BilResit"
+from rekod_jualan
+group by "BulanTahun", "Gred";
+
+create or replace view rollup_kos_bulanan
+with (security_invoker = true) as
+select
+    "BulanTahun",
+    "JenisKos",
+    sum("Jumlah_RM") as "Jumlah_RM",
+    count(*)         as "BilRekod"
+from rekod_kos
+group by "BulanTahun", "JenisKos";
+
+grant select on rollup_jualan_bulanan, rollup_kos_bulanan to anon, authenticated;
@@ -0,0 +1,87 @@
+-- Nama fail: sql/002_ganti_bulan.sql
+-- Tulis semula satu bulan (gaji, resit, kos) secara atomik dalam SATU
+-- permintaan. Fungsi plpgsql berjalan dalam satu transaksi, jadi kegagalan di
+-- tengah jalan tidak lagi meninggalkan bulan separuh dipadam.
+--
+-- Parameter p_gaji / p_jualan / p_kos ialah tatasusunan JSON:
+--   null  -> jadual itu tidak disentuh
+--   '[]'  -> semua baris bulan itu dipadam
+--   [...] -> baris bulan itu diganti dengan baris yang diberi
+-- Pulangan: {"rekod_gaji": [id...], "rekod_jualan": [id...], "rekod_kos": [id...]}
+
+-- Kunci unik bulan untuk upsert. Jika ini gagal, buang pendua dahulu:
+--   delete from rekod_gaji a using rekod_gaji b
+--   where a."BulanTahun" = b."BulanTahun" and a.id < b.id;
+alter table rekod_gaji
+    add constraint rekod_gaji_bulan_unik unique ("BulanTahun");
+
+create or replace function ganti_bulan(
+    p_bulan  text,
+    p_gaji   jsonb default null,
+    p_jualan jsonb default null,
+    p_kos    jsonb default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    hasil jsonb := '{}'::jsonb;
+    ids   jsonb;
+begin
+    if p_gaji is not null then
+        if jsonb_array_length(p_gaji) = 0 then
+            delete from rekod_gaji where "BulanTahun" = p_bulan;
+            ids := '[]'::jsonb;
+        else
+            -- Upsert ikut kunci bulan. id baharu diberi supaya segerak delta
+            -- (id > tanda air) di proses lain nampak baris yang dikemas kini.
+            with ins as (
+                insert into rekod_gaji ("BulanTahun", "JumlahJualan_RM", "JumlahBerat_kg", "GajiLori_RM",
+                                        "GajiPenumbak_RM", "BahagianPemilik_RM", total_kos_operasi)
+                select p_bulan, r."JumlahJualan_RM", r."JumlahBerat_kg", r."GajiLori_RM",
+                       r."GajiPenumbak_RM", r."BahagianPemilik_RM", r.total_kos_operasi
+                from jsonb_populate_recordset(null::rekod_gaji, p_gaji) r
+                on conflict ("BulanTahun") do update set
+                    "JumlahJualan_RM"    = excluded."JumlahJualan_RM",
+                    "JumlahBerat_kg"     = excluded."JumlahBerat_kg",
+                    "GajiLori_RM"        = excluded."GajiLori_RM",
+                    "GajiPenumbak_RM"    = excluded."GajiPenumbak_RM",
+                    "BahagianPemilik_RM" = excluded."BahagianPemilik_RM",
+                    total_kos_operasi    = excluded.total_kos_operasi,
+                    id                   = nextval(pg_get_serial_sequence('rekod_gaji', 'id')),
+                    created_at           = now()
+                returning id
+            )
+            select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        end if;
+        hasil := hasil || jsonb_build_object('rekod_gaji', ids);
+    end if;
+
+    if p_jualan is not null then
+        delete from rekod_jualan where "BulanTahun" = p_bulan;
+        with ins as (
+            insert into rekod_jualan ("BulanTahun", "IDResit", "Gred", "Berat_kg", "Harga_RM_per_MT", "Hasil_RM")
+            select p_bulan, r."IDResit", r."Gred", r."Berat_kg", r."Harga_RM_per_MT", r."Hasil_RM"
+            from jsonb_populate_recordset(null::rekod_jualan, p_jualan) r
+            returning id
+        )
+        select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        hasil := hasil || jsonb_build_object('rekod_jualan', ids);
+    end if;
+
+    if p_kos is not null then
+        delete from rekod_kos where "BulanTahun" = p_bulan;
+        with ins as (
+            insert into rekod_kos ("BulanTahun", "JenisKos", "Jumlah_RM")
+            select p_bulan, r."JenisKos", r."Jumlah_RM"
+            from jsonb_populate_recordset(null::rekod_kos, p_kos) r
+            returning id
+        )
+        select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        hasil := hasil || jsonb_build_object('rekod_kos', ids);
+    end if;
+
+    return hasil;
+end;
+$$;
+
+grant execute on function ganti_bulan(text, jsonb, jsonb, jsonb) to anon, authenticated;
@@ -0,0 +1,60 @@
+-- Nama fail: sql/003_tempoh.sql
+-- Kunci tempoh integer yyyymm ("Mac 2025" -> 202503) pada ketiga-tiga jadual.
+-- Lajur dijana oleh Postgres daripada "BulanTahun", jadi klien tidak perlu
+-- menghantarnya dan baris lama terisi serta-merta. Dengan indeks, laporan
+-- boleh membuat pertanyaan julat (cth. 202407..202506) dan menyusun secara
+-- kronologi tanpa menghurai rentetan bulan. Jalankan selepas 001 dan 002.
+
+create or replace function tempoh_bulan(p_bulan text) returns integer
+language sql immutable as $$
+    select case when p_bulan ~ '^\S+ \d{4}$' then
+        split_part(p_bulan, ' ', 2)::int * 100 +
+        case split_part(p_bulan, ' ', 1)
+            when 'Januari' then 1 when 'Februari' then 2 when 'Mac' then 3
+            when 'April' then 4 when 'Mei' then 5 when 'Jun' then 6
+            when 'Julai' then 7 when 'Ogos' then 8 when 'September' then 9
+            when 'Oktober' then 10 when 'November' then 11 when 'Disember' then 12
+        end
+    end
+$$;
+
+alter table rekod_gaji
+    add column if not exists "Tempoh" integer generated always as (tempoh_bulan("BulanTahun")) stored;
+alter table rekod_jualan
+    add column if not exists "Tempoh" integer generated always as (tempoh_bulan("BulanTahun")) stored;
+alter table rekod_kos
+    add column if not exists "Tempoh" integer generated always as (tempoh_bulan("BulanTahun")) stored;
+
+create index if not exists rekod_gaji_tempoh   on rekod_gaji ("Tempoh");
+create index if not exists rekod_jualan_tempoh on rekod_jualan ("Tempoh", "Gred");
+create index if not exists rekod_kos_tempoh    on rekod_kos ("Tempoh");
+
+-- View rollup dengan Tempoh di hujung (create or replace hanya boleh menambah
+-- lajur di belakang), supaya rollup juga boleh ditapis ikut julat.
+create or replace view rollup_jualan_bulanan
+with (security_invoker = true) as
+select
+    "BulanTahun",
+    "Gred",
+    sum("Berat_kg")  as "Berat_kg",
+    sum("Hasil_RM")  as "Hasil_RM",
+    case when sum("Berat_kg") > 0
+         then sum("Hasil_RM") / (sum("Berat_kg") / 1000.0)
+         else 0 end  as "PurataHarga_RM_per_MT",
+    count(*)         as "BilResit",
+    "Tempoh"
+from rekod_jualan
+group by "BulanTahun", "Tempoh", "Gred";
+
+create or replace view rollup_kos_bulanan
+with (security_invoker = true) as
+select
+    "BulanTahun",
+    "JenisKos",
+    sum("Jumlah_RM") as "Jumlah_RM",
+    count(*)         as "BilRekod",
+    "Tempoh"
+from rekod_kos
+group by "BulanTahun", "Tempoh", "JenisKos";
+
+grant select on rollup_jualan_bulanan, rollup_kos_bulanan to anon, authenticated;
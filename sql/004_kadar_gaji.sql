@@ -0,0 +1,89 @@
+-- Nama fail: sql/004_kadar_gaji.sql
+-- Kadar gaji disimpan bersama setiap bulan dalam rekod_gaji. Kadar lori dan
+-- nisbah penumbak/pemilik dirunding dan berubah dari masa ke masa, jadi
+-- Cetak Semula dan senario mesti guna kadar yang benar-benar dipakai bulan
+-- itu, bukan nilai tetap dalam kod. Baris sedia ada diisi dengan kadar lama
+-- (RM0.07/kg, 50/50). Jalankan selepas 001-003.
+
+alter table rekod_gaji
+    add column if not exists "KadarLori_RM_per_kg" double precision not null default 0.07,
+    add column if not exists "NisbahPenumbak" double precision not null default 0.5;
+
+alter table rekod_gaji
+    add constraint rekod_gaji_nisbah_sah check ("NisbahPenumbak" between 0 and 1);
+
+-- ganti_bulan (002) dikemas kini supaya lajur kadar turut ditulis
+create or replace function ganti_bulan(
+    p_bulan  text,
+    p_gaji   jsonb default null,
+    p_jualan jsonb default null,
+    p_kos    jsonb default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    hasil jsonb := '{}'::jsonb;
+    ids   jsonb;
+begin
+    if p_gaji is not null then
+        if jsonb_array_length(p_gaji) = 0 then
+            delete from rekod_gaji where "BulanTahun" = p_bulan;
+            ids := '[]'::jsonb;
+        else
+            -- Upsert ikut kunci bulan. id baharu diberi supaya segerak delta
+            -- (id > tanda air) di proses lain nampak baris yang dikemas kini.
+            with ins as (
+                insert into rekod_gaji ("BulanTahun", "JumlahJualan_RM", "JumlahBerat_kg", "GajiLori_RM",
+                                        "GajiPenumbak_RM", "BahagianPemilik_RM", total_kos_operasi,
+                                        "KadarLori_RM_per_kg", "NisbahPenumbak")
+                select p_bulan, r."JumlahJualan_RM", r."JumlahBerat_kg", r."GajiLori_RM",
+                       r."GajiPenumbak_RM", r."BahagianPemilik_RM", r.total_kos_operasi,
+                       coalesce(r."KadarLori_RM_per_kg", 0.07), coalesce(r."NisbahPenumbak", 0.5)
+                from jsonb_populate_recordset(null::rekod_gaji, p_gaji) r
+                on conflict ("BulanTahun") do update set
+                    "JumlahJualan_RM"    = excluded."JumlahJualan_RM",
+                    "JumlahBerat_kg"     = excluded."JumlahBerat_kg",
+                    "GajiLori_RM"        = excluded."GajiLori_RM",
+                    "GajiPenumbak_RM"    = excluded."GajiPenumbak_RM",
+                    "BahagianPemilik_RM" = excluded."BahagianPemilik_RM",
+                    total_kos_operasi    = excluded.total_kos_operasi,
+                    "KadarLori_RM_per_kg" = excluded."KadarLori_RM_per_kg",
+                    "NisbahPenumbak"     = excluded."NisbahPenumbak",
+                    id                   = nextval(pg_get_serial_sequence('rekod_gaji', 'id')),
+                    created_at           = now()
+                returning id
+            )
+            select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        end if;
+        hasil := hasil || jsonb_build_object('rekod_gaji', ids);
+    end if;
+
+    if p_jualan is not null then
+        delete from rekod_jualan where "BulanTahun" = p_bulan;
+        with ins as (
+            insert into rekod_jualan ("BulanTahun", "IDResit", "Gred", "Berat_kg", "Harga_RM_per_MT", "Hasil_RM")
+            select p_bulan, r."IDResit", r."Gred", r."Berat_kg", r."Harga_RM_per_MT", r."Hasil_RM"
+            from jsonb_populate_recordset(null::rekod_jualan, p_jualan) r
+            returning id
+        )
+        select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        hasil := hasil || jsonb_build_object('rekod_jualan', ids);
+    end if;
+
+    if p_kos is not null then
+        delete from rekod_kos where "BulanTahun" = p_bulan;
+        with ins as (
+            insert into rekod_kos ("BulanTahun", "JenisKos", "Jumlah_RM")
+            select p_bulan, r."JenisKos", r."Jumlah_RM"
+            from jsonb_populate_recordset(null::rekod_kos, p_kos) r
+            returning id
+        )
+        select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        hasil := hasil || jsonb_build_object('rekod_kos', ids);
+    end if;
+
+    return hasil;
+end;
+$$;
+
+grant execute on function ganti_bulan(text, jsonb, jsonb, jsonb) to anon, authenticated;
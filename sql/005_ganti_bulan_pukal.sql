@@ -0,0 +1,104 @@
+-- Nama fail: sql/005_ganti_bulan_pukal.sql
+-- ganti_bulan bagi BANYAK bulan dalam satu permintaan: satu delete dan satu
+-- insert bagi setiap jadual, dalam satu transaksi. Digunakan oleh pemulihan
+-- syot (pulih_syot) supaya ribuan baris tidak dihantar sebulan demi sebulan.
+-- created_at dari baris yang dihantar dikekalkan (lalai now()), jadi baris
+-- yang dipulihkan atau ditulis semula tidak kehilangan masa asalnya.
+-- Jalankan selepas 001-004.
+--
+-- Parameter p_gaji / p_jualan / p_kos ialah tatasusunan JSON; setiap baris
+-- membawa "BulanTahun" sendiri (baris di luar p_bulan diabaikan):
+--   null  -> jadual itu tidak disentuh
+--   '[]'  -> semua baris bulan-bulan itu dipadam
+--   [...] -> baris bulan-bulan itu diganti dengan baris yang diberi
+-- Pulangan: {"rekod_gaji": [id...], "rekod_jualan": [id...], "rekod_kos": [id...]}
+
+create or replace function ganti_bulan_pukal(
+    p_bulan  text[],
+    p_gaji   jsonb default null,
+    p_jualan jsonb default null,
+    p_kos    jsonb default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    hasil jsonb := '{}'::jsonb;
+    ids   jsonb;
+begin
+    if p_gaji is not null then
+        -- Padam dahulu (bukan upsert): id baharu supaya segerak delta
+        -- (id > tanda air) di proses lain nampak baris yang dikemas kini
+        delete from rekod_gaji where "BulanTahun" = any(p_bulan);
+        with ins as (
+            insert into rekod_gaji ("BulanTahun", "JumlahJualan_RM", "JumlahBerat_kg", "GajiLori_RM",
+                                    "GajiPenumbak_RM", "BahagianPemilik_RM", total_kos_operasi,
+                                    "KadarLori_RM_per_kg", "NisbahPenumbak", created_at)
+            select r."BulanTahun", r."JumlahJualan_RM", r."JumlahBerat_kg", r."GajiLori_RM",
+                   r."GajiPenumbak_RM", r."BahagianPemilik_RM", r.total_kos_operasi,
+                   coalesce(r."KadarLori_RM_per_kg", 0.07), coalesce(r."NisbahPenumbak", 0.5),
+                   coalesce(r.created_at, now())
+            from jsonb_populate_recordset(null::rekod_gaji, p_gaji) r
+            where r."BulanTahun" = any(p_bulan)
+            returning id
+        )
+        select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        hasil := hasil || jsonb_build_object('rekod_gaji', ids);
+    end if;
+
+    if p_jualan is not null then
+        delete from rekod_jualan where "BulanTahun" = any(p_bulan);
+        with ins as (
+            insert into rekod_jualan ("BulanTahun", "IDResit", "Gred", "Berat_kg", "Harga_RM_per_MT", "Hasil_RM",
+                                      created_at)
+            select r."BulanTahun", r."IDResit", r."Gred", r."Berat_kg", r."Harga_RM_per_MT", r."Hasil_RM",
+                   coalesce(r.created_at, now())
+            from jsonb_populate_recordset(null::rekod_jualan, p_jualan) r
+            where r."BulanTahun" = any(p_bulan)
+            returning id
+        )
+        select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        hasil := hasil || jsonb_build_object('rekod_jualan', ids);
+    end if;
+
+    if p_kos is not null then
+        delete from rekod_kos where "BulanTahun" = any(p_bulan);
+        with ins as (
+            insert into rekod_kos ("BulanTahun", "JenisKos", "Jumlah_RM", created_at)
+            select r."BulanTahun", r."JenisKos", r."Jumlah_RM", coalesce(r.created_at, now())
+            from jsonb_populate_recordset(null::rekod_kos, p_kos) r
+            where r."BulanTahun" = any(p_bulan)
+            returning id
+        )
+        select coalesce(jsonb_agg(id order by id), '[]'::jsonb) into ids from ins;
+        hasil := hasil || jsonb_build_object('rekod_kos', ids);
+    end if;
+
+    return hasil;
+end;
+$$;
+
+grant execute on function ganti_bulan_pukal(text[], jsonb, jsonb, jsonb) to anon, authenticated;
+
+-- ganti_bulan (002/004) kini satu bulan ganti_bulan_pukal, jadi created_at
+-- baris yang ditulis semula (cth. import tambah) turut dikekalkan
+create or replace function _dengan_bulan(p_baris jsonb, p_bulan text) returns jsonb
+language sql immutable as $$
+    select case when p_baris is null then null else coalesce(
+        (select jsonb_agg(r || jsonb_build_object('BulanTahun', p_bulan) order by n)
+         from jsonb_array_elements(p_baris) with ordinality as e(r, n)),
+        '[]'::jsonb) end
+$$;
+
+create or replace function ganti_bulan(
+    p_bulan  text,
+    p_gaji   jsonb default null,
+    p_jualan jsonb default null,
+    p_kos    jsonb default null
+) returns jsonb
+language sql
+as $$
+    select ganti_bulan_pukal(array[p_bulan], _dengan_bulan(p_gaji, p_bulan),
+                             _dengan_bulan(p_jualan, p_bulan), _dengan_bulan(p_kos, p_bulan))
+$$;
+
+grant execute on function ganti_bulan(text, jsonb, jsonb, jsonb) to anon, authenticated;